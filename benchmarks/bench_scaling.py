@@ -0,0 +1,219 @@
+# bench_scaling.py - Time and peak memory of every analysis stage across dataset sizes
+#
+# Usage:
+#   python benchmarks/bench_scaling.py --output results.json
+#   python benchmarks/bench_scaling.py --rows 1000 100000 --cols 10 50 --compare results.json
+#
+# Datasets are synthetic and seeded, so two runs of the same grid measure
+# the same data. Each (rows, cols) case runs the stages in pipeline order
+# twice: once for wall time and once under tracemalloc for peak memory
+# (tracemalloc slows Python-heavy code, so the passes are kept apart).
+# Caches are cleared before each pass. With --compare, stages slower or
+# larger than the saved baseline by more than the thresholds are flagged
+# and the exit status is 1.
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python'))
+
+from preprocessing import preprocess_data
+from distribution import analyze_distributions
+from correlation import calculate_all_correlations
+from modeling import fit_all_models
+from assumptions import test_all_assumptions
+from report_generator import generate_html_report
+from column_stats import clear_stats_cache
+from ols import clear_fit_cache
+
+STAGES = ['preprocess', 'distributions', 'correlations', 'regressions', 'assumptions', 'report']
+
+DEFAULT_ROWS = [1000, 10000, 100000, 1000000, 10000000]
+DEFAULT_COLS = [2, 10, 50, 200, 500]
+
+def make_dataset(rows, cols, seed=0):
+    """
+    Seeded synthetic data: correlated predictors, linear responses, ~1% missing, a few outliers
+
+    The last max(1, cols // 10) columns (at most 5) are responses, the rest predictors.
+    """
+    rng = np.random.default_rng(seed)
+    n_dvs = min(5, max(1, cols // 10))
+    n_ivs = cols - n_dvs
+    latent = rng.standard_normal((rows, 1))
+    X = 0.5 * latent + rng.standard_normal((rows, n_ivs))
+    coef = rng.normal(size=(n_ivs, n_dvs))
+    Y = X @ coef / np.sqrt(n_ivs) + rng.standard_normal((rows, n_dvs))
+    values = np.hstack([X, Y])
+
+    missing = rng.random(values.shape) < 0.01
+    values[missing] = np.nan
+    outliers = rng.random(values.shape) < 0.001
+    values[outliers] *= 20
+
+    columns = [f'x{i}' for i in range(n_ivs)] + [f'y{i}' for i in range(n_dvs)]
+    return pd.DataFrame(values, columns=columns), columns[:n_ivs], columns[n_ivs:]
+
+def analysis_config(args):
+    return {
+        'correlationMethods': {'pearson': True, 'spearman': True, 'kendall': args.kendall},
+        'calculateVIF': True,
+        'regressionModels': {'linear': True, 'polynomial': args.polynomial}
+    }
+
+def run_stages(df, ivs, dvs, config, measure):
+    """
+    Run every stage in pipeline order; measure(stage, func) runs one stage and records it
+    """
+    columns = ivs + dvs
+    missing_strategy = {col: 'median' for col in ivs}
+    missing_strategy.update({col: 'drop' for col in dvs})
+    outlier_decisions = {col: 'remove' for col in columns}
+
+    df_clean = measure('preprocess', lambda: preprocess_data(df, columns, missing_strategy, outlier_decisions))
+    results = {
+        'distributions': measure('distributions', lambda: analyze_distributions(df_clean, columns)),
+        'correlations': measure('correlations', lambda: calculate_all_correlations(df_clean, columns, config)),
+        'regressions': measure('regressions', lambda: fit_all_models(df_clean, ivs, dvs, config)),
+        'assumptions': measure('assumptions', lambda: test_all_assumptions(df_clean, ivs, dvs))
+    }
+    measure('report', lambda: generate_html_report(results, config, df_clean))
+
+def clear_caches():
+    clear_stats_cache()
+    clear_fit_cache()
+    gc.collect()
+
+def run_case(rows, cols, args):
+    """
+    Time and peak memory (MB) of each stage for one dataset size
+    """
+    df, ivs, dvs = make_dataset(rows, cols, args.seed)
+    config = analysis_config(args)
+    seconds = {}
+    peak_mb = {}
+
+    def timed(stage, func):
+        start = time.perf_counter()
+        result = func()
+        seconds[stage] = time.perf_counter() - start
+        return result
+
+    def traced(stage, func):
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        result = func()
+        peak_mb[stage] = (tracemalloc.get_traced_memory()[1] - baseline) / 1e6
+        return result
+
+    clear_caches()
+    run_stages(df, ivs, dvs, config, timed)
+    if not args.no_memory:
+        clear_caches()
+        tracemalloc.start()
+        try:
+            run_stages(df, ivs, dvs, config, traced)
+        finally:
+            tracemalloc.stop()
+
+    return [
+        {'rows': rows, 'cols': cols, 'stage': stage, 'seconds': seconds[stage], 'peak_mb': peak_mb.get(stage)}
+        for stage in STAGES
+    ]
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count()
+    }
+
+def compare(records, baseline, time_threshold, memory_threshold, min_seconds):
+    """
+    Records slower / larger than the matching baseline record beyond the thresholds
+    """
+    previous = {(r['rows'], r['cols'], r['stage']): r for r in baseline['records']}
+    flagged = []
+    for record in records:
+        old = previous.get((record['rows'], record['cols'], record['stage']))
+        if old is None:
+            continue
+        reasons = []
+        if record['seconds'] > old['seconds'] * time_threshold and record['seconds'] - old['seconds'] > min_seconds:
+            reasons.append(f"time {old['seconds']:.3f}s -> {record['seconds']:.3f}s")
+        if (record['peak_mb'] is not None and old.get('peak_mb') is not None
+                and record['peak_mb'] > old['peak_mb'] * memory_threshold and record['peak_mb'] - old['peak_mb'] > 1):
+            reasons.append(f"peak {old['peak_mb']:.1f}MB -> {record['peak_mb']:.1f}MB")
+        if reasons:
+            flagged.append((record, reasons))
+    return flagged
+
+def main():
+    parser = argparse.ArgumentParser(description='Scaling benchmark for the analysis stages')
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS)
+    parser.add_argument('--cols', type=int, nargs='+', default=DEFAULT_COLS)
+    parser.add_argument('--max-cells', type=float, default=5e7,
+                        help='skip cases with rows * cols above this (5e7 cells is 400MB of float64)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--kendall', action='store_true', help='include Kendall correlations')
+    parser.add_argument('--polynomial', action='store_true', help='include polynomial fits')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc pass')
+    parser.add_argument('--output', help='save results as JSON')
+    parser.add_argument('--compare', help='baseline JSON from an earlier --output')
+    parser.add_argument('--time-threshold', type=float, default=1.25, help='flag stages slower than baseline x this')
+    parser.add_argument('--memory-threshold', type=float, default=1.25, help='flag stages larger than baseline x this')
+    parser.add_argument('--min-seconds', type=float, default=0.05, help='ignore time differences below this')
+    args = parser.parse_args()
+
+    # Warm up: heavy dependencies are imported on first use (see bench_startup.py)
+    df, ivs, dvs = make_dataset(200, 4, args.seed)
+    run_stages(df, ivs, dvs, analysis_config(args), lambda stage, func: func())
+
+    records = []
+    print(f"{'rows':>10} {'cols':>5} " + ' '.join(f"{stage:>14}" for stage in STAGES))
+    for rows in args.rows:
+        for cols in args.cols:
+            if rows * cols > args.max_cells:
+                print(f"{rows:>10} {cols:>5}  skipped (more than --max-cells)")
+                continue
+            case = run_case(rows, cols, args)
+            records.extend(case)
+            cells = []
+            for record in case:
+                cell = f"{record['seconds']:.3f}s"
+                if record['peak_mb'] is not None:
+                    cell += f"/{record['peak_mb']:.0f}MB"
+                cells.append(f"{cell:>14}")
+            print(f"{rows:>10} {cols:>5} " + ' '.join(cells))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'environment': environment(), 'config': analysis_config(args), 'seed': args.seed,
+                       'records': records}, f, indent=2)
+        print(f"\nSaved {len(records)} records to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get('environment') != environment():
+            print('\nNote: baseline was recorded in a different environment')
+        flagged = compare(records, baseline, args.time_threshold, args.memory_threshold, args.min_seconds)
+        if flagged:
+            print(f"\n{len(flagged)} regression(s) against {args.compare}:")
+            for record, reasons in flagged:
+                print(f"  {record['stage']:<14} rows={record['rows']} cols={record['cols']}: {'; '.join(reasons)}")
+            sys.exit(1)
+        print(f"\nNo regressions against {args.compare}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+# bench_serialization.py - Result serialization: to_json / to_columnar vs convert_numpy_types + json.dumps
+#
+# Usage: python benchmarks/bench_serialization.py [--sizes 100 500 2000] [--repeat 3]
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python'))
+
+from serialization import to_json, to_columnar
+
+def convert_numpy_types(obj):
+    """
+    Previous per-module conversion, kept here as the baseline
+    """
+    if isinstance(obj, dict):
+        return {key: convert_numpy_types(value) for key, value in obj.items()}
+    elif isinstance(obj, list):
+        return [convert_numpy_types(item) for item in obj]
+    elif isinstance(obj, np.integer):
+        return int(obj)
+    elif isinstance(obj, np.floating):
+        return float(obj)
+    elif isinstance(obj, np.bool_):
+        return bool(obj)
+    elif isinstance(obj, np.ndarray):
+        return obj.tolist()
+    else:
+        return obj
+
+def legacy_path(results):
+    # Modules used to call .tolist() themselves before converting
+    return json.dumps(convert_numpy_types(to_lists(results)))
+
+def to_lists(obj):
+    if isinstance(obj, dict):
+        return {key: to_lists(value) for key, value in obj.items()}
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    return obj
+
+def correlation_payload(k, rng):
+    """
+    Result shaped like calculate_all_correlations for k variables
+    """
+    columns = [f'x{i}' for i in range(k)]
+    payload = {}
+    for method in ('pearson', 'spearman', 'kendall'):
+        matrix = np.corrcoef(rng.standard_normal((k, 4 * k)))
+        payload[method] = {
+            'matrix': matrix,
+            'pvalues': rng.uniform(size=(k, k)),
+            'columns': columns
+        }
+    payload['vif'] = {col: np.float64(v) for col, v in zip(columns, rng.uniform(1, 5, k))}
+    return payload
+
+def timed(func, arg, repeat):
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = func(arg)
+        best = min(best, time.perf_counter() - start)
+    return best, output
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 500, 1000, 2000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'variables':>10} {'MB':>8} {'legacy s':>10} {'to_json s':>10} {'speedup':>8} {'columnar s':>11} {'header KB':>10}")
+    for k in args.sizes:
+        payload = correlation_payload(k, rng)
+        legacy_time, legacy_text = timed(legacy_path, payload, args.repeat)
+        new_time, new_text = timed(to_json, payload, args.repeat)
+        columnar_time, (header, buffer) = timed(to_columnar, payload, args.repeat)
+        assert json.loads(legacy_text) == json.loads(new_text)
+        print(f"{k:>10} {len(new_text) / 1e6:>8.1f} {legacy_time:>10.3f} {new_time:>10.3f} {legacy_time / new_time:>7.1f}x"
+              f" {columnar_time:>11.3f} {len(header) / 1e3:>10.1f}")
+
+    # Non-finite values: the old path emits NaN tokens that JSON.parse rejects
+    payload = {'matrix': np.array([[1.0, np.nan], [np.inf, -np.inf]]), 'skewness': np.float64('nan')}
+    print('\nlegacy :', legacy_path(payload))
+    print('to_json:', to_json(payload))
+
+if __name__ == '__main__':
+    main()
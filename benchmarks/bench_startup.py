@@ -0,0 +1,69 @@
+# bench_startup.py - Import time of the analysis modules, lazy vs eager heavy dependencies
+#
+# Each measurement runs in a fresh interpreter. "startup" is what the page
+# needs before the first interaction (import eda_core + load a CSV); the
+# remaining rows are paid the first time a stage that needs them runs.
+# Under Pyodide the scipy download comes on top and follows the
+# same split.
+#
+# Usage: python benchmarks/bench_startup.py [--repeat 5]
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+PYTHON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python')
+SAMPLE_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'assets', 'sample_health.csv')
+
+HEAVY = ('scipy', 'statsmodels', 'sklearn')
+
+LOAD_CSV = f"""
+from ingestion import CSVIngestor
+ingestor = CSVIngestor()
+ingestor.feed(open({SAMPLE_CSV!r}).read())
+df, profile = ingestor.finish()
+"""
+
+CASES = [
+    ('startup (lazy)', 'import eda_core' + LOAD_CSV),
+    ('startup (eager, previous)', 'import scipy.stats, scipy.linalg, statsmodels.api, sklearn.linear_model, '
+                                  'sklearn.preprocessing, sklearn.metrics\nimport eda_core' + LOAD_CSV),
+    ('first use: scipy.stats', 'import eda_core\n#measure\nimport scipy.stats, scipy.linalg'),
+]
+
+RUNNER = """
+import sys, time
+sys.path.insert(0, {path!r})
+setup, _, measured = {code!r}.rpartition('#measure')
+exec(setup)
+start = time.perf_counter()
+exec(measured)
+elapsed = time.perf_counter() - start
+heavy = sorted({{m.split('.')[0] for m in sys.modules if m.split('.')[0] in {heavy!r}}})
+print(elapsed, ','.join(heavy))
+"""
+
+def measure(code, repeat):
+    times = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c', RUNNER.format(path=PYTHON_DIR, code=code, heavy=HEAVY)],
+            capture_output=True, text=True, check=True
+        ).stdout.split()
+        times.append(float(output[0]))
+    return statistics.median(times), output[1] if len(output) > 1 else '-'
+
+def main():
+    parser = argparse.ArgumentParser(description='Import-time benchmark for the analysis modules')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'case':<28} {'median s':>9}  heavy packages imported")
+    for name, code in CASES:
+        elapsed, heavy = measure(code, args.repeat)
+        print(f"{name:<28} {elapsed:>9.3f}  {heavy}")
+
+if __name__ == '__main__':
+    main()
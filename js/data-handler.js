@@ -41,8 +41,9 @@ class DataHandler {
     
     async runFullAnalysis() {
         try {
-            // Step 1: Preprocess
+            // Step 1: Preprocess (after fetching the packages the enabled stages need)
             this.updateProgress(0);
+            await loadAnalysisPackages(stateManager.get('config'));
             await this.preprocessData();
             this.updateProgress(0, 'completed');
             
@@ -115,14 +116,14 @@ df_clean = preprocess_data(df, selected_columns, missing_strategy, outlier_decis
         const selectedColumns = [...stateManager.get('selectedIVs'), ...stateManager.get('selectedDVs')];
         setPythonVariable('selected_columns_json', JSON.stringify(selectedColumns));
 
-        const result = await runPython(`
+        return await runPythonColumnar(`
 import json
 from distribution import analyze_distributions
+from serialization import to_columnar
 selected_columns = json.loads(selected_columns_json)
 dist_results = analyze_distributions(df_clean, selected_columns)
-json.dumps(dist_results)
+to_columnar(dist_results)
         `);
-        return JSON.parse(result);
     }
     
     async calculateCorrelations() {
@@ -132,15 +133,15 @@ json.dumps(dist_results)
         setPythonVariable('config_json', JSON.stringify(config));
         setPythonVariable('selected_columns_json', JSON.stringify(selectedColumns));
 
-        const result = await runPython(`
+        return await runPythonColumnar(`
 import json
 from correlation import calculate_all_correlations
+from serialization import to_columnar
 selected_columns = json.loads(selected_columns_json)
 config = json.loads(config_json)
 corr_results = calculate_all_correlations(df_clean, selected_columns, config)
-json.dumps(corr_results)
+to_columnar(corr_results)
         `);
-        return JSON.parse(result);
     }
     
     async fitRegressionModels() {
@@ -152,16 +153,16 @@ json.dumps(corr_results)
         setPythonVariable('dvs_json', JSON.stringify(dvs));
         setPythonVariable('config_json', JSON.stringify(config));
 
-        const result = await runPython(`
+        return await runPythonColumnar(`
 import json
 from modeling import fit_all_models
+from serialization import to_columnar
 ivs = json.loads(ivs_json)
 dvs = json.loads(dvs_json)
 config = json.loads(config_json)
 regression_results = fit_all_models(df_clean, ivs, dvs, config)
-json.dumps(regression_results)
+to_columnar(regression_results)
         `);
-        return JSON.parse(result);
     }
     
     async testAssumptions() {
@@ -171,15 +172,15 @@ json.dumps(regression_results)
         setPythonVariable('ivs_json', JSON.stringify(ivs));
         setPythonVariable('dvs_json', JSON.stringify(dvs));
 
-        const result = await runPython(`
+        return await runPythonColumnar(`
 import json
 from assumptions import test_all_assumptions
+from serialization import to_columnar
 ivs = json.loads(ivs_json)
 dvs = json.loads(dvs_json)
 assumption_results = test_all_assumptions(df_clean, ivs, dvs)
-json.dumps(assumption_results)
+to_columnar(assumption_results)
         `);
-        return JSON.parse(result);
     }
     
     async generateVisualizations() {
@@ -189,13 +190,18 @@ json.dumps(assumption_results)
     async generateReport(results) {
         const config = stateManager.get('config');
 
-        setPythonVariable('all_results_json', JSON.stringify(results));
         setPythonVariable('config_json', JSON.stringify(config));
 
+        // Stage results are still held in Python; only the config crosses over
         const report = await runPython(`
 import json
 from report_generator import generate_html_report
-all_results = json.loads(all_results_json)
+all_results = {
+    'distributions': dist_results,
+    'correlations': corr_results,
+    'regressions': regression_results,
+    'assumptions': assumption_results
+}
 config = json.loads(config_json)
 report_html = generate_html_report(all_results, config, df_clean)
 report_html
@@ -95,25 +95,14 @@ async function initializePyodide() {
         });
         updateLoadingProgress('Python runtime loaded', 20);
         
-        // Load required packages
-        updateLoadingProgress('Installing NumPy...', 25);
+        // Load the packages needed for data loading; SciPy is fetched
+        // later by loadAnalysisPackages()
+        updateLoadingProgress('Installing NumPy...', 30);
         await pyodide.loadPackage('numpy');
         
-        updateLoadingProgress('Installing Pandas...', 35);
+        updateLoadingProgress('Installing Pandas...', 55);
         await pyodide.loadPackage('pandas');
         
-        updateLoadingProgress('Installing SciPy...', 50);
-        await pyodide.loadPackage('scipy');
-        
-        updateLoadingProgress('Installing Matplotlib...', 65);
-        await pyodide.loadPackage('matplotlib');
-        
-        updateLoadingProgress('Installing Statsmodels...', 75);
-        await pyodide.loadPackage('statsmodels');
-        
-        updateLoadingProgress('Installing scikit-learn...', 85);
-        await pyodide.loadPackage('scikit-learn');
-        
         // Load Python analysis modules
         updateLoadingProgress('Loading analysis modules...', 90);
         await loadPythonModules();
@@ -154,10 +143,25 @@ async function loadPythonModules() {
         // List of Python module files to load
         const moduleFiles = [
             'preprocessing.py',
+            'ingestion.py',
+            'column_stats.py',
             'distribution.py',
+            'normality.py',
+            'sampling.py',
             'correlation.py',
+            'kendall.py',
+            'ols.py',
+            'streaming.py',
             'modeling.py',
+            'polynomial.py',
+            'bootstrap.py',
+            'crossval.py',
             'assumptions.py',
+            'pipeline.py',
+            'executor.py',
+            'instrumentation.py',
+            'serialization.py',
+            'lazy.py',
             'report_generator.py',
             'eda_core.py'
         ];
@@ -181,6 +185,26 @@ import eda_core
     }
 }
 
+/**
+ * Fetch the packages the enabled analysis stages need (see eda_core.required_packages)
+ *
+ * config is the analysis configuration (stateManager 'config'); stages
+ * limits the check to some stage names, e.g. ['distributions']. Packages
+ * already loaded are skipped by Pyodide, so this is cheap after first use.
+ */
+async function loadAnalysisPackages(config, stages = null) {
+    setPythonVariable('package_config_json', JSON.stringify({ config: config }));
+    setPythonVariable('package_stages_json', JSON.stringify(stages));
+    const packages = JSON.parse(await runPython(`
+import json
+from eda_core import required_packages
+json.dumps(required_packages(package_config_json, json.loads(package_stages_json)))
+    `));
+    if (packages.length > 0) {
+        await pyodide.loadPackage(packages);
+    }
+}
+
 /**
  * Run Python code
  */
@@ -197,6 +221,64 @@ async function runPython(code) {
     }
 }
 
+/**
+ * Run Python code whose last expression is serialization.to_columnar(...)
+ *
+ * Only the small JSON header is parsed; the float64 buffer is read straight
+ * from the WASM heap with a single copy (views into the heap are invalidated
+ * when Python memory grows, so they cannot be kept). Numeric arrays come
+ * back as Float64Array views on that copy; 2-D arrays as arrays of row views.
+ */
+async function runPythonColumnar(code) {
+    const result = await runPython(code);
+    const header = result.get(0);
+    const bufferProxy = result.get(1);
+    const view = bufferProxy.getBuffer('f64');
+    let data;
+    try {
+        data = view.data.slice();
+    } finally {
+        view.release();
+        bufferProxy.destroy();
+        result.destroy();
+    }
+    return decodeColumnar(JSON.parse(header), data);
+}
+
+/**
+ * Replace {"__ndarray__": {offset, shape}} markers with views on data
+ */
+function decodeColumnar(node, data) {
+    if (Array.isArray(node)) {
+        return node.map(item => decodeColumnar(item, data));
+    }
+    if (node === null || typeof node !== 'object') {
+        return node;
+    }
+    if (node.__ndarray__) {
+        return columnarView(data, node.__ndarray__.offset, node.__ndarray__.shape);
+    }
+    for (const key of Object.keys(node)) {
+        node[key] = decodeColumnar(node[key], data);
+    }
+    return node;
+}
+
+function columnarView(data, offset, shape) {
+    if (shape.length === 0) {
+        return data[offset];
+    }
+    if (shape.length === 1) {
+        return data.subarray(offset, offset + shape[0]);
+    }
+    const stride = shape.slice(1).reduce((a, b) => a * b, 1);
+    const rows = [];
+    for (let i = 0; i < shape[0]; i++) {
+        rows.push(columnarView(data, offset + i * stride, shape.slice(1)));
+    }
+    return rows;
+}
+
 /**
  * Pass JavaScript data to Python
  */
@@ -224,8 +306,16 @@ function isPythonReady() {
     return pythonReady;
 }
 
+/**
+ * Size of the text pieces handed to Python while parsing a CSV file
+ */
+const CSV_CHUNK_BYTES = 4 * 1024 * 1024;
+
 /**
  * Load CSV data into Python pandas DataFrame
+ *
+ * The text is fed to Python in pieces so it is never duplicated as one
+ * Python string; columns are profiled in the same pass (column_profile).
  */
 async function loadCSVtoPython(csvText) {
     if (!pythonReady) {
@@ -233,15 +323,50 @@ async function loadCSVtoPython(csvText) {
     }
     
     try {
-        setPythonVariable('csv_text', csvText);
-        
         await runPython(`
-import pandas as pd
-import io
+from ingestion import CSVIngestor
+csv_ingestor = CSVIngestor()
+        `);
+        
+        const feed = pyodide.globals.get('csv_ingestor').feed;
+        for (let start = 0; start < csvText.length; start += CSV_CHUNK_BYTES) {
+            feed(csvText.slice(start, start + CSV_CHUNK_BYTES));
+        }
+        feed.destroy();
+        
+        await finishCSVIngestion();
+        return true;
+    } catch (error) {
+        console.error('Failed to load CSV to Python:', error);
+        throw new Error('Failed to parse CSV file: ' + error.message);
+    }
+}
 
-df = pd.read_csv(io.StringIO(csv_text))
+/**
+ * Stream a CSV File into Python without reading it into one JS string
+ */
+async function loadCSVFileToPython(file) {
+    if (!pythonReady) {
+        throw new Error('Python environment not ready');
+    }
+    
+    try {
+        await runPython(`
+from ingestion import CSVIngestor
+csv_ingestor = CSVIngestor()
         `);
         
+        const feed = pyodide.globals.get('csv_ingestor').feed;
+        const decoder = new TextDecoder('utf-8');
+        for (let start = 0; start < file.size; start += CSV_CHUNK_BYTES) {
+            const buffer = await file.slice(start, start + CSV_CHUNK_BYTES).arrayBuffer();
+            // stream: true keeps multi-byte characters split across slices intact
+            feed(decoder.decode(buffer, { stream: true }));
+        }
+        feed(decoder.decode());
+        feed.destroy();
+        
+        await finishCSVIngestion();
         return true;
     } catch (error) {
         console.error('Failed to load CSV to Python:', error);
@@ -249,6 +374,16 @@ df = pd.read_csv(io.StringIO(csv_text))
     }
 }
 
+/**
+ * Materialize the DataFrame and column profile from the active CSV ingestor
+ */
+async function finishCSVIngestion() {
+    await runPython(`
+df, column_profile = csv_ingestor.finish()
+del csv_ingestor
+    `);
+}
+
 /**
  * Load Excel data into Python pandas DataFrame
  */
@@ -267,6 +402,7 @@ import pandas as pd
 import io
 
 df = pd.read_excel(io.BytesIO(excel_data.tobytes()))
+column_profile = None
         `);
         
         return true;
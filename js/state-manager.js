@@ -32,10 +32,17 @@ class StateManager {
                     kendall: false
                 },
                 calculateVIF: true,
+                pairwiseComplete: true,   // correlations use each pair's complete rows
+                correlationScreening: null,   // {threshold, topK}: sparse edge lists for wide tables
                 regressionModels: {
                     linear: true,
                     polynomial: false
                 },
+                polynomialInteractionOnly: false,   // polynomial terms: products of distinct IVs only
+                polynomialRidge: 0,   // ridge penalty, relative to each term's sum of squares
+                polynomialMemoryMB: 64,   // working memory for the polynomial expansion
+                bootstrap: null,   // {replicates, confidence, method: 'bca'|'percentile', seed}: CIs for coefficients and Pearson r
+                crossValidation: null,   // {folds, seed}: out-of-sample RMSE/R² for each regression model
                 assumptionTests: {
                     homoscedasticity: true,
                     independence: true,
@@ -146,7 +153,9 @@ class StateManager {
                 ...this.state,
                 rawData: null // Don't persist raw data
             };
-            localStorage.setItem('eda_tool_state', JSON.stringify(stateToSave));
+            // Typed arrays from columnar results are stored as plain arrays
+            localStorage.setItem('eda_tool_state', JSON.stringify(stateToSave,
+                (key, value) => ArrayBuffer.isView(value) ? Array.from(value) : value));
         } catch (error) {
             console.error('Failed to save state:', error);
         }
@@ -201,10 +210,17 @@ class StateManager {
                     kendall: false
                 },
                 calculateVIF: true,
+                pairwiseComplete: true,
+                correlationScreening: null,
                 regressionModels: {
                     linear: true,
                     polynomial: false
                 },
+                polynomialInteractionOnly: false,
+                polynomialRidge: 0,
+                polynomialMemoryMB: 64,
+                bootstrap: null,
+                crossValidation: null,
                 assumptionTests: {
                     homoscedasticity: true,
                     independence: true,
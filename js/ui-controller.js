@@ -185,8 +185,7 @@ class UIController {
             let data;
             
             if (extension === 'csv') {
-                data = await file.text();
-                await loadCSVtoPython(data);
+                await loadCSVFileToPython(file);
             } else {
                 data = await file.arrayBuffer();
                 await loadExceltoPython(data);
@@ -499,10 +498,11 @@ class UIController {
             const result = await runPython(`
 import json
 from preprocessing import assess_data_quality
+from serialization import to_json
 
 selected_columns = json.loads(selected_columns_json)
-quality_report = assess_data_quality(df, selected_columns)
-json.dumps(quality_report)
+quality_report = assess_data_quality(df, selected_columns, profile=globals().get('column_profile'))
+to_json(quality_report)
             `);
             
             const qualityReport = JSON.parse(result);
@@ -634,18 +634,19 @@ json.dumps(quality_report)
 
         try {
             const selectedColumns = [...stateManager.get('selectedIVs'), ...stateManager.get('selectedDVs')];
+            await loadAnalysisPackages(stateManager.get('config'), ['distributions']);
             setPythonVariable('selected_columns_json', JSON.stringify(selectedColumns));
 
-            const result = await runPython(`
+            const distResults = await runPythonColumnar(`
 import json
 from distribution import analyze_distributions
+from serialization import to_columnar
 
 selected_columns = json.loads(selected_columns_json)
 dist_results = analyze_distributions(df, selected_columns)
-json.dumps(dist_results)
+to_columnar(dist_results)
             `);
             
-            const distResults = JSON.parse(result);
             stateManager.setState({ distributionTests: distResults });
             
             this.displayDistributionResults(distResults);
@@ -681,7 +682,7 @@ json.dumps(dist_results)
                     <div style="margin-top: 1rem;">
                         <p><strong>Normality Tests:</strong></p>
                         <ul style="margin-left: 1.5rem;">
-                            <li>Shapiro-Wilk: ${formatPValue(result.shapiro_p)} ${result.is_normal ? '✓' : '❌'}</li>
+                            <li>${normalityTestName(result.normality_test)}: ${formatPValue(result.normality_p)} ${result.is_normal ? '✓' : '❌'}</li>
                             <li>Skewness: ${formatNumber(result.skewness)}</li>
                             <li>Kurtosis: ${formatNumber(result.kurtosis)}</li>
                         </ul>
@@ -699,20 +700,38 @@ json.dumps(dist_results)
         
         // Create plots using Plotly
         for (let column in results) {
-            this.createHistogram(column, results[column].values);
+            this.createHistogram(column, results[column].histogram, results[column].kde);
         }
     }
     
     /**
-     * Create histogram
+     * Create histogram from server-side bins, with the KDE curve scaled to counts
      */
-    createHistogram(column, values) {
+    createHistogram(column, histogram, kde) {
+        const edges = Array.from(histogram.edges);
+        const counts = Array.from(histogram.counts);
+        const widths = counts.map((_, i) => edges[i + 1] - edges[i]);
         const data = [{
-            x: values,
-            type: 'histogram',
+            x: counts.map((_, i) => (edges[i] + edges[i + 1]) / 2),
+            y: counts,
+            width: widths,
+            type: 'bar',
+            name: 'Frequency',
             marker: { color: '#2563eb' }
         }];
         
+        if (kde && counts.length > 0) {
+            const total = counts.reduce((a, b) => a + b, 0);
+            data.push({
+                x: Array.from(kde.x),
+                y: Array.from(kde.density, d => d * total * widths[0]),
+                type: 'scatter',
+                mode: 'lines',
+                name: 'Density',
+                line: { color: '#f59e0b' }
+            });
+        }
+        
         const layout = {
             title: `Distribution of ${column}`,
             xaxis: { title: column },
@@ -18,6 +18,18 @@ function formatPValue(p) {
     return `p = ${p.toFixed(3)}`;
 }
 
+/**
+ * Display name of the normality test a result's verdict is based on
+ */
+function normalityTestName(test) {
+    const names = {
+        shapiro: 'Shapiro-Wilk',
+        dagostino: "D'Agostino-Pearson",
+        jarque_bera: 'Jarque-Bera'
+    };
+    return names[test] || 'Normality test';
+}
+
 /**
  * Get significance stars based on p-value
  */
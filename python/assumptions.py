@@ -2,94 +2,121 @@
 
 import pandas as pd
 import numpy as np
-from scipy import stats
-from statsmodels.stats.diagnostic import het_breuschpagan
-from statsmodels.stats.stattools import durbin_watson
-from statsmodels.tools.tools import add_constant
+from ols import cached_batch_fit, data_fingerprint, fit_cache_key
+from lazy import LazyModule
+from normality import batch_normality, sample_moments
 
-def convert_numpy_types(obj):
-    """
-    Recursively convert numpy types to native Python types for JSON serialization
-    """
-    if isinstance(obj, dict):
-        return {key: convert_numpy_types(value) for key, value in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_numpy_types(item) for item in obj]
-    elif isinstance(obj, np.integer):
-        return int(obj)
-    elif isinstance(obj, np.floating):
-        return float(obj)
-    elif isinstance(obj, np.bool_):
-        return bool(obj)
-    elif isinstance(obj, np.ndarray):
-        return obj.tolist()
-    else:
-        return obj
+stats = LazyModule('scipy.stats')
 
-def test_all_assumptions(df, ivs, dvs):
+def test_all_assumptions(df, ivs, dvs, executor=None):
     """
     Test all regression assumptions
+
+    Fits come from the shared fit cache (misses are fitted in one batch)
+    and every test runs on the n x k matrices of fitted values and
+    residuals of all DVs at once (batch_assumptions). Residual normality
+    uses the batched tests of normality.batch_normality, as for the
+    variables themselves; its Shapiro-Wilk runs go to the executor.
     """
-    results = {}
+    if not dvs:
+        return {}
+    fingerprint = data_fingerprint(df, ivs + dvs)
+    X = df[ivs].values
+    Y = df[dvs].values
     
-    for dv in dvs:
-        X = df[ivs].values
-        y = df[dv].values
-        
-        # Fit model to get residuals
-        from sklearn.linear_model import LinearRegression
-        model = LinearRegression()
-        model.fit(X, y)
-        y_pred = model.predict(X)
-        residuals = y - y_pred
-        
+    # Reuse the regression fits from modeling when available
+    fits = cached_batch_fit([fit_cache_key(fingerprint, ivs, dv) for dv in dvs], X, Y)
+    fitted = np.column_stack([fit.fitted for fit in fits])
+    residuals = np.column_stack([fit.residuals for fit in fits])
+    
+    # All fits share the design's column space, so any of their factorizations serves
+    results = dict(zip(dvs, batch_assumptions(fits[0].factorization, fitted, residuals)))
+
+    # 4. Normality of residuals, batched over all DVs
+    normality = batch_normality([r[~np.isnan(r)] for r in residuals.T], sample_moments(residuals),
+                                executor=executor, names=dvs)
+    for dv, tests in zip(dvs, normality):
+        results[dv]['normality_residuals'] = dict(tests, passed=tests['is_normal'])
+
+    return results
+
+def batch_assumptions(factorization, fitted, residuals):
+    """
+    Linearity, independence and homoscedasticity for every column of n x k fitted values and residuals
+
+    Each test is a few column reductions over the whole matrix. The
+    Breusch-Pagan auxiliary regressions of the squared residuals on the
+    design all reuse factorization (an ols.DesignFactorization of the
+    design), as a projection of the n x k matrix onto its column space.
+    Residual normality is tested for all DVs at once in test_all_assumptions.
+    """
+    linearity = column_correlations(fitted, residuals)
+    durbin_watson = durbin_watson_batch(residuals)
+    bp_stat, bp_pvalue = breusch_pagan_batch(factorization, residuals)
+
+    results = []
+    for j in range(residuals.shape[1]):
         dv_assumptions = {}
         
         # 1. Linearity (using residuals vs fitted)
-        linearity_corr = np.corrcoef(y_pred, residuals)[0, 1]
         dv_assumptions['linearity'] = {
-            'correlation': float(linearity_corr),
-            'passed': bool(abs(linearity_corr) < 0.1)
+            'correlation': float(linearity[j]),
+            'passed': bool(abs(linearity[j]) < 0.1)
         }
         
         # 2. Independence (Durbin-Watson)
-        dw_stat = durbin_watson(residuals)
         dv_assumptions['independence'] = {
-            'durbin_watson': float(dw_stat),
-            'passed': bool(1.5 < dw_stat < 2.5)
+            'durbin_watson': float(durbin_watson[j]),
+            'passed': bool(1.5 < durbin_watson[j] < 2.5)
         }
         
         # 3. Homoscedasticity (Breusch-Pagan)
-        try:
-            X_with_const = add_constant(X)
-            bp_stat, bp_pvalue, _, _ = het_breuschpagan(residuals, X_with_const)
+        if np.isfinite(bp_pvalue[j]):
             dv_assumptions['homoscedasticity'] = {
-                'breusch_pagan_stat': float(bp_stat),
-                'breusch_pagan_pvalue': float(bp_pvalue),
-                'passed': bool(bp_pvalue > 0.05)
+                'breusch_pagan_stat': float(bp_stat[j]),
+                'breusch_pagan_pvalue': float(bp_pvalue[j]),
+                'passed': bool(bp_pvalue[j] > 0.05)
             }
-        except:
+        else:
             dv_assumptions['homoscedasticity'] = {
                 'error': 'Could not compute Breusch-Pagan test',
                 'passed': None
             }
-        
-        # 4. Normality of residuals (Shapiro-Wilk)
-        if len(residuals) < 5000:
-            sw_stat, sw_pvalue = stats.shapiro(residuals)
-            dv_assumptions['normality_residuals'] = {
-                'shapiro_wilk_stat': float(sw_stat),
-                'shapiro_wilk_pvalue': float(sw_pvalue),
-                'passed': bool(sw_pvalue > 0.05)
-            }
-        else:
-            # Use Anderson-Darling for large samples
-            anderson_result = stats.anderson(residuals)
-            dv_assumptions['normality_residuals'] = {
-                'anderson_stat': float(anderson_result.statistic),
-                'passed': bool(anderson_result.statistic < anderson_result.critical_values[2])
-            }
-        
-        results[dv] = dv_assumptions
+        results.append(dv_assumptions)
+    
+    return results
+
+def column_correlations(a, b):
+    """
+    Pearson correlation of each column of a with the same column of b (NaN when either is constant)
+    """
+    a = a - a.mean(axis=0)
+    b = b - b.mean(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (a * b).sum(axis=0) / np.sqrt((a * a).sum(axis=0) * (b * b).sum(axis=0))
+
+def durbin_watson_batch(residuals):
+    """
+    Durbin-Watson statistic of every residual column (statsmodels.stats.stattools.durbin_watson)
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (np.diff(residuals, axis=0) ** 2).sum(axis=0) / (residuals ** 2).sum(axis=0)
 
-    return convert_numpy_types(results)
+def breusch_pagan_batch(factorization, residuals):
+    """
+    Breusch-Pagan LM statistics and p-values for every residual column
+
+    The studentized (Koenker) form that statsmodels' het_breuschpagan
+    computes by default: n R^2 of the regression of the squared residuals
+    on the design, chi-squared with one degree of freedom per design
+    column besides the intercept.
+    """
+    squared = residuals ** 2
+    explained = factorization.project(squared)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        total = ((squared - squared.mean(axis=0)) ** 2).sum(axis=0)
+        r_squared = 1 - ((squared - explained) ** 2).sum(axis=0) / total
+    lm = factorization.n * r_squared
+    dof = factorization.p
+    pvalue = stats.chi2.sf(lm, dof) if dof > 0 else np.full(lm.shape, np.nan)
+    return lm, pvalue
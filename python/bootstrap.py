@@ -0,0 +1,378 @@
+# bootstrap.py - Bootstrap confidence intervals from batched weighted moments
+
+import uuid
+import numpy as np
+from executor import parallel_map
+from lazy import LazyModule
+from ols import GramFactorization
+
+# Defaults for config 'bootstrap' ({replicates, confidence, method, seed})
+BOOTSTRAP_REPLICATES = 1000
+BOOTSTRAP_CONFIDENCE = 0.95
+BOOTSTRAP_SEED = 0
+BOOTSTRAP_METHODS = ('percentile', 'bca')
+# Most replicates per chunk; chunks are the units run on the executor
+BOOTSTRAP_CHUNK_REPLICATES = 250
+# Working memory for the row products and one chunk's resample weights, in bytes;
+# the products are kept across chunks when they fit in half of it
+BOOTSTRAP_MEMORY_BUDGET = 256 * 2 ** 20
+
+special = LazyModule('scipy.special')
+
+# Product matrix rebuilt in a worker process, as (token, matrix): the latest statistic only
+_worker_products = (None, None)
+
+class RowMoments:
+    """
+    Statistics that are functions of (weighted) sums of per-row products
+
+    Subclasses define row_products(rows) and evaluate(sums); the product
+    matrix is computed once and reused by every chunk when it fits. It is
+    left out when the statistic is pickled for a process pool: each worker
+    process rebuilds it once, on the first chunk it receives, and keeps it
+    for the later chunks of the same statistic.
+    """
+    cached = None
+    token = None
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state.pop('cached', None)
+        return state
+
+    def __setstate__(self, state):
+        global _worker_products
+        self.__dict__.update(state)
+        if self.token is not None:
+            if _worker_products[0] != self.token:
+                # Release the previous statistic's matrix before building this one
+                _worker_products = (None, None)
+                _worker_products = (self.token, self.row_products(slice(None)))
+            self.cached = _worker_products[1]
+
+    def products(self, rows):
+        """
+        Row-level terms whose (weighted) sums determine the statistics, n_rows x m
+        """
+        if self.cached is not None:
+            return self.cached[rows]
+        return self.row_products(rows)
+
+    def width(self):
+        """
+        Number of row products m
+        """
+        return self.row_products(slice(0, 1)).shape[1]
+
+    def cache(self, memory_budget):
+        """
+        Keep the full product matrix when it fits in memory_budget bytes
+        """
+        if self.cached is None and 8 * self.n * self.width() <= memory_budget:
+            self.cached = self.row_products(slice(None))
+            self.token = uuid.uuid4().hex
+        return self
+
+class PearsonMoments(RowMoments):
+    """
+    Pearson correlations of every column pair as a function of weighted row sums
+
+    Rows are centred on the column means first. Without missing values the
+    row products are [1, x, x^2, x_i x_j]; otherwise each pair also carries
+    its row mask, so a replicate sees exactly the pairwise-complete rows
+    calculate_all_correlations uses.
+    """
+    def __init__(self, values):
+        values = np.asarray(values, dtype=float)
+        self.n, self.p = values.shape
+        self.values = values - np.nan_to_num(np.nanmean(values, axis=0)) if len(values) else values
+        self.missing = bool(np.isnan(values).any())
+        self.left, self.right = np.triu_indices(self.p, 1)
+
+    def row_products(self, rows):
+        x = self.values[rows]
+        if not self.missing:
+            return np.column_stack([np.ones(len(x)), x, x * x, x[:, self.left] * x[:, self.right]])
+        mask = (~np.isnan(x)).astype(float)
+        x = np.nan_to_num(x)
+        xl, xr = x[:, self.left], x[:, self.right]
+        ml, mr = mask[:, self.left], mask[:, self.right]
+        return np.column_stack([ml * mr, xl * mr, ml * xr, xl * xl * mr, ml * xr * xr, xl * xr])
+
+    def evaluate(self, sums):
+        """
+        Correlation of each pair (columns) for each set of row sums (rows)
+        """
+        q = len(self.left)
+        if not self.missing:
+            p = self.p
+            count = sums[:, :1]
+            sx, sxx = sums[:, 1:1 + p], sums[:, 1 + p:1 + 2 * p]
+            sxl, sxr = sx[:, self.left], sx[:, self.right]
+            sxxl, sxxr = sxx[:, self.left], sxx[:, self.right]
+            sxy = sums[:, 1 + 2 * p:]
+        else:
+            count, sxl, sxr, sxxl, sxxr, sxy = (sums[:, b * q:(b + 1) * q] for b in range(6))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = count * sxy - sxl * sxr
+            var_l = count * sxxl - sxl * sxl
+            var_r = count * sxxr - sxr * sxr
+            r = cov / np.sqrt(var_l * var_r)
+        return np.clip(r, -1.0, 1.0)
+
+class RegressionMoments(RowMoments):
+    """
+    OLS coefficients [intercept, slopes] of every target as a function of weighted row sums
+
+    The row products are [1, z, z_a z_b] for z = [X, Y] centred on the
+    column means; each set of sums gives a centred Gram matrix, solved for
+    all targets at once. Returns (p + 1) * k statistics per set, target-major.
+    """
+    def __init__(self, X, Y):
+        X = np.asarray(X, dtype=float)
+        Y = np.asarray(Y, dtype=float).reshape(len(X), -1)
+        self.n, self.p = X.shape
+        self.k = Y.shape[1]
+        values = np.column_stack([X, Y])
+        self.center = values.mean(axis=0)
+        self.values = values - self.center
+        self.left, self.right = np.triu_indices(self.p + self.k)
+
+    def row_products(self, rows):
+        z = self.values[rows]
+        return np.column_stack([np.ones(len(z)), z, z[:, self.left] * z[:, self.right]])
+
+    def evaluate(self, sums):
+        """
+        Coefficients for each set of row sums (rows); singular replicates are NaN
+        """
+        d = self.p + self.k
+        count = sums[:, 0]
+        mean = sums[:, 1:1 + d] / count[:, None]
+        cross = np.empty((len(sums), d, d))
+        cross[:, self.left, self.right] = sums[:, 1 + d:]
+        cross[:, self.right, self.left] = sums[:, 1 + d:]
+        comoment = cross - count[:, None, None] * mean[:, :, None] * mean[:, None, :]
+
+        gram = comoment[:, :self.p, :self.p]
+        xty = comoment[:, :self.p, self.p:]
+        # Unit diagonal, as in ols.GramFactorization, so conditioning does not depend on units
+        scale = np.sqrt(np.maximum(np.diagonal(gram, axis1=1, axis2=2), np.finfo(float).tiny))
+        scaled = gram / (scale[:, :, None] * scale[:, None, :])
+        slopes = np.full((len(sums), self.p, self.k), np.nan)
+        try:
+            slopes = np.linalg.solve(scaled, xty / scale[:, :, None])
+        except np.linalg.LinAlgError:
+            # Some replicate is singular: solve the rest one by one
+            for b in range(len(sums)):
+                try:
+                    slopes[b] = np.linalg.solve(scaled[b], xty[b] / scale[b, :, None])
+                except np.linalg.LinAlgError:
+                    pass
+        slopes = slopes / scale[:, :, None]
+
+        x_mean = mean[:, :self.p] + self.center[:self.p]
+        y_mean = mean[:, self.p:] + self.center[self.p:]
+        intercepts = y_mean - np.einsum('bp,bpk->bk', x_mean, slopes)
+        params = np.concatenate([intercepts[:, None, :], slopes], axis=1)
+        return params.transpose(0, 2, 1).reshape(len(sums), -1)
+
+def resample_weights(rng, replicates, n):
+    """
+    Row multiplicities of replicates bootstrap resamples of n rows, replicates x n
+    """
+    draws = rng.integers(0, n, size=(replicates, n)) + n * np.arange(replicates)[:, None]
+    return np.bincount(draws.ravel(), minlength=replicates * n).reshape(replicates, n).astype(float)
+
+def weighted_sums(statistic, weights, memory_budget=BOOTSTRAP_MEMORY_BUDGET):
+    """
+    weights @ statistic.products(all rows), built over row blocks within the budget
+    """
+    if statistic.cached is not None:
+        return weights @ statistic.cached
+    m = statistic.width()
+    block = max(1, memory_budget // (2 * 8 * m))
+    sums = np.zeros((len(weights), m))
+    for start in range(0, statistic.n, block):
+        rows = slice(start, start + block)
+        sums += weights[:, rows] @ statistic.products(rows)
+    return sums
+
+def bootstrap_chunk(unit):
+    """
+    Replicate statistics for one chunk; unit is (statistic, seed, replicates, memory_budget)
+
+    The weights are drawn in blocks of replicates that fit the budget, from
+    one generator, so the values do not depend on the block size.
+    """
+    statistic, seed, replicates, memory_budget = unit
+    rng = np.random.default_rng(seed)
+    # Weights as floats plus the integer draws they are counted from
+    block = int(max(1, memory_budget // (2 * 2 * 8 * max(statistic.n, 1))))
+    return np.vstack([
+        statistic.evaluate(weighted_sums(statistic, resample_weights(rng, min(block, replicates - start), statistic.n),
+                                         memory_budget))
+        for start in range(0, replicates, block)
+    ])
+
+def jackknife_acceleration(statistic, estimate, memory_budget=BOOTSTRAP_MEMORY_BUDGET):
+    """
+    BCa acceleration of each statistic from its leave-one-out values
+
+    Leaving row i out subtracts its products from the full sums, so the n
+    jackknife values cost one evaluation each and no refits. Deviations
+    are taken from the full-sample estimate and converted to central
+    moments, so blocks of rows are evaluated once.
+    """
+    n = statistic.n
+    total = weighted_sums(statistic, np.ones((1, n)), memory_budget)
+    block = max(1, memory_budget // (4 * 8 * max(total.shape[1], len(estimate))))
+    power_sums = np.zeros((3, len(estimate)))
+    count = np.zeros(len(estimate))
+    for start in range(0, n, block):
+        deviation = statistic.evaluate(total - statistic.products(slice(start, start + block))) - estimate
+        valid = np.isfinite(deviation)
+        deviation = np.where(valid, deviation, 0.0)
+        count += valid.sum(axis=0)
+        power_sums += [deviation.sum(axis=0), (deviation ** 2).sum(axis=0), (deviation ** 3).sum(axis=0)]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        shift = power_sums[0] / count
+        second = power_sums[1] - count * shift ** 2
+        third = power_sums[2] - 3 * shift * power_sums[1] + 2 * count * shift ** 3
+        # Sum of (mean - theta_i)^3 is minus the third central sum of the theta_i
+        return -third / (6 * second ** 1.5)
+
+def column_quantiles(replicates, q):
+    """
+    Quantile q[j] of column j over its finite values (linear interpolation, as np.quantile)
+    """
+    ordered = np.sort(np.where(np.isfinite(replicates), replicates, np.inf), axis=0)
+    valid = np.isfinite(replicates).sum(axis=0)
+    position = q * (valid - 1)
+    lower = np.clip(np.floor(np.nan_to_num(position)), 0, np.maximum(valid - 1, 0)).astype(np.int64)
+    upper = np.minimum(lower + 1, np.maximum(valid - 1, 0))
+    columns = np.arange(replicates.shape[1])
+    frac = np.nan_to_num(position) - lower
+    with np.errstate(invalid='ignore'):
+        result = ordered[lower, columns] * (1 - frac) + ordered[upper, columns] * frac
+    result[(valid == 0) | ~np.isfinite(q)] = np.nan
+    return result
+
+def bootstrap_intervals(statistic, replicates=BOOTSTRAP_REPLICATES, confidence=BOOTSTRAP_CONFIDENCE,
+                        method='bca', seed=BOOTSTRAP_SEED, executor=None, memory_budget=BOOTSTRAP_MEMORY_BUDGET):
+    """
+    Bootstrap confidence intervals for every statistic of a PearsonMoments / RegressionMoments
+
+    Each replicate is a vector of row multiplicities, and all of a chunk's
+    replicates are evaluated from one product of the replicates x n weight
+    matrix with the n x m row products, never materializing a resample.
+    Chunks of BOOTSTRAP_CHUNK_REPLICATES get independent child seeds of
+    seed, so the intervals depend neither on the memory budget nor on how
+    the chunks are scheduled; they run on the executor when one is given.
+    method is 'percentile' or 'bca' (bias-corrected and accelerated, with
+    jackknife acceleration). Returns {'estimate', 'lower', 'upper',
+    'standard_error'} arrays plus the settings used.
+    """
+    if method not in BOOTSTRAP_METHODS:
+        raise ValueError(f"Unknown bootstrap method: {method}")
+    n = statistic.n
+    statistic.cache(memory_budget // 2)
+    estimate = statistic.evaluate(weighted_sums(statistic, np.ones((1, n)), memory_budget))[0]
+
+    chunk = BOOTSTRAP_CHUNK_REPLICATES
+    sizes = [min(chunk, replicates - start) for start in range(0, replicates, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    units = [(statistic, s, size, memory_budget) for s, size in zip(seeds, sizes)]
+    names = [f"replicates {start}-{start + size - 1}" for start, size in zip(range(0, replicates, chunk), sizes)]
+    samples = np.vstack(parallel_map(bootstrap_chunk, units, executor, names=names))
+
+    alpha = (1 - confidence) / 2
+    q = np.array([alpha, 1 - alpha])
+    if method == 'bca':
+        with np.errstate(divide='ignore', invalid='ignore'):
+            below = (samples < estimate).sum(axis=0) / np.isfinite(samples).sum(axis=0)
+            z0 = special.ndtri(below)
+            accel = jackknife_acceleration(statistic, estimate, memory_budget)
+            z = special.ndtri(q)[:, None]
+            q = special.ndtr(z0 + (z0 + z) / (1 - accel * (z0 + z)))
+    else:
+        q = np.repeat(q[:, None], len(estimate), axis=1)
+
+    return {
+        'estimate': estimate,
+        'lower': column_quantiles(samples, q[0]),
+        'upper': column_quantiles(samples, q[1]),
+        'standard_error': np.nanstd(samples, axis=0, ddof=1) if replicates > 1 else np.full(len(estimate), np.nan),
+        'replicates': replicates,
+        'confidence': confidence,
+        'method': method
+    }
+
+def bootstrap_options(config):
+    """
+    (replicates, confidence, method, seed) from config 'bootstrap', or None when it is off
+    """
+    options = config.get('bootstrap')
+    if not options:
+        return None
+    if options is True:
+        options = {}
+    return (int(options.get('replicates', BOOTSTRAP_REPLICATES)), float(options.get('confidence', BOOTSTRAP_CONFIDENCE)),
+            options.get('method', 'bca'), options.get('seed', BOOTSTRAP_SEED))
+
+def correlation_intervals(values, options, executor=None):
+    """
+    Bootstrap intervals for every entry of the pairwise Pearson matrix, as k x k arrays
+
+    options is (replicates, confidence, method, seed) from bootstrap_options.
+    """
+    replicates, confidence, method, seed = options
+    statistic = PearsonMoments(values)
+    result = bootstrap_intervals(statistic, replicates, confidence, method, seed, executor)
+    intervals = {'replicates': replicates, 'confidence': confidence, 'method': method}
+    for key, diagonal in [('lower', 1.0), ('upper', 1.0), ('standard_error', 0.0)]:
+        matrix = np.full((statistic.p, statistic.p), diagonal)
+        matrix[statistic.left, statistic.right] = result[key]
+        matrix[statistic.right, statistic.left] = result[key]
+        intervals[key] = matrix
+    return intervals
+
+def coefficient_intervals(X, Y, feature_names, target_names, options, executor=None):
+    """
+    Bootstrap intervals for the intercept and slopes of every target's linear model
+
+    Columns aliased in the full data (dropped by the fit) are left out of
+    the replicate fits and get no interval. Returns one dict per target
+    with [lower, upper] per coefficient and the bootstrap standard errors.
+    """
+    replicates, confidence, method, seed = options
+    X = np.asarray(X, dtype=float)
+    centered = X - X.mean(axis=0)
+    factorization = GramFactorization(centered.T @ centered)
+    kept = np.sort(factorization.pivot[:factorization.rank])
+    result = bootstrap_intervals(RegressionMoments(X[:, kept], Y), replicates, confidence, method, seed, executor)
+
+    names = ['intercept'] + [feature_names[j] for j in kept]
+    size = len(names)
+    intervals = []
+    for t in range(len(target_names)):
+        block = slice(t * size, (t + 1) * size)
+        bounds = {name: finite_bounds(lo, hi) for name, lo, hi in zip(names, result['lower'][block], result['upper'][block])}
+        errors = {name: float(e) if np.isfinite(e) else None for name, e in zip(names, result['standard_error'][block])}
+        intervals.append({
+            'intercept': bounds['intercept'],
+            'intercept_std_error': errors['intercept'],
+            'coefficients': {name: bounds.get(name) for name in feature_names},
+            'std_errors': {name: errors.get(name) for name in feature_names},
+            'replicates': replicates,
+            'confidence': confidence,
+            'method': method
+        })
+    return intervals
+
+def finite_bounds(lower, upper):
+    """
+    [lower, upper] as floats, or None when either bound is undefined
+    """
+    return [float(lower), float(upper)] if np.isfinite(lower) and np.isfinite(upper) else None
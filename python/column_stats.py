@@ -0,0 +1,99 @@
+# column_stats.py - Shared per-column descriptive statistics cache
+
+from collections import OrderedDict
+import hashlib
+import threading
+import warnings
+import pandas as pd
+import numpy as np
+
+# Maximum number of column summaries kept (each is a handful of floats)
+STATS_CACHE_SIZE = 1024
+
+STAT_NAMES = ['count', 'missing', 'mean', 'std', 'min', 'q1', 'median', 'q3', 'max', 'skewness', 'kurtosis']
+
+_stats_cache = OrderedDict()
+_cache_stats = {'hits': 0, 'misses': 0}
+_cache_lock = threading.Lock()
+
+def column_fingerprint(series):
+    """
+    Content hash of one column; changes whenever its values or row order change
+    """
+    hashed = pd.util.hash_pandas_object(series, index=False).values
+    return (series.name, len(series), hashlib.sha1(hashed.tobytes()).hexdigest())
+
+def column_statistics(df, columns):
+    """
+    Descriptive statistics for the given columns, computed once per column content
+
+    Returns a DataFrame indexed by STAT_NAMES with one column per variable.
+    Missing values are skipped, as with df[col].dropna(); skewness and
+    kurtosis are the biased (scipy default) estimators. Columns whose
+    contents are unchanged since an earlier call are served from the cache,
+    so a column is only rescanned after preprocessing has modified it.
+    """
+    keys = [column_fingerprint(df[col]) for col in columns]
+    with _cache_lock:
+        stale = {}
+        for col, key in zip(columns, keys):
+            if key in _stats_cache:
+                _stats_cache.move_to_end(key)
+                _cache_stats['hits'] += 1
+            elif col not in stale:
+                stale[col] = key
+
+        computed = compute_statistics(df[list(stale)]) if stale else None
+        for col, key in stale.items():
+            _stats_cache[key] = computed[col]
+            _cache_stats['misses'] += 1
+
+        result = pd.DataFrame({col: _stats_cache[key] for col, key in zip(columns, keys)}, index=STAT_NAMES)
+        while len(_stats_cache) > STATS_CACHE_SIZE:
+            _stats_cache.popitem(last=False)
+    return result
+
+def compute_statistics(df):
+    """
+    Vectorized descriptive statistics for every column of df, without caching
+    """
+    values = df.to_numpy(dtype=float)
+    present = ~np.isnan(values)
+    count = present.sum(axis=0)
+
+    with warnings.catch_warnings(), np.errstate(divide='ignore', invalid='ignore'):
+        warnings.simplefilter('ignore', RuntimeWarning)
+        mean = np.nanmean(values, axis=0)
+        dev = values - mean
+        m2 = np.nanmean(dev ** 2, axis=0)
+        m3 = np.nanmean(dev ** 3, axis=0)
+        m4 = np.nanmean(dev ** 4, axis=0)
+        quartiles = np.nanquantile(values, [0.25, 0.5, 0.75], axis=0)
+        stats_matrix = np.vstack([
+            count,
+            len(values) - count,
+            mean,
+            np.nanstd(values, axis=0, ddof=1),
+            np.nanmin(values, axis=0) if len(values) else np.full(values.shape[1], np.nan),
+            quartiles,
+            np.nanmax(values, axis=0) if len(values) else np.full(values.shape[1], np.nan),
+            np.where(m2 > 0, m3 / m2 ** 1.5, np.nan),
+            np.where(m2 > 0, m4 / m2 ** 2 - 3, np.nan)
+        ])
+
+    return pd.DataFrame(stats_matrix, index=STAT_NAMES, columns=df.columns)
+
+def stats_cache_info():
+    """
+    Snapshot of column statistics cache hit/miss counters
+    """
+    return dict(_cache_stats, size=len(_stats_cache))
+
+def clear_stats_cache():
+    """
+    Drop all cached column statistics and reset counters
+    """
+    with _cache_lock:
+        _stats_cache.clear()
+        _cache_stats['hits'] = 0
+        _cache_stats['misses'] = 0
@@ -2,32 +2,38 @@
 
 import pandas as pd
 import numpy as np
-from scipy import stats
-from statsmodels.stats.outliers_influence import variance_inflation_factor
+from lazy import LazyModule
+from kendall import kendall_matrix
+from bootstrap import bootstrap_options, correlation_intervals
 import json
 
-def convert_numpy_types(obj):
-    """
-    Recursively convert numpy types to native Python types for JSON serialization
-    """
-    if isinstance(obj, dict):
-        return {key: convert_numpy_types(value) for key, value in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_numpy_types(item) for item in obj]
-    elif isinstance(obj, np.integer):
-        return int(obj)
-    elif isinstance(obj, np.floating):
-        return float(obj)
-    elif isinstance(obj, np.bool_):
-        return bool(obj)
-    elif isinstance(obj, np.ndarray):
-        return obj.tolist()
-    else:
-        return obj
+# Condition number of the correlation matrix above which VIF scores are
+# flagged as unreliable (a condition index of ~30, Belsley et al.)
+VIF_NEAR_SINGULAR_CONDITION = 1e3
+# Relative eigenvalue tolerance below which the matrix is treated as singular
+VIF_SINGULAR_TOL = 1e-10
+# Pair variance, relative to its sum of squares, below which a column counts as constant on those rows
+PAIRWISE_CONSTANT_TOL = 1e-10
+# Rows x partner columns of rank arrays held at once by pairwise Spearman (~8MB each)
+PAIRWISE_BLOCK_ELEMENTS = 2 ** 20
+# Rows x columns of all the column tiles held at once in screening mode (~32MB per array)
+SCREEN_TILE_ELEMENTS = 2 ** 22
+# Most columns per tile, which bounds the tile's k x k working matrices
+SCREEN_TILE_COLUMNS = 256
+# Tiles screening keeps prepared at once, besides the tile being correlated with them
+SCREEN_PANEL_TILES = 4
+# |r| kept by screening when neither a threshold nor a top-k is configured
+SCREEN_DEFAULT_THRESHOLD = 0.5
+
+stats = LazyModule('scipy.stats')
 
-def calculate_all_correlations(df, selected_columns, config):
+def calculate_all_correlations(df, selected_columns, config, executor=None):
     """
     Calculate correlations using multiple methods
+
+    With config 'bootstrap' the Pearson result also gets bootstrap
+    confidence intervals for every entry ('bootstrap'), with the replicate
+    chunks run on the executor.
     """
     if isinstance(config, str):
         config = json.loads(config)
@@ -36,79 +42,606 @@ def calculate_all_correlations(df, selected_columns, config):
         'pearson': None,
         'spearman': None,
         'kendall': None,
-        'vif': None
+        'vif': None,
+        'vif_diagnostics': None
     }
     
+    # Missing values: each pair uses the rows where both columns are present
+    # (config 'pairwiseComplete', the default), or only fully complete rows
+    values = df[selected_columns].to_numpy(dtype=float)
+    if not config.get('pairwiseComplete', True):
+        values = values[~np.isnan(values).any(axis=1)]
+    
+    # Screening mode for wide tables: sparse edge lists instead of dense matrices
+    screening = config.get('correlationScreening')
+    if screening:
+        return screen_all_correlations(values, selected_columns, config, screening)
+    
     # Pearson correlation
     if config.get('correlationMethods', {}).get('pearson', True):
-        pearson_corr = df[selected_columns].corr(method='pearson')
-        pearson_pvalues = calculate_pvalues(df[selected_columns], method='pearson')
+        pearson_corr, pearson_counts = pairwise_pearson(values)
         results['pearson'] = {
-            'matrix': pearson_corr.values.tolist(),
-            'pvalues': pearson_pvalues.tolist(),
+            'matrix': pearson_corr,
+            'pvalues': pairwise_pvalues(pearson_corr, pearson_counts),
+            'counts': pearson_counts,
             'labels': selected_columns
         }
+        bootstrap = bootstrap_options(config)
+        if bootstrap:
+            results['pearson']['bootstrap'] = correlation_intervals(values, bootstrap, executor)
     
     # Spearman correlation
     if config.get('correlationMethods', {}).get('spearman', True):
-        spearman_corr = df[selected_columns].corr(method='spearman')
-        spearman_pvalues = calculate_pvalues(df[selected_columns], method='spearman')
+        spearman_corr, spearman_counts = pairwise_spearman(values)
         results['spearman'] = {
-            'matrix': spearman_corr.values.tolist(),
-            'pvalues': spearman_pvalues.tolist(),
+            'matrix': spearman_corr,
+            'pvalues': pairwise_pvalues(spearman_corr, spearman_counts),
+            'counts': spearman_counts,
             'labels': selected_columns
         }
     
-    # Kendall correlation
+    # Kendall correlation (tau-b and p-values from one count per pair)
     if config.get('correlationMethods', {}).get('kendall', False):
-        kendall_corr = df[selected_columns].corr(method='kendall')
-        kendall_pvalues = calculate_pvalues(df[selected_columns], method='kendall')
+        kendall_corr, kendall_pvalues = kendall_matrix(values)
         results['kendall'] = {
-            'matrix': kendall_corr.values.tolist(),
-            'pvalues': kendall_pvalues.tolist(),
+            'matrix': kendall_corr,
+            'pvalues': kendall_pvalues,
+            'counts': pair_counts(values),
             'labels': selected_columns
         }
     
-    # VIF calculation
+    # VIF calculation: each column regressed on all the others, so only on
+    # the rows complete in every column, whatever 'pairwiseComplete' says
     if config.get('calculateVIF', True) and len(selected_columns) > 1:
-        vif_scores = calculate_vif(df[selected_columns])
+        complete = values[~np.isnan(values).any(axis=1)]
+        if results['pearson'] and len(complete) == len(values):
+            corr = results['pearson']['matrix']
+        else:
+            corr = pairwise_pearson(complete)[0]
+        vif_scores, vif_diagnostics = vif_from_correlation(corr, selected_columns, len(complete))
         results['vif'] = vif_scores
+        results['vif_diagnostics'] = vif_diagnostics
 
-    return convert_numpy_types(results)
+    return results
 
-def calculate_pvalues(df, method='pearson'):
+def screen_all_correlations(values, selected_columns, config, screening):
     """
-    Calculate p-values for correlation matrix
+    Pearson and Spearman edge lists for config 'correlationScreening' ({'threshold', 'topK'})
+
+    Each enabled method gets {'edges', 'labels', 'pairs_tested',
+    'threshold', 'top_k'} in place of its matrices. Kendall and VIF need
+    the full matrix and are skipped.
     """
-    n = len(df.columns)
-    pvalues = np.zeros((n, n))
+    threshold = screening.get('threshold')
+    top_k = screening.get('topK')
+    if threshold is None and not top_k:
+        threshold = SCREEN_DEFAULT_THRESHOLD
     
-    for i in range(n):
-        for j in range(n):
-            if i != j:
-                if method == 'pearson':
-                    _, p = stats.pearsonr(df.iloc[:, i], df.iloc[:, j])
-                elif method == 'spearman':
-                    _, p = stats.spearmanr(df.iloc[:, i], df.iloc[:, j])
-                elif method == 'kendall':
-                    _, p = stats.kendalltau(df.iloc[:, i], df.iloc[:, j])
-                pvalues[i, j] = p
-            else:
-                pvalues[i, j] = 0.0
+    results = {
+        'pearson': None,
+        'spearman': None,
+        'kendall': None,
+        'vif': None,
+        'vif_diagnostics': None
+    }
+    methods = config.get('correlationMethods', {})
+    for method in ('pearson', 'spearman'):
+        if methods.get(method, True):
+            edges, pairs_tested = screen_correlations(values, method, threshold, top_k)
+            results[method] = {
+                'edges': edges,
+                'labels': selected_columns,
+                'pairs_tested': pairs_tested,
+                'threshold': threshold,
+                'top_k': top_k
+            }
+    return results
+
+def correlations_from_moments(moments, selected_columns, config):
+    """
+    Pearson correlations and VIF from streamed sufficient statistics alone
+
+    moments is a streaming.MomentAccumulator. Rank-based methods need the
+    full data and are not available in streaming mode.
+    """
+    if isinstance(config, str):
+        config = json.loads(config)
+    
+    results = {
+        'pearson': None,
+        'spearman': None,
+        'kendall': None,
+        'vif': None,
+        'vif_diagnostics': None
+    }
+    
+    corr = moments.correlation(selected_columns)
+    if config.get('correlationMethods', {}).get('pearson', True):
+        upper = np.triu_indices(len(selected_columns), k=1)
+        pvalues = np.zeros_like(corr)
+        pvalues[upper] = correlation_pvalues(corr[upper], moments.count)
+        pvalues[(upper[1], upper[0])] = pvalues[upper]
+        results['pearson'] = {
+            'matrix': corr,
+            'pvalues': pvalues,
+            'labels': selected_columns
+        }
     
+    if config.get('calculateVIF', True) and len(selected_columns) > 1:
+        results['vif'], results['vif_diagnostics'] = vif_from_correlation(corr, selected_columns, moments.count)
+
+    return results
+
+def calculate_pvalues(df, method='pearson', corr=None):
+    """
+    Calculate p-values for correlation matrix
+
+    Pearson and Spearman p-values are derived from the correlation matrix
+    itself (t-test with n - 2 degrees of freedom, as scipy does), so each
+    column is ranked once rather than once per pair; n is counted per pair
+    over the rows where both columns are present. Kendall p-values come
+    from kendall.kendall_matrix.
+    """
+    values = df.to_numpy(dtype=float)
+    if method in ('pearson', 'spearman'):
+        if corr is None:
+            corr = pairwise_pearson(values)[0] if method == 'pearson' else pairwise_spearman(values)[0]
+        return pairwise_pvalues(np.asarray(corr, dtype=float), pair_counts(values))
+    elif method == 'kendall':
+        return kendall_matrix(values)[1]
+    else:
+        raise ValueError(f"Unknown correlation method: {method}")
+
+def pair_counts(values):
+    """
+    Rows where both columns are present, for every pair of columns of a 2-D array
+    """
+    present = (~np.isnan(values)).astype(float)
+    return (present.T @ present).astype(np.int64)
+
+def pairwise_pearson(values):
+    """
+    Pairwise-complete Pearson correlations and per-pair counts of a 2-D array with NaN
+
+    Each pair of columns uses the rows where both are present. Rather than
+    a dropna per pair, the pair sums all come from masked matrix products
+    of the zero-filled values and the presence mask (pearson_tile), so the
+    cost is a few k x k Gram matrices whatever the pattern of missing
+    values. Pairs with fewer than 2 rows, or where a column is constant,
+    get NaN.
+    """
+    block = pearson_block(values)
+    corr, counts = pearson_tile(block, block)
+    np.fill_diagonal(corr, np.where(np.isnan(np.diag(corr)), np.nan, 1.0))
+    return corr, counts
+
+def pearson_block(values):
+    """
+    Zero-filled centered values, their squares and the presence mask of a block of columns
+
+    Columns are centered on their own mean to limit cancellation in the pair sums.
+    """
+    values = np.asarray(values, dtype=float)
+    present = ~np.isnan(values)
+    mask = present.astype(float)
+    column_counts = mask.sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = np.where(column_counts > 0, np.where(present, values, 0.0).sum(axis=0) / column_counts, 0.0)
+    centered = np.where(present, values - means, 0.0)
+    return centered, centered ** 2, mask
+
+def pearson_tile(a, b):
+    """
+    Pairwise-complete Pearson correlations and counts between the columns of two pearson_blocks
+    """
+    centered_a, squares_a, mask_a = a
+    centered_b, squares_b, mask_b = b
+    counts = mask_a.T @ mask_b
+    # Sums of each column of a over the rows where each column of b is present, and vice versa
+    sums_a = centered_a.T @ mask_b
+    sums_b = mask_a.T @ centered_b
+    squares_a = squares_a.T @ mask_b
+    squares_b = mask_a.T @ squares_b
+    cross = centered_a.T @ centered_b
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variation_a = squares_a - sums_a ** 2 / counts
+        variation_b = squares_b - sums_b ** 2 / counts
+        constant = (variation_a <= PAIRWISE_CONSTANT_TOL * squares_a) | (variation_b <= PAIRWISE_CONSTANT_TOL * squares_b)
+        corr = (cross - sums_a * sums_b / counts) / np.sqrt(variation_a * variation_b)
+    corr = np.clip(corr, -1.0, 1.0)
+    corr[constant | (counts < 2)] = np.nan
+    return corr, counts.astype(np.int64)
+
+def pairwise_spearman(values):
+    """
+    Pairwise-complete Spearman correlations and per-pair counts of a 2-D array with NaN
+
+    As with pandas, the two columns of a pair are ranked over the rows
+    where both are present. Without missing values that is one ranking
+    per column followed by pairwise_pearson. Otherwise each column is
+    still sorted only once: the rank of a value among the rows where
+    another column is present is a cumulative count of that column's
+    presence mask in sorted order, done for all partners of a column at
+    once (spearman_partners).
+    """
+    block = spearman_block(values)
+    if block['ranks'] is not None:
+        return pairwise_pearson(block['ranks'].T)
+
+    k = len(block['mask'])
+    corr = np.eye(k)
+    for i in range(k - 1):
+        partners = np.arange(i + 1, k)
+        corr[i, partners] = corr[partners, i] = spearman_partners(block, i, block, partners)
+
+    np.fill_diagonal(corr, np.where(block['constant'], np.nan, 1.0))
+    return corr, pair_counts(values)
+
+def spearman_block(values):
+    """
+    Sort order, tie groups and presence mask of a block of columns, stored as rows
+
+    Columns become rows so every scan and gather runs along contiguous
+    memory. Without missing values 'ranks' holds the average ranks (else None).
+    """
+    columns = np.ascontiguousarray(np.asarray(values, dtype=float).T)
+    # Ties get their group's average rank, so the order within a group does not matter
+    order = np.argsort(columns, axis=1)
+    first, last = tie_groups(np.take_along_axis(columns, order, axis=1))
+    present = ~np.isnan(columns)
+    ranks = None
+    if present.all():
+        ranks = np.empty(columns.shape)
+        np.put_along_axis(ranks, order, (first + last) / 2 + 1, axis=1)
+    return {
+        'order': order,
+        'first': first,
+        'last': last,
+        'mask': present.astype(float),
+        'ranks': ranks,
+        'constant': ~(np.where(present, columns, -np.inf).max(axis=1) > np.where(present, columns, np.inf).min(axis=1))
+    }
+
+def spearman_partners(a, i, b, partners):
+    """
+    Pairwise-complete Spearman correlations of column i of spearman_block a with columns partners of b
+    """
+    n = a['mask'].shape[1]
+    corr = np.empty(len(partners))
+    step = max(1, PAIRWISE_BLOCK_ELEMENTS // max(n, 1))
+    for start in range(0, len(partners), step):
+        chunk = partners[start:start + step]
+        # Ranks of column i among the rows where each partner is present...
+        own = np.empty((len(chunk), n))
+        own[:, a['order'][i]] = ranks_within(b['mask'][chunk][:, a['order'][i]], a['first'][i], a['last'][i])
+        # ...and of each partner among the rows where column i is present
+        other = np.empty((len(chunk), n))
+        np.put_along_axis(other, b['order'][chunk],
+                          ranks_within(a['mask'][i][b['order'][chunk]], b['first'][chunk], b['last'][chunk]), axis=1)
+        corr[start:start + step] = masked_rank_correlation(own, other, a['mask'][i] * b['mask'][chunk])
+    return corr
+
+class CorrelationScreen:
+    """
+    Sparse edge list of the strongest correlations, fed one tile of the matrix at a time
+
+    A pair is kept when |r| >= threshold (if set) and, with top_k, when it
+    is among the top_k strongest pairs of either of its variables. Memory
+    is O(columns x top_k) plus the kept edges, never the full matrix.
+    """
+    def __init__(self, n_columns, threshold=None, top_k=None):
+        self.n_columns = n_columns
+        self.threshold = threshold
+        self.top_k = top_k
+        self.pairs_tested = 0
+        self._edges = []
+        if top_k:
+            # Per variable: |r|, partner, r and count of its best pairs so far
+            self._strength = np.full((n_columns, top_k), -np.inf)
+            self._partner = np.full((n_columns, top_k), -1, dtype=np.int64)
+            self._corr = np.zeros((n_columns, top_k))
+            self._count = np.zeros((n_columns, top_k), dtype=np.int64)
+
+    def add(self, rows, cols, corr, counts):
+        """
+        Add a tile: corr[a, b] and counts[a, b] for variables rows[a] and cols[b]; pairs with rows[a] >= cols[b] are ignored
+        """
+        upper = rows[:, None] < cols[None, :]
+        self.pairs_tested += int(upper.sum())
+        strength = np.where(upper & np.isfinite(corr), np.abs(corr), -np.inf)
+        if self.threshold is not None:
+            strength[strength < self.threshold] = -np.inf
+        if not self.top_k:
+            a, b = np.nonzero(strength > -np.inf)
+            if len(a):
+                self._edges.append((rows[a], cols[b], corr[a, b], counts[a, b]))
+            return
+        self._merge(rows, cols, strength, corr, counts)
+        self._merge(cols, rows, strength.T, corr.T, counts.T)
+
+    def _merge(self, variables, partners, strength, corr, counts):
+        strength = np.hstack([self._strength[variables], strength])
+        partner = np.hstack([self._partner[variables], np.broadcast_to(partners, corr.shape)])
+        corr = np.hstack([self._corr[variables], corr])
+        counts = np.hstack([self._count[variables], counts])
+        keep = np.argpartition(-strength, self.top_k - 1, axis=1)[:, :self.top_k]
+        self._strength[variables] = np.take_along_axis(strength, keep, axis=1)
+        self._partner[variables] = np.take_along_axis(partner, keep, axis=1)
+        self._corr[variables] = np.take_along_axis(corr, keep, axis=1)
+        self._count[variables] = np.take_along_axis(counts, keep, axis=1)
+
+    def edges(self):
+        """
+        Kept pairs as {'source', 'target', 'r', 'count'} arrays (source < target), strongest first
+        """
+        if self.top_k:
+            found = self._strength > -np.inf
+            variable = np.broadcast_to(np.arange(self.n_columns)[:, None], found.shape)[found]
+            partner = self._partner[found]
+            source = np.minimum(variable, partner)
+            target = np.maximum(variable, partner)
+            # A pair in the top k of both of its variables is listed once
+            _, first = np.unique(source * self.n_columns + target, return_index=True)
+            source, target = source[first], target[first]
+            corr, counts = self._corr[found][first], self._count[found][first]
+        elif self._edges:
+            source, target, corr, counts = [np.concatenate(parts) for parts in zip(*self._edges)]
+        else:
+            source = target = counts = np.empty(0, dtype=np.int64)
+            corr = np.empty(0)
+        strongest = np.argsort(-np.abs(corr), kind='stable')
+        return {
+            'source': source[strongest],
+            'target': target[strongest],
+            'r': corr[strongest],
+            'count': counts[strongest]
+        }
+
+def screen_correlations(values, method='pearson', threshold=None, top_k=None, tile_elements=SCREEN_TILE_ELEMENTS):
+    """
+    Pairwise-complete correlations screened into a sparse edge list, one column tile pair at a time
+
+    The columns are split into tiles of about tile_elements / rows /
+    (SCREEN_PANEL_TILES + 1) columns (at most SCREEN_TILE_COLUMNS), so the
+    tiles held at once add up to about tile_elements values. They are
+    taken a panel of SCREEN_PANEL_TILES at a time: the panel's tiles are
+    prepared once and correlated with each other, then every later tile is
+    prepared once and correlated with the whole panel, so a tile is
+    prepared once per panel up to its own rather than once per tile pair.
+    Without missing values a prepared tile is its standardized (Spearman:
+    ranked) columns and a tile pair one matrix product (standardized_tile);
+    otherwise it is a screen_block. Each tile pair is passed to a
+    CorrelationScreen, so besides the data only the panel, one more tile
+    and the kept edges are ever held. Returns (edges with 'pvalue' added,
+    number of pairs tested).
+    """
+    if method not in ('pearson', 'spearman'):
+        raise ValueError(f"Correlation screening does not support method: {method}")
+    values = np.asarray(values, dtype=float)
+    n, k = values.shape
+    width = max(1, min(SCREEN_TILE_COLUMNS, tile_elements // (max(n, 1) * (SCREEN_PANEL_TILES + 1))))
+    tiles = [np.arange(start, min(start + width, k)) for start in range(0, k, width)]
+    screen = CorrelationScreen(k, threshold, top_k)
+    
+    if n >= 2 and not any(np.isnan(values[:, tile]).any() for tile in tiles):
+        prepare = lambda tile: standardized_block(values[:, tile], method)
+        correlate = standardized_tile
+    else:
+        prepare = lambda tile: screen_block(values[:, tile], method)
+        correlate = lambda a, b: screen_tile(a, b, method)
+
+    for start in range(0, len(tiles), SCREEN_PANEL_TILES):
+        panel = tiles[start:start + SCREEN_PANEL_TILES]
+        blocks = [prepare(tile) for tile in panel]
+        for position, rows in enumerate(panel):
+            for offset, cols in enumerate(panel[position:]):
+                screen.add(rows, cols, *correlate(blocks[position], blocks[position + offset]))
+        for cols in tiles[start + len(panel):]:
+            block = prepare(cols)
+            for rows, panel_block in zip(panel, blocks):
+                screen.add(rows, cols, *correlate(panel_block, block))
+
+    edges = screen.edges()
+    edges['pvalue'] = correlation_pvalues(edges['r'], edges['count'])
+    return edges, screen.pairs_tested
+
+def screen_block(values, method):
+    """
+    Per-tile working arrays: a pearson_block, or a spearman_block with its ranks' pearson_block when complete
+    """
+    if method == 'pearson':
+        return pearson_block(values)
+    if method == 'spearman':
+        block = spearman_block(values)
+        block['pearson'] = pearson_block(block['ranks'].T) if block['ranks'] is not None else None
+        return block
+    raise ValueError(f"Correlation screening does not support method: {method}")
+
+def screen_tile(a, b, method):
+    """
+    Correlations and pair counts between the columns of two screen_blocks
+    """
+    if method == 'pearson':
+        return pearson_tile(a, b)
+    if a['pearson'] is not None and b['pearson'] is not None:
+        return pearson_tile(a['pearson'], b['pearson'])
+    corr = np.stack([spearman_partners(a, i, b, np.arange(len(b['mask']))) for i in range(len(a['mask']))])
+    return corr, (a['mask'] @ b['mask'].T).astype(np.int64)
+
+def standardized_block(values, method):
+    """
+    Columns of a complete block (at least 2 rows), ranked first for Spearman, centred and scaled to unit norm, and which are constant
+
+    A column counts as constant by the same test as in pearson_tile; its
+    scaled values are left at zero.
+    """
+    if method == 'spearman':
+        values = spearman_block(values)['ranks'].T
+    n = len(values)
+    centered = values - values.mean(axis=0)
+    # Second pass on the residual mean, as pearson_tile's sums do
+    sums = centered.sum(axis=0)
+    squares = (centered ** 2).sum(axis=0)
+    variation = squares - sums ** 2 / n
+    constant = variation <= PAIRWISE_CONSTANT_TOL * squares
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scaled = (centered - sums / n) / np.sqrt(variation)
+    scaled[:, constant] = 0.0
+    return scaled, constant
+
+def standardized_tile(a, b):
+    """
+    Correlations and pair counts between two standardized_blocks
+    """
+    corr = np.clip(a[0].T @ b[0], -1.0, 1.0)
+    corr[a[1][:, None] | b[1][None, :]] = np.nan
+    return corr, np.full(corr.shape, len(a[0]), dtype=np.int64)
+
+def tie_groups(sorted_values):
+    """
+    Positions of the first and last element of each element's tie group, per row of sorted values
+    """
+    n = sorted_values.shape[1]
+    position = np.broadcast_to(np.arange(n), sorted_values.shape)
+    starts = np.ones(sorted_values.shape, dtype=bool)
+    starts[:, 1:] = sorted_values[:, 1:] != sorted_values[:, :-1]
+    ends = np.ones(sorted_values.shape, dtype=bool)
+    ends[:, :-1] = starts[:, 1:]
+    first = np.maximum.accumulate(np.where(starts, position, 0), axis=1)
+    last = np.minimum.accumulate(np.where(ends, position, n)[:, ::-1], axis=1)[:, ::-1]
+    return first, last
+
+def ranks_within(mask_sorted, first, last):
+    """
+    Average ranks of sorted values among the positions flagged in each row of mask_sorted
+
+    first / last are the tie groups of the sorted values (tie_groups): one
+    row shared by all mask rows, or one per mask row. Ranks at unflagged
+    positions are not meaningful.
+    """
+    counts = np.zeros((mask_sorted.shape[0], mask_sorted.shape[1] + 1))
+    np.cumsum(mask_sorted, axis=1, out=counts[:, 1:])
+    if (first == last).all():
+        # No ties: the rank is the count up to and including the position
+        return counts[:, 1:]
+    if first.ndim == 1:
+        before = counts[:, first]
+        in_group = counts[:, last + 1] - before
+    else:
+        before = np.take_along_axis(counts, first, axis=1)
+        in_group = np.take_along_axis(counts, last + 1, axis=1) - before
+    return before + (in_group + 1) / 2
+
+def masked_rank_correlation(a, b, weights):
+    """
+    Pearson correlation of each row of ranks a with the same row of b over the positions with weight 1
+
+    Ranks taken over exactly those positions average (count + 1) / 2, which is used as the mean.
+    """
+    count = weights.sum(axis=1)
+    mean = ((count + 1) / 2)[:, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        a = (a - mean) * weights
+        b = (b - mean) * weights
+        corr = np.einsum('ij,ij->i', a, b) / np.sqrt(np.einsum('ij,ij->i', a, a) * np.einsum('ij,ij->i', b, b))
+    return np.where(count < 2, np.nan, np.clip(corr, -1.0, 1.0))
+
+def pairwise_pvalues(corr, counts):
+    """
+    Symmetric p-value matrix for a correlation matrix with per-pair observation counts
+    """
+    k = len(corr)
+    pvalues = np.zeros((k, k))
+    upper = np.triu_indices(k, k=1)
+    pvalues[upper] = correlation_pvalues(corr[upper], counts[upper])
+    pvalues[(upper[1], upper[0])] = pvalues[upper]
     return pvalues
 
+def correlation_pvalues(r, n):
+    """
+    Two-sided p-values for correlation coefficients r from n observations (a scalar or one per r)
+    """
+    r = np.asarray(r, dtype=float)
+    df_resid = np.broadcast_to(np.asarray(n, dtype=float) - 2, r.shape)
+    r = np.clip(r, -1.0, 1.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = r * np.sqrt(df_resid / ((1.0 - r) * (1.0 + r)))
+        pvalues = 2 * stats.t.sf(np.abs(t), np.where(df_resid > 0, df_resid, 1))
+    return np.where(df_resid > 0, pvalues, np.nan)
+
 def calculate_vif(df):
     """
     Calculate Variance Inflation Factor for each variable
     """
-    vif_data = {}
-    
-    for i, col in enumerate(df.columns):
-        try:
-            vif = variance_inflation_factor(df.values, i)
-            vif_data[col] = float(vif) if not np.isinf(vif) else 999.0
-        except:
-            vif_data[col] = None
-    
-    return vif_data
+    vif_scores, _ = vif_with_diagnostics(df)
+    return vif_scores
+
+def vif_with_diagnostics(df, corr=None):
+    """
+    Calculate VIF scores from a single eigendecomposition of the correlation matrix
+
+    VIF_j is the j-th diagonal element of the inverse correlation matrix, which
+    equals 1 / (1 - R²_j) from regressing column j on the others with an
+    intercept. Columns that are constant or part of an exact linear dependency
+    get None, and the returned diagnostics say why. The default correlation
+    matrix uses the rows complete in every column, as the regressions would.
+    """
+    complete_rows = None
+    if corr is None:
+        complete = df.dropna()
+        corr, complete_rows = complete.corr(method='pearson'), len(complete)
+    return vif_from_correlation(corr, list(df.columns), complete_rows)
+
+def vif_from_correlation(corr, columns, complete_rows=None):
+    """
+    VIF scores and diagnostics from a correlation matrix over the given columns
+
+    complete_rows, when given, is the number of rows the matrix was
+    computed from; with fewer than 2 every VIF is None and the status is
+    'insufficient_rows'.
+    """
+    corr = np.asarray(corr, dtype=float)
+
+    constant = np.isnan(np.diag(corr))
+    keep = np.flatnonzero(~constant)
+    vif_data = {col: None for col in columns}
+    diagnostics = {
+        'condition_number': None,
+        'rank': 0,
+        'status': 'ok',
+        'complete_rows': complete_rows,
+        'constant_columns': [columns[i] for i in np.flatnonzero(constant)],
+        'collinear_columns': []
+    }
+    if complete_rows is not None and complete_rows < 2:
+        diagnostics['status'] = 'insufficient_rows'
+        diagnostics['constant_columns'] = []
+        return vif_data, diagnostics
+    if len(keep) == 0:
+        diagnostics['status'] = 'singular'
+        return vif_data, diagnostics
+
+    eigvals, eigvecs = np.linalg.eigh(corr[np.ix_(keep, keep)])
+    largest = eigvals[-1]
+    null = eigvals <= largest * VIF_SINGULAR_TOL
+    smallest = eigvals[0]
+    condition = float(largest / smallest) if smallest > 0 else None
+
+    # Diagonal of the (pseudo-)inverse, restricted to the non-null eigenspace
+    weights = np.where(null, 0.0, 1.0 / np.where(null, 1.0, eigvals))
+    vif = (eigvecs ** 2) @ weights
+    collinear = (np.abs(eigvecs[:, null]) > np.sqrt(VIF_SINGULAR_TOL)).any(axis=1)
+
+    for idx, col_idx in enumerate(keep):
+        if not collinear[idx]:
+            vif_data[columns[col_idx]] = float(vif[idx])
+
+    diagnostics['condition_number'] = condition if not null.any() else None
+    diagnostics['rank'] = int((~null).sum())
+    diagnostics['collinear_columns'] = [columns[keep[i]] for i in np.flatnonzero(collinear)]
+    if null.any() or constant.any():
+        diagnostics['status'] = 'singular'
+    elif condition is None or condition > VIF_NEAR_SINGULAR_CONDITION:
+        diagnostics['status'] = 'near_singular'
+
+    return vif_data, diagnostics
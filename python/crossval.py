@@ -0,0 +1,123 @@
+# crossval.py - k-fold cross-validated model comparison from per-fold moment matrices
+
+import numpy as np
+from executor import parallel_map
+from polynomial import POLYNOMIAL_MEMORY_MB, TermExpansion, affordable_degrees, solve_slopes
+from streaming import MomentAccumulator
+
+# Defaults for config 'crossValidation' ({folds, seed})
+CV_FOLDS = 5
+CV_SEED = 0
+
+def fold_assignment(n, folds, seed=CV_SEED):
+    """
+    Fold (0 to folds - 1) of each of n rows: a seeded shuffle dealt round-robin, so sizes differ by at most one
+    """
+    fold = np.empty(n, dtype=np.int64)
+    fold[np.random.default_rng(seed).permutation(n)] = np.arange(n) % folds
+    return fold
+
+def cross_validate(X, Y, target_names, linear=True, degrees=(), folds=CV_FOLDS, seed=CV_SEED,
+                   interaction_only=False, ridge=0.0, memory_budget=POLYNOMIAL_MEMORY_MB * 2 ** 20, executor=None):
+    """
+    Out-of-sample RMSE and R² of the linear and polynomial models of every target
+
+    Each fold's rows are expanded once into a MomentAccumulator over
+    [terms, targets] (the terms of the highest degree, ordered by degree,
+    so every model is a leading block). The training moments of a fold are
+    the full-data moments minus the fold's (MomentAccumulator.without),
+    so the k fold fits cost k small solves instead of k refits, and the
+    held-out squared errors follow from the fold's own moments without
+    predicting row by row. Both the per-fold expansions and the per-fold
+    solves run on the executor. R² is 1 - SSE / SST, with SST taken about
+    each fold's training mean. Polynomial degrees beyond the memory budget
+    are left out. Returns {target: {'folds', 'seed', 'models', 'best'}}.
+    """
+    X = np.asarray(X, dtype=float)
+    Y = np.asarray(Y, dtype=float).reshape(len(X), -1)
+    n, p = X.shape
+    folds = min(folds, n)
+    degrees = affordable_degrees(p, Y.shape[1], degrees, interaction_only, memory_budget)
+    if folds < 2 or not (linear or degrees):
+        return {}
+
+    expansion = TermExpansion(X, max(degrees, default=1), interaction_only)
+    targets = expansion.targets(Y)
+    # (label, degree, number of leading terms, ridge penalty)
+    models = ([('linear', 1, expansion.size(1), 0.0)] if linear else []) + [
+        ('polynomial', degree, expansion.size(degree), ridge) for degree in degrees
+    ]
+
+    fold = fold_assignment(n, folds, seed)
+    names = [f"fold {f + 1}" for f in range(folds)]
+    units = [(expansion, X[fold == f], Y[fold == f], memory_budget) for f in range(folds)]
+    fold_moments = parallel_map(expansion_moments, units, executor, names=names)
+    full = MomentAccumulator(fold_moments[0].columns)
+    for moments in fold_moments:
+        full.merge(moments)
+
+    units = [(full, moments, [model[2:] for model in models], targets) for moments in fold_moments]
+    errors = parallel_map(fold_errors, units, executor, names=names)
+    sse = np.array([e[0] for e in errors])
+    sst = np.array([e[1] for e in errors])
+    counts = np.array([moments.count for moments in fold_moments])
+
+    results = {}
+    for j, target in enumerate(target_names):
+        scores = []
+        for m, (label, degree, size, penalty) in enumerate(models):
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rmse = np.sqrt(sse[:, m, j].sum() / counts.sum())
+                r2 = 1 - sse[:, m, j].sum() / sst[:, j].sum()
+                fold_rmse = np.sqrt(sse[:, m, j] / counts)
+            scores.append({
+                'model': label,
+                'degree': degree,
+                'terms': size,
+                'ridge': penalty,
+                'rmse': float(rmse) if np.isfinite(rmse) else None,
+                'r_squared': float(r2) if np.isfinite(r2) else None,
+                'fold_rmse': [float(e) if np.isfinite(e) else None for e in fold_rmse]
+            })
+        ranked = [s for s in scores if s['rmse'] is not None]
+        best = min(ranked, key=lambda s: s['rmse']) if ranked else None
+        results[target] = {
+            'folds': folds,
+            'seed': seed,
+            'models': scores,
+            'best': {'model': best['model'], 'degree': best['degree']} if best else None
+        }
+    return results
+
+def expansion_moments(unit):
+    """
+    MomentAccumulator of one fold; unit is (TermExpansion, X rows, Y rows, memory_budget)
+    """
+    expansion, X, Y, memory_budget = unit
+    return expansion.moments(X, Y, memory_budget)
+
+def fold_errors(unit):
+    """
+    Held-out squared errors of every model on one fold, and the fold's SST about the training mean
+
+    unit is (full moments, fold moments, [(size, ridge) per model], target
+    positions). For a model fitted on the training rows, the fold's
+    residuals have a within-fold sum of squares given by the fold's
+    centred moments and a mean given by the fold's means, so the SSE is
+    their sum and needs no pass over the rows. Returns (models x k SSE, k SST).
+    """
+    full, fold, models, targets = unit
+    training = full.without(fold)
+    c = fold.comoment
+    sst = c[targets, targets] + fold.count * (fold.mean[targets] - training.mean[targets]) ** 2
+    sse = np.full((len(models), len(targets)), np.nan)
+    if fold.count == 0 or training.count < 2:
+        return sse, sst
+
+    for m, (size, ridge) in enumerate(models):
+        slopes, _ = solve_slopes(training.comoment[:size, :size], training.comoment[:size, targets], ridge)
+        intercepts = training.mean[targets] - training.mean[:size] @ slopes
+        spread = c[targets, targets] - 2 * (c[:size, targets] * slopes).sum(axis=0) + (slopes * (c[:size, :size] @ slopes)).sum(axis=0)
+        bias = fold.mean[targets] - intercepts - fold.mean[:size] @ slopes
+        sse[m] = np.maximum(spread, 0.0) + fold.count * bias ** 2
+    return sse, sst
@@ -2,66 +2,44 @@
 
 import pandas as pd
 import numpy as np
-from scipy import stats
+from column_stats import column_statistics
+from normality import SHAPIRO_SAMPLE_SIZE, batch_normality
+from sampling import DEFAULT_SAMPLE_SIZE, distribution_payload
 
-def convert_numpy_types(obj):
-    """
-    Recursively convert numpy types to native Python types for JSON serialization
-    """
-    if isinstance(obj, dict):
-        return {key: convert_numpy_types(value) for key, value in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_numpy_types(item) for item in obj]
-    elif isinstance(obj, np.integer):
-        return int(obj)
-    elif isinstance(obj, np.floating):
-        return float(obj)
-    elif isinstance(obj, np.bool_):
-        return bool(obj)
-    elif isinstance(obj, np.ndarray):
-        return obj.tolist()
-    else:
-        return obj
-
-def analyze_distributions(df, selected_columns):
+def analyze_distributions(df, selected_columns, executor=None, shapiro_sample=SHAPIRO_SAMPLE_SIZE,
+                          sample_size=DEFAULT_SAMPLE_SIZE):
     """
     Analyze distribution of each variable
+
+    Jarque-Bera and D'Agostino-Pearson tests for all columns come from the
+    cached column statistics in one vectorized pass, so they give a p-value
+    at any n. Shapiro-Wilk runs per column (on the executor when one is
+    given) on at most shapiro_sample values, drawn with a fixed seed; None
+    or 0 skips it. See normality.batch_normality for the verdict.
+
+    For the charts each column carries a histogram, a KDE curve on a fixed
+    grid and a uniform reservoir sample of sample_size values, so the
+    payload size does not grow with n.
     """
-    results = {}
+    col_stats = column_statistics(df, selected_columns)
+    moments = (col_stats.loc['count'], col_stats.loc['skewness'], col_stats.loc['kurtosis'])
     
-    for col in selected_columns:
-        data = df[col].dropna()
-        
-        # Shapiro-Wilk test (for n < 5000)
-        if len(data) < 5000:
-            shapiro_stat, shapiro_p = stats.shapiro(data)
-        else:
-            # Use Anderson-Darling for larger samples
-            shapiro_stat, shapiro_p = None, None
-        
-        # Anderson-Darling test
-        anderson_result = stats.anderson(data)
-        
-        # Skewness and kurtosis
-        skewness = float(stats.skew(data))
-        kurtosis = float(stats.kurtosis(data))
-        
-        # Determine if normal (conservative: p > 0.05)
-        is_normal = bool(shapiro_p > 0.05) if shapiro_p is not None else bool(abs(skewness) < 0.5)
+    columns = [df[col].dropna().to_numpy() for col in selected_columns]
+    normality = batch_normality(columns, moments, shapiro_sample, executor=executor, names=selected_columns)
 
-        results[col] = {
-            'shapiro_stat': float(shapiro_stat) if shapiro_stat is not None else None,
-            'shapiro_p': float(shapiro_p) if shapiro_p is not None else None,
-            'anderson_stat': float(anderson_result.statistic),
-            'skewness': skewness,
-            'kurtosis': kurtosis,
-            'is_normal': is_normal,
-            'mean': float(data.mean()),
-            'median': float(data.median()),
-            'std': float(data.std()),
-            'min': float(data.min()),
-            'max': float(data.max()),
-            'values': data.tolist()[:1000]  # Limit for visualization
-        }
+    results = {}
+    for col, data, tests in zip(selected_columns, columns, normality):
+        summary = col_stats[col]
+        results[col] = dict(
+            tests,
+            **distribution_payload(data, sample_size),
+            skewness=float(summary['skewness']),
+            kurtosis=float(summary['kurtosis']),
+            mean=float(summary['mean']),
+            median=float(summary['median']),
+            std=float(summary['std']),
+            min=float(summary['min']),
+            max=float(summary['max'])
+        )
 
-    return convert_numpy_types(results)
+    return results
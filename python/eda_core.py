@@ -3,20 +3,155 @@
 import pandas as pd
 import numpy as np
 import json
+from contextlib import nullcontext
 from preprocessing import assess_data_quality, preprocess_data
 from distribution import analyze_distributions
-from correlation import calculate_all_correlations
-from modeling import fit_all_models
+from normality import SHAPIRO_SAMPLE_SIZE
+from sampling import DEFAULT_SAMPLE_SIZE
+from correlation import calculate_all_correlations, correlations_from_moments
+from modeling import fit_all_models, fit_models_from_moments
 from assumptions import test_all_assumptions
 from report_generator import generate_html_report
+from ols import cache_stats, data_fingerprint
+from pipeline import StageGraph
+from executor import get_executor
+from instrumentation import Instrumentation
+from streaming import accumulate_moments
 
-def run_full_analysis(df, config_json):
+def _selected_columns(config):
+    return config.get('selectedIVs', []) + config.get('selectedDVs', [])
+
+def _analysis_options(config, *keys):
+    options = config.get('config', {})
+    return {key: options.get(key) for key in keys}
+
+def _shapiro_sample(config):
+    # Shapiro-Wilk sample size cap; 0 skips it (and SciPy for this stage)
+    return config.get('config', {}).get('shapiroSample', SHAPIRO_SAMPLE_SIZE)
+
+def _sample_size(config):
+    # Points per variable in the chart samples (residuals etc. use the same setting)
+    return config.get('config', {}).get('sampleSize', DEFAULT_SAMPLE_SIZE)
+
+def _build_analysis_graph():
+    """
+    Declare the analysis stages, their dependencies and the config each one reads
+    """
+    graph = StageGraph()
+    graph.add_stage(
+        'quality',
+        lambda df, inputs, config, executor: assess_data_quality(
+            df, _selected_columns(config), inputs.get('profile')
+        ),
+        config_slice=_selected_columns
+    )
+    graph.add_stage(
+        'preprocess',
+        lambda df, inputs, config, executor: preprocess_data(
+            df,
+            _selected_columns(config),
+            config.get('missingDataStrategy', {}),
+            config.get('outlierDecisions', {}),
+            return_report=True
+        ),
+        config_slice=lambda config: [
+            _selected_columns(config),
+            config.get('missingDataStrategy', {}),
+            config.get('outlierDecisions', {})
+        ]
+    )
+    graph.add_stage(
+        'distributions',
+        lambda df, inputs, config, executor: analyze_distributions(
+            inputs['preprocess'][0], _selected_columns(config), executor, _shapiro_sample(config), _sample_size(config)
+        ),
+        deps=['preprocess'],
+        config_slice=lambda config: [_selected_columns(config), _shapiro_sample(config), _sample_size(config)],
+        packages=lambda config: ['scipy'] if _shapiro_sample(config) else []
+    )
+    graph.add_stage(
+        'correlations',
+        lambda df, inputs, config, executor: calculate_all_correlations(
+            inputs['preprocess'][0], _selected_columns(config), config.get('config', {}), executor
+        ),
+        deps=['preprocess'],
+        config_slice=lambda config: [
+            _selected_columns(config),
+            _analysis_options(config, 'correlationMethods', 'calculateVIF', 'pairwiseComplete',
+                              'correlationScreening', 'bootstrap')
+        ],
+        packages=['scipy']
+    )
+    graph.add_stage(
+        'regressions',
+        lambda df, inputs, config, executor: fit_all_models(
+            inputs['preprocess'][0], config.get('selectedIVs', []), config.get('selectedDVs', []),
+            config.get('config', {}), executor
+        ),
+        deps=['preprocess'],
+        config_slice=lambda config: [
+            config.get('selectedIVs', []),
+            config.get('selectedDVs', []),
+            _analysis_options(config, 'regressionModels', 'batchRegression', 'sampleSize',
+                              'polynomialInteractionOnly', 'polynomialRidge', 'polynomialMemoryMB', 'bootstrap',
+                              'crossValidation')
+        ],
+        packages=['scipy']
+    )
+    graph.add_stage(
+        'assumptions',
+        lambda df, inputs, config, executor: test_all_assumptions(
+            inputs['preprocess'][0], config.get('selectedIVs', []), config.get('selectedDVs', []), executor
+        ),
+        deps=['preprocess'],
+        config_slice=lambda config: [config.get('selectedIVs', []), config.get('selectedDVs', [])],
+        packages=['scipy']
+    )
+    return graph
+
+# Stage results are memoized here across calls, bounded by pipeline.STAGE_CACHE_SIZE and STAGE_CACHE_BYTES
+ANALYSIS_GRAPH = _build_analysis_graph()
+
+def required_packages(config_json, stages=None):
+    """
+    Pyodide packages to fetch before running the given analysis stages (default: all)
+
+    Only numpy and pandas are loaded at startup; scipy is fetched the
+    first time a stage the configuration enables needs it.
+    """
+    config = json.loads(config_json) if isinstance(config_json, str) else config_json
+    return ANALYSIS_GRAPH.required_packages(config, stages)
+
+def _instrumentation(config, on_record):
+    option = config.get('config', {}).get('instrumentation')
+    if not option and on_record is None:
+        return None
+    memory = option.get('memory', True) if isinstance(option, dict) else True
+    return Instrumentation(memory=memory, callback=on_record)
+
+def run_full_analysis(df, config_json, on_record=None, profile=None):
     """
     Main function to run complete EDA analysis
     
+    Stages are memoized on a hash of the selected data and of the config
+    slice each stage reads, so re-running after a config change only
+    recomputes the affected stages (see metadata['stages']). Setting
+    config['config']['executor'] = {'kind': 'thread' | 'process', 'workers': n}
+    runs independent stages and per-column / per-DV work in parallel;
+    under Pyodide everything runs serially.
+    
+    Instrumentation is opt-in: with config['config']['instrumentation'] set
+    (True, or {'memory': False} to skip peak allocation tracking) or an
+    on_record callback, wall time, CPU time and peak allocation of every
+    computed stage and per-column / per-DV unit are returned in
+    metadata['instrumentation'] and passed to on_record(record) as they
+    are taken (see instrumentation.Instrumentation).
+    
     Args:
         df: pandas DataFrame with data
         config_json: JSON string with configuration
+        on_record: optional callback receiving each instrumentation record
+        profile: optional ingestion.ColumnProfile of df, reused by the quality stage
     
     Returns:
         dict with all analysis results
@@ -27,29 +162,22 @@ def run_full_analysis(df, config_json):
     selected_ivs = config.get('selectedIVs', [])
     selected_dvs = config.get('selectedDVs', [])
     selected_columns = selected_ivs + selected_dvs
+    fit_cache_before = cache_stats()
     
-    # Step 1: Data quality assessment
-    quality_issues = assess_data_quality(df, selected_columns)
-    
-    # Step 2: Preprocessing
-    df_clean = preprocess_data(
-        df, 
-        selected_columns,
-        config.get('missingDataStrategy', {}),
-        config.get('outlierDecisions', {})
-    )
-    
-    # Step 3: Distribution analysis
-    distributions = analyze_distributions(df_clean, selected_columns)
-    
-    # Step 4: Correlation analysis
-    correlations = calculate_all_correlations(df_clean, selected_columns, config.get('config', {}))
-    
-    # Step 5: Regression modeling
-    regressions = fit_all_models(df_clean, selected_ivs, selected_dvs, config.get('config', {}))
+    # Steps 1-6: quality, preprocessing, distributions, correlations,
+    # regression modeling and assumption testing
+    data_key = data_fingerprint(df, selected_columns)
+    if profile is not None:
+        # Profile-based quality results differ slightly (sketched quantiles)
+        data_key += ':profile'
+    executor = get_executor(config.get('config', {}).get('executor'))
+    instrumentation = _instrumentation(config, on_record)
+    with instrumentation or nullcontext():
+        outputs, stage_status = ANALYSIS_GRAPH.run(df, data_key, config, executor, instrumentation,
+                                                   context={'profile': profile})
+    df_clean, preprocessing_report = outputs['preprocess']
     
-    # Step 6: Assumption testing
-    assumptions = test_all_assumptions(df_clean, selected_ivs, selected_dvs)
+    fit_cache_after = cache_stats()
     
     # Compile results
     results = {
@@ -58,17 +186,73 @@ def run_full_analysis(df, config_json):
             'cleaned_rows': len(df_clean),
             'n_variables': len(selected_columns),
             'independent_vars': selected_ivs,
-            'dependent_vars': selected_dvs
+            'dependent_vars': selected_dvs,
+            'preprocessing': preprocessing_report,
+            'stages': stage_status,
+            'fit_cache': {
+                'hits': fit_cache_after['hits'] - fit_cache_before['hits'],
+                'misses': fit_cache_after['misses'] - fit_cache_before['misses']
+            }
         },
-        'quality_issues': quality_issues,
-        'distributions': distributions,
-        'correlations': correlations,
-        'regressions': regressions,
-        'assumptions': assumptions
+        'quality_issues': outputs['quality'],
+        'distributions': outputs['distributions'],
+        'correlations': outputs['correlations'],
+        'regressions': outputs['regressions'],
+        'assumptions': outputs['assumptions']
     }
     
     # Generate HTML report
-    report_html = generate_html_report(results, config.get('config', {}), df_clean)
+    if instrumentation is None:
+        report_html = generate_html_report(results, config.get('config', {}), df_clean)
+    else:
+        with instrumentation:
+            report_html = instrumentation.run_stage('report', generate_html_report, results, config.get('config', {}), df_clean)
+        results['metadata']['instrumentation'] = instrumentation.summary()
     results['report_html'] = report_html
     
     return results
+
+def clear_analysis_cache():
+    """
+    Forget memoized stage results (e.g. after loading a new dataset)
+    """
+    ANALYSIS_GRAPH.clear()
+
+def run_streaming_analysis(chunks, config_json):
+    """
+    Run correlation and linear regression analysis over data too large to load
+
+    Args:
+        chunks: iterable of pandas DataFrame chunks (e.g. streaming.iter_csv_chunks)
+        config_json: JSON string with configuration
+    
+    Returns:
+        dict with correlation and regression results; only O(p²) sufficient
+        statistics are held in memory, never the full data
+    """
+    config = json.loads(config_json) if isinstance(config_json, str) else config_json
+    
+    selected_ivs = config.get('selectedIVs', [])
+    selected_dvs = config.get('selectedDVs', [])
+    selected_columns = selected_ivs + selected_dvs
+    
+    # Single pass over the data: rows with missing values are dropped listwise
+    moments = accumulate_moments(chunks, selected_columns)
+    
+    correlations = correlations_from_moments(moments, selected_columns, config.get('config', {}))
+    regressions = {}
+    if selected_ivs and config.get('config', {}).get('regressionModels', {}).get('linear', True):
+        regressions = fit_models_from_moments(moments, selected_ivs, selected_dvs)
+    
+    return {
+        'metadata': {
+            'original_rows': moments.count + moments.dropped_rows,
+            'cleaned_rows': moments.count,
+            'n_variables': len(selected_columns),
+            'independent_vars': selected_ivs,
+            'dependent_vars': selected_dvs,
+            'streaming': True
+        },
+        'correlations': correlations,
+        'regressions': regressions
+    }
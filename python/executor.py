@@ -0,0 +1,81 @@
+# executor.py - Optional thread/process pools for independent analysis work
+
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from instrumentation import current_stage
+
+EXECUTOR_KINDS = ('serial', 'thread', 'process')
+
+_pools = {}
+
+def running_in_pyodide():
+    """
+    True inside the browser runtime, where threads and processes are unavailable
+    """
+    return sys.platform == 'emscripten'
+
+def get_executor(options=None):
+    """
+    Pool for per-column / per-DV work described by {'kind', 'workers'}, or None for serial
+
+    kind is 'serial' (default), 'thread' or 'process'; workers defaults to
+    the CPU count and is recorded on the pool as pool.workers. Pools are
+    created once and reused across runs. Under Pyodide, or with a single
+    worker, this always returns None.
+    """
+    options = options or {}
+    kind = options.get('kind', 'serial')
+    if kind not in EXECUTOR_KINDS:
+        raise ValueError(f"Unknown executor kind: {kind}")
+    workers = int(options.get('workers') or os.cpu_count() or 1)
+    if kind == 'serial' or workers <= 1 or running_in_pyodide():
+        return None
+    return _pool(kind, workers)
+
+def stage_pool(executor):
+    """
+    Thread pool for running whole stages alongside the given unit executor
+
+    Stages share in-process caches, so they always run on threads. The pool
+    is separate from the unit executor: a stage blocked on its own units
+    must never occupy a worker those units need. It has as many workers as
+    the unit executor (the CPU count for a pool not built by get_executor).
+    """
+    if executor is None:
+        return None
+    return _pool('stage', getattr(executor, 'workers', None) or os.cpu_count() or 1)
+
+def _pool(kind, workers):
+    key = (kind, workers)
+    if key not in _pools:
+        pool_class = ProcessPoolExecutor if kind == 'process' else ThreadPoolExecutor
+        _pools[key] = pool_class(max_workers=workers)
+        _pools[key].workers = workers
+    return _pools[key]
+
+def parallel_map(func, items, executor=None, names=None):
+    """
+    Apply func to every item, in parallel when an executor is given
+
+    Results are always returned in input order. With a process pool func
+    and the items must be picklable (module-level functions, arrays).
+    Inside an instrumented stage each item is recorded as a unit, labelled
+    by names (e.g. the column or DV it covers).
+    """
+    items = list(items)
+    active = current_stage()
+    if active is not None:
+        instrumentation, stage = active
+        return instrumentation.map_units(stage, func, items, executor, names)
+    if executor is None or len(items) < 2:
+        return [func(item) for item in items]
+    return list(executor.map(func, items))
+
+def shutdown_executors():
+    """
+    Shut down all pools created by get_executor
+    """
+    for pool in _pools.values():
+        pool.shutdown()
+    _pools.clear()
@@ -0,0 +1,317 @@
+# ingestion.py - Chunked CSV ingestion with one-pass column profiling
+
+import io
+import pandas as pd
+import numpy as np
+
+# Items kept per level of the quantile sketch; rank error is roughly
+# log2(n / SKETCH_CAPACITY) / SKETCH_CAPACITY
+SKETCH_CAPACITY = 2048
+
+class QuantileSketch:
+    """
+    Approximate quantile sketch for one numeric column
+
+    A stack of compactors: level h holds items of weight 2^h. When a level
+    overflows it is sorted and every other item is promoted to the next
+    level (alternating the offset to cancel bias). Until the first
+    compaction the sketch is exact.
+    """
+    def __init__(self, capacity=SKETCH_CAPACITY):
+        self.capacity = capacity
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self._offset = 0
+
+    def update(self, values):
+        """
+        Add an array of non-missing values
+        """
+        values = np.asarray(values, dtype=float)
+        self.count += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compact()
+        return self
+
+    def _compact(self):
+        h = 0
+        while h < len(self.levels):
+            level = self.levels[h]
+            if len(level) > self.capacity:
+                level = np.sort(level)
+                # Keep an odd leftover at this level so the total weight is preserved
+                keep = level[-1:] if len(level) % 2 else level[:0]
+                pairs = level[:len(level) - len(keep)]
+                promoted = pairs[self._offset::2]
+                self._offset ^= 1
+                self.levels[h] = keep
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+            h += 1
+
+    def _weighted(self):
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        return items[order], weights[order]
+
+    def quantile(self, q):
+        """
+        Approximate q-quantile with the same linear interpolation as pandas
+        """
+        items, weights = self._weighted()
+        if len(items) == 0:
+            return np.nan
+        cum = np.cumsum(weights)
+        # Position of each item's mass centre among the n order statistics
+        centres = cum - (weights + 1) / 2
+        return float(np.interp(np.asarray(q) * (cum[-1] - 1), centres, items))
+
+    def count_below(self, x):
+        """
+        Approximate number of values strictly below x
+        """
+        items, weights = self._weighted()
+        return float(weights[items < x].sum())
+
+    def count_above(self, x):
+        """
+        Approximate number of values strictly above x
+        """
+        items, weights = self._weighted()
+        return float(weights[items > x].sum())
+
+class ColumnProfile:
+    """
+    Per-column counts, missing counts, min/max, central moments and quantile sketches
+
+    Built incrementally from DataFrame chunks; moments are merged with
+    Pébay's pairwise formulas so the result matches a single pass over the
+    full column.
+    """
+    def __init__(self, columns):
+        self.columns = list(columns)
+        size = len(self.columns)
+        self.rows = 0
+        self.missing = np.zeros(size, dtype=np.int64)
+        self.count = np.zeros(size)
+        self.mean = np.zeros(size)
+        self.m2 = np.zeros(size)
+        self.m3 = np.zeros(size)
+        self.m4 = np.zeros(size)
+        self.min = np.full(size, np.inf)
+        self.max = np.full(size, -np.inf)
+        self.numeric = np.ones(size, dtype=bool)
+        self.sketches = [QuantileSketch() for _ in self.columns]
+
+    def update(self, chunk):
+        """
+        Fold a DataFrame chunk with the profile's columns into the running statistics
+        """
+        chunk = chunk[self.columns]
+        self.rows += len(chunk)
+        self.missing += chunk.isna().sum().to_numpy()
+
+        for j, col in enumerate(self.columns):
+            if self.numeric[j] and not pd.api.types.is_numeric_dtype(chunk[col]):
+                self.numeric[j] = False
+        idx = np.flatnonzero(self.numeric)
+        if len(idx) == 0:
+            return self
+
+        values = chunk.iloc[:, idx].to_numpy(dtype=float)
+        present = ~np.isnan(values)
+        nb = present.sum(axis=0).astype(float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mb = np.where(nb > 0, np.nansum(values, axis=0) / nb, 0.0)
+        dev = np.where(present, values - mb, 0.0)
+        dev2 = dev ** 2
+        m2b = dev2.sum(axis=0)
+        m3b = (dev2 * dev).sum(axis=0)
+        m4b = (dev2 ** 2).sum(axis=0)
+        self._merge_moments(idx, nb, mb, m2b, m3b, m4b)
+
+        with np.errstate(invalid='ignore'):
+            self.min[idx] = np.fmin(self.min[idx], np.nanmin(np.where(present, values, np.inf), axis=0))
+            self.max[idx] = np.fmax(self.max[idx], np.nanmax(np.where(present, values, -np.inf), axis=0))
+        for k, j in enumerate(idx):
+            self.sketches[j].update(values[present[:, k], k])
+        return self
+
+    def _merge_moments(self, idx, nb, mb, m2b, m3b, m4b):
+        na = self.count[idx]
+        ma = self.mean[idx]
+        m2a, m3a, m4a = self.m2[idx], self.m3[idx], self.m4[idx]
+        n = na + nb
+        with np.errstate(divide='ignore', invalid='ignore'):
+            delta = mb - ma
+            d_n = np.where(n > 0, delta / n, 0.0)
+            self.mean[idx] = ma + d_n * nb
+            self.m2[idx] = m2a + m2b + delta * d_n * na * nb
+            self.m3[idx] = (m3a + m3b + delta * d_n ** 2 * na * nb * (na - nb)
+                            + 3 * d_n * (na * m2b - nb * m2a))
+            self.m4[idx] = (m4a + m4b + delta * d_n ** 3 * na * nb * (na ** 2 - na * nb + nb ** 2)
+                            + 6 * d_n ** 2 * (na ** 2 * m2b + nb ** 2 * m2a)
+                            + 4 * d_n * (na * m3b - nb * m3a))
+        self.count[idx] = n
+
+    def drop_numeric(self, columns):
+        """
+        Mark columns as non-numeric and forget the statistics folded in for them
+        """
+        for col in columns:
+            j = self.columns.index(col)
+            self.numeric[j] = False
+            self.count[j] = self.mean[j] = self.m2[j] = self.m3[j] = self.m4[j] = 0.0
+            self.min[j], self.max[j] = np.inf, -np.inf
+            self.sketches[j] = QuantileSketch()
+        return self
+
+    def column_index(self, col):
+        """
+        Position of col in the profile, or None when it is absent or non-numeric
+        """
+        if col not in self.columns:
+            return None
+        j = self.columns.index(col)
+        return j if self.numeric[j] else None
+
+    def summary(self, col):
+        """
+        Descriptive statistics for one numeric column, as native Python types
+        """
+        j = self.column_index(col)
+        n = self.count[j]
+        sketch = self.sketches[j]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            variance = self.m2[j] / (n - 1) if n > 1 else np.nan
+            skewness = np.sqrt(n) * self.m3[j] / self.m2[j] ** 1.5 if self.m2[j] > 0 else np.nan
+            kurtosis = n * self.m4[j] / self.m2[j] ** 2 - 3 if self.m2[j] > 0 else np.nan
+        return {
+            'count': int(n),
+            'missing_count': int(self.missing[j]),
+            'mean': float(self.mean[j]),
+            'std': float(np.sqrt(variance)),
+            'min': float(self.min[j]),
+            'max': float(self.max[j]),
+            'skewness': float(skewness),
+            'kurtosis': float(kurtosis),
+            'q1': sketch.quantile(0.25),
+            'median': sketch.quantile(0.5),
+            'q3': sketch.quantile(0.75)
+        }
+
+class CSVIngestor:
+    """
+    Parse CSV text fed in pieces, profiling every column in the same pass
+
+    Each piece is split at the last line break outside a quoted field; the
+    remainder is carried over to the next piece with whether it ends inside
+    quotes, so each piece's quotes are counted once and the search for the
+    line break only walks back over the quotes after it. Only one parsed DataFrame chunk per piece is
+    alive besides the accumulated chunk list, and the full text is never
+    held as a single string.
+
+    Types are inferred per piece, so a column can be numeric in some chunks
+    and text in others; finish() turns such a column into text, as a single
+    read_csv would. Its numbers then come back in their shortest form
+    (number_text: "1.50" reads back as "1.5", "2.0" as "2"), and the
+    profile drops it as non-numeric.
+    """
+    def __init__(self):
+        self.columns = None
+        self.chunks = []
+        self.profile = None
+        self._carry = ''
+        self._scanned = 0
+        self._quoted = False
+
+    def feed(self, text):
+        """
+        Add the next piece of CSV text
+        """
+        text = self._carry + text
+        # Whether the end of the text is inside quotes; the carry was counted before
+        quoted = self._quoted ^ bool(text.count('"', self._scanned) % 2)
+        self._quoted = quoted
+        # Walk back a quote at a time to the last line break outside quotes,
+        # no further than the carry already known to hold none
+        cut, end = -1, len(text)
+        while end > self._scanned:
+            quote = text.rfind('"', self._scanned, end)
+            if not quoted:
+                cut = text.rfind('\n', max(quote + 1, self._scanned), end)
+                if cut >= 0:
+                    break
+            if quote < 0:
+                break
+            quoted = not quoted
+            end = quote
+        if cut < 0:
+            self._carry = text
+            self._scanned = len(text)
+            return self
+        # The cut is outside quotes, so the carry ends inside them exactly when the text does
+        self._carry = text[cut + 1:]
+        self._scanned = len(self._carry)
+        self._parse(text[:cut + 1])
+        return self
+
+    def finish(self):
+        """
+        Parse any remaining text and return (DataFrame, ColumnProfile)
+        """
+        if self._carry.strip():
+            self._parse(self._carry)
+        self._carry = ''
+        self._scanned, self._quoted = 0, False
+        if not self.chunks:
+            df = pd.DataFrame(columns=self.columns or [])
+        else:
+            mixed = self._text_columns()
+            df = pd.concat(self.chunks, ignore_index=True)
+            for col, dtype in mixed.items():
+                df[col] = df[col].astype(dtype)
+            if mixed:
+                self.profile.drop_numeric(mixed)
+        self.chunks = []
+        if self.profile is None:
+            self.profile = ColumnProfile(df.columns)
+        return df, self.profile
+
+    def _text_columns(self):
+        """
+        Columns that are text in some chunks but not all, with the text dtype; the other chunks are converted to text in place
+        """
+        mixed = {}
+        for col in self.columns:
+            kinds = [pd.api.types.infer_dtype(chunk[col], skipna=True) for chunk in self.chunks]
+            text = [i for i, kind in enumerate(kinds) if kind in ('string', 'mixed')]
+            if text and len(text) < len(kinds):
+                mixed[col] = self.chunks[text[0]][col].dtype
+                for i in set(range(len(kinds))) - set(text):
+                    self.chunks[i][col] = self.chunks[i][col].map(number_text, na_action='ignore').astype(object)
+        return mixed
+
+    def _parse(self, text):
+        if self.columns is None:
+            chunk = pd.read_csv(io.StringIO(text))
+            self.columns = list(chunk.columns)
+            self.profile = ColumnProfile(self.columns)
+        else:
+            chunk = pd.read_csv(io.StringIO(text), header=None, names=self.columns)
+        if len(chunk):
+            self.profile.update(chunk)
+            self.chunks.append(chunk)
+
+def number_text(value):
+    """
+    Shortest text of a parsed value, with whole floats written as integers
+
+    A chunk's integers are read as floats when it also has missing values,
+    so whole floats are written back the way such integers were.
+    """
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
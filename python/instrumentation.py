@@ -0,0 +1,133 @@
+# instrumentation.py - Opt-in wall time, CPU time and peak allocation per stage and unit
+
+import contextvars
+import threading
+import time
+import tracemalloc
+
+# (Instrumentation, stage name) of the stage running in the current context
+_current = contextvars.ContextVar('instrumentation', default=None)
+
+class Instrumentation:
+    """
+    Collects timing records for analysis stages and their per-column / per-DV units
+
+    Each record has 'stage', 'unit' (None for the stage itself), 'wall_time'
+    and 'cpu_time' in seconds and 'peak_bytes'. CPU time is that of the
+    thread doing the work, so a stage whose units run on a pool does not
+    include them; the unit records do. Peak allocation comes from
+    tracemalloc, which is process-wide: it is only recorded when memory is
+    enabled and work runs serially (peak_bytes is None otherwise), and it
+    slows down Python-heavy code while active.
+
+    callback(record) is called for every record as soon as it is taken,
+    from whichever thread did the work.
+    """
+    def __init__(self, memory=False, callback=None):
+        self.memory = memory
+        self.callback = callback
+        self.records = []
+        self._lock = threading.Lock()
+        self._peaks = []
+        self._started_tracing = False
+
+    def __enter__(self):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def run_stage(self, stage, func, *args):
+        """
+        Call func(*args) as stage, recording it; parallel_map calls inside are recorded as its units
+        """
+        token = _current.set((self, stage))
+        try:
+            return self._measure(stage, None, func, args)
+        finally:
+            _current.reset(token)
+
+    def map_units(self, stage, func, items, executor=None, names=None):
+        """
+        parallel_map with a record per item; names label the units (default: their index)
+        """
+        names = [str(i) for i in range(len(items))] if names is None else [str(name) for name in names]
+        if executor is None or len(items) < 2:
+            return [self._measure(stage, name, func, (item,)) for name, item in zip(names, items)]
+
+        results = []
+        for name, (result, wall_time, cpu_time) in zip(names, executor.map(timed_call, [func] * len(items), items)):
+            self._add({'stage': stage, 'unit': name, 'wall_time': wall_time, 'cpu_time': cpu_time, 'peak_bytes': None})
+            results.append(result)
+        return results
+
+    def summary(self):
+        """
+        Records split into stage and unit lists, for results['metadata']
+        """
+        with self._lock:
+            records = list(self.records)
+        return {
+            'stages': [record for record in records if record['unit'] is None],
+            'units': [record for record in records if record['unit'] is not None]
+        }
+
+    def _measure(self, stage, unit, func, args):
+        tracing = self.memory and tracemalloc.is_tracing() and threading.current_thread() is threading.main_thread()
+        if tracing:
+            self._begin_peak()
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            return func(*args)
+        finally:
+            record = {
+                'stage': stage,
+                'unit': unit,
+                'wall_time': time.perf_counter() - wall_start,
+                'cpu_time': time.thread_time() - cpu_start,
+                'peak_bytes': self._end_peak() if tracing else None
+            }
+            self._add(record)
+
+    def _begin_peak(self):
+        # Fold the peak so far into every open measurement before resetting
+        # it, so nested measurements (a stage and its units) all stay correct
+        current, peak = tracemalloc.get_traced_memory()
+        for frame in self._peaks:
+            frame[1] = max(frame[1], peak)
+        tracemalloc.reset_peak()
+        self._peaks.append([current, current])
+
+    def _end_peak(self):
+        peak = tracemalloc.get_traced_memory()[1]
+        for frame in self._peaks:
+            frame[1] = max(frame[1], peak)
+        baseline, frame_peak = self._peaks.pop()
+        return frame_peak - baseline
+
+    def _add(self, record):
+        with self._lock:
+            self.records.append(record)
+        if self.callback is not None:
+            self.callback(record)
+
+def current_stage():
+    """
+    (Instrumentation, stage name) active in this context, or None
+    """
+    return _current.get()
+
+def timed_call(func, item):
+    """
+    func(item) with its wall and CPU time; module-level so process pools can pickle it
+    """
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    result = func(item)
+    return result, time.perf_counter() - wall_start, time.thread_time() - cpu_start
@@ -0,0 +1,183 @@
+# kendall.py - Kendall tau-b correlation matrix with O(n log n) pair counts
+
+import math
+import numpy as np
+from lazy import LazyModule
+
+# Largest sample for which tie-free p-values use the exact null distribution (as scipy)
+KENDALL_EXACT_MAX_N = 33
+
+special = LazyModule('scipy.special')
+
+class ColumnRanks:
+    """
+    One column sorted once: stable sort order, dense integer ranks and tie counts
+    """
+    def __init__(self, values):
+        values = np.asarray(values, dtype=float)
+        self.n = len(values)
+        self.order = np.argsort(values, kind='stable')
+        sorted_values = values[self.order]
+        steps = np.concatenate([[0], (sorted_values[1:] != sorted_values[:-1]).astype(np.int64)])
+        self.dense = np.empty(self.n, dtype=np.int64)
+        self.dense[self.order] = np.cumsum(steps)
+        counts = np.bincount(self.dense)
+        # below[r]: values ranked below r, i.e. where rank r starts in sorted order
+        self.below = np.concatenate([[0], np.cumsum(counts)])
+        counts = counts[counts > 1].astype(float)
+        self.has_ties = len(counts) > 0
+        # Tie terms of scipy's count_rank_tie: pairs, and the two variance corrections
+        self.tie_pairs = (counts * (counts - 1) / 2).sum()
+        self.tie_x0 = (counts * (counts - 1) * (counts - 2)).sum()
+        self.tie_x1 = (counts * (counts - 1) * (2 * counts + 5)).sum()
+
+def kendall_matrix(values):
+    """
+    Kendall tau-b and two-sided p-values for every pair of columns of a 2-D array
+
+    Each column is sorted once. For a pair (i, j) the ranks of j are read
+    in column i's order and the discordant pairs are counted as the
+    inversions of that sequence (count_inversions), so a pair costs
+    O(n log n) time and O(n) memory instead of the O(n^2) of comparing
+    every pair of rows, and tau and its p-value come from the same count.
+    p-values follow scipy.stats.kendalltau: exact for tie-free samples of
+    at most KENDALL_EXACT_MAX_N, otherwise the normal approximation with
+    tie corrections. Rows with a missing value are dropped pair by pair.
+    Returns (tau, pvalues) as k x k arrays.
+    """
+    values = np.asarray(values, dtype=float)
+    k = values.shape[1]
+    tau = np.eye(k)
+    pvalues = np.zeros((k, k))
+    missing = np.isnan(values)
+    columns = None if missing.any() else [ColumnRanks(values[:, j]) for j in range(k)]
+
+    for i in range(k - 1):
+        for j in range(i + 1, k):
+            if columns is not None:
+                x, y = columns[i], columns[j]
+            else:
+                rows = ~(missing[:, i] | missing[:, j])
+                x, y = ColumnRanks(values[rows, i]), ColumnRanks(values[rows, j])
+            tau[i, j], pvalues[i, j] = kendall_pair(x, y)
+            tau[j, i], pvalues[j, i] = tau[i, j], pvalues[i, j]
+
+    return tau, pvalues
+
+def kendall_pair(x, y):
+    """
+    (tau-b, two-sided p-value) of two ColumnRanks over the same rows
+    """
+    n = x.n
+    if n < 2:
+        return np.nan, np.nan
+    xs = x.dense[x.order]
+    ys = y.dense[x.order]
+    if x.has_ties:
+        # Within tied x, order by y so those pairs are not counted as discordant;
+        # the sequence is already sorted by x, so this stable sort is near-linear
+        ys = ys[np.argsort(xs * n + ys, kind='stable')]
+        joint_ties = joint_tie_pairs(xs, ys)
+    else:
+        joint_ties = 0
+
+    total = n * (n - 1) / 2
+    discordant = count_inversions(ys, y.below)
+    con_minus_dis = total - x.tie_pairs - y.tie_pairs + joint_ties - 2 * discordant
+    denominator = np.sqrt(total - x.tie_pairs) * np.sqrt(total - y.tie_pairs)
+    if denominator == 0:
+        return np.nan, np.nan
+    tau = min(1.0, max(-1.0, con_minus_dis / denominator))
+
+    if not x.has_ties and not y.has_ties and (
+            n <= KENDALL_EXACT_MAX_N or min(discordant, total - discordant) <= 1):
+        return tau, kendall_exact_pvalue(n, int(min(discordant, total - discordant)))
+    return tau, kendall_asymptotic_pvalue(n, con_minus_dis, x, y)
+
+def count_inversions(ranks, below):
+    """
+    Number of pairs i < j with ranks[i] > ranks[j]
+
+    below[r] is how many of the values are smaller than r (ColumnRanks.below).
+    A merge-sort count done one bit at a time, from the most significant
+    (an MSD radix sort): the sequence is kept stably sorted by the bits
+    already seen, every value whose current bit is 0 is discordant with
+    the 1 bits before it in its group, and each group is then stably split
+    into its 0s and 1s. Where each group starts is read from below, so
+    every pass is a few O(n) array operations on preallocated buffers and
+    the whole count is O(n log n).
+    """
+    n = len(ranks)
+    if n < 2:
+        return 0
+    ranks = np.array(ranks, dtype=np.int64)
+    position = np.arange(n)
+    ones_before = np.zeros(n + 1, dtype=np.int64)
+    bit, key, start, ones, target, partitioned = [np.empty(n, dtype=np.int64) for _ in range(6)]
+    inversions = 0
+
+    for b in range(int(ranks.max()).bit_length() - 1, -1, -1):
+        np.right_shift(ranks, b, out=bit)
+        np.bitwise_and(bit, 1, out=bit)
+        # Indices are always in range; mode='clip' only avoids take's buffered output
+        np.bitwise_and(ranks, -1 << (b + 1), out=key)
+        np.take(below, key, out=start, mode='clip')
+        np.cumsum(bit, out=ones_before[1:])
+        np.take(ones_before, start, out=ones, mode='clip')
+        np.subtract(ones_before[:-1], ones, out=ones)
+        np.multiply(bit, ones, out=target)
+        inversions += int(ones.sum()) - int(target.sum())
+
+        # 0 bits keep their place among the group's 0s, 1 bits follow all of them
+        np.bitwise_and(ranks, -1 << b, out=key)
+        np.take(below, key, out=target, mode='clip')
+        np.subtract(position, start, out=start)
+        np.subtract(start, ones, out=start)
+        np.subtract(ones, start, out=ones)
+        np.multiply(bit, ones, out=ones)
+        np.add(target, start, out=target)
+        np.add(target, ones, out=target)
+        partitioned[target] = ranks
+        ranks, partitioned = partitioned, ranks
+
+    return inversions
+
+def joint_tie_pairs(xs, ys):
+    """
+    Pairs tied in both x and y, for rows sorted by (x, y)
+    """
+    same = (xs[1:] == xs[:-1]) & (ys[1:] == ys[:-1])
+    lengths = np.bincount(np.concatenate([[0], np.cumsum(~same)])).astype(float)
+    return (lengths * (lengths - 1) / 2).sum()
+
+def kendall_exact_pvalue(n, c):
+    """
+    Two-sided exact p-value for c = min(discordant, concordant) pairs of n tie-free values
+    """
+    if c == 0:
+        p = 2.0 / math.factorial(n) if n < 171 else 0.0
+    elif c == 1:
+        p = 2.0 / math.factorial(n - 1) if n < 172 else 0.0
+    elif 2 * c == n * (n - 1) // 2:
+        p = 1.0
+    else:
+        # Counts of permutations with at most c inversions (Mahonian numbers)
+        counts = np.zeros(c + 1)
+        counts[0:2] = 1.0
+        for j in range(3, n + 1):
+            counts = np.cumsum(counts)
+            if j <= c:
+                counts[j:] -= counts[:c + 1 - j]
+        p = 2.0 * counts.sum() / math.factorial(n)
+    return float(np.clip(p, 0, 1))
+
+def kendall_asymptotic_pvalue(n, con_minus_dis, x, y):
+    """
+    Two-sided p-value from the normal approximation with tie-corrected variance
+    """
+    m = n * (n - 1.0)
+    variance = ((m * (2 * n + 5) - x.tie_x1 - y.tie_x1) / 18
+                + 2 * x.tie_pairs * y.tie_pairs / m
+                + x.tie_x0 * y.tie_x0 / (9 * m * (n - 2)))
+    z = con_minus_dis / np.sqrt(variance)
+    return float(special.erfc(abs(z) / np.sqrt(2)))
@@ -0,0 +1,25 @@
+# lazy.py - Deferred imports for heavy dependencies
+
+import importlib
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access
+
+    Lets analysis modules be imported before scipy is installed: under
+    Pyodide it is only fetched for the stages a configuration enables,
+    so a module-level import would fail (or force the download) at
+    startup.
+    """
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<LazyModule '{self._name}' ({state})>"
@@ -2,136 +2,231 @@
 
 import pandas as pd
 import numpy as np
-from scipy import stats
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import PolynomialFeatures
-from sklearn.metrics import r2_score, mean_squared_error
 import json
+from bootstrap import bootstrap_options, coefficient_intervals
+from crossval import CV_FOLDS, CV_SEED, cross_validate
+from lazy import LazyModule
+from ols import GramFactorization, cached_batch_fit, data_fingerprint, fit_cache_key
+from polynomial import POLYNOMIAL_DEGREES, POLYNOMIAL_MEMORY_MB, fit_polynomial_models
+from sampling import DEFAULT_SAMPLE_SIZE, sample_indices
 
-def convert_numpy_types(obj):
-    """
-    Recursively convert numpy types to native Python types for JSON serialization
-    """
-    if isinstance(obj, dict):
-        return {key: convert_numpy_types(value) for key, value in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_numpy_types(item) for item in obj]
-    elif isinstance(obj, np.integer):
-        return int(obj)
-    elif isinstance(obj, np.floating):
-        return float(obj)
-    elif isinstance(obj, np.bool_):
-        return bool(obj)
-    elif isinstance(obj, np.ndarray):
-        return obj.tolist()
-    else:
-        return obj
+stats = LazyModule('scipy.stats')
 
-def fit_all_models(df, ivs, dvs, config):
+def fit_all_models(df, ivs, dvs, config, executor=None):
     """
     Fit regression models for each DV against all IVs
+
+    By default (config 'batchRegression') the linear models for all DVs are
+    solved together from one factorization of the shared design matrix.
+    Polynomial models for all DVs come from one chunked pass over the
+    expanded terms (polynomial.fit_polynomial_models), within config
+    'polynomialMemoryMB', optionally interaction-only or ridge-penalized.
+    With config 'bootstrap' the linear coefficients also get bootstrap
+    confidence intervals, computed for all DVs together. With config
+    'crossValidation' ({folds, seed}) every enabled model is also scored
+    out of sample by k-fold cross-validation ('cross_validation' per DV),
+    with the folds run on the executor.
+    Residual diagnostics are sampled to config 'sampleSize' rows.
     """
     if isinstance(config, str):
         config = json.loads(config)
+    if not dvs:
+        return {}
     
     results = {}
+    fingerprint = data_fingerprint(df, ivs + dvs)
+    X = df[ivs].values
+    
+    linear_models = {}
+    if config.get('regressionModels', {}).get('linear', True):
+        cache_keys = [fit_cache_key(fingerprint, ivs, dv) for dv in dvs]
+        sample_size = config.get('sampleSize', DEFAULT_SAMPLE_SIZE)
+        if config.get('batchRegression', True):
+            models = fit_linear_regressions(X, df[dvs].values, ivs, dvs, cache_keys=cache_keys, sample_size=sample_size)
+        else:
+            models = [
+                fit_linear_regression(X, df[dv].values, ivs, dv, cache_key=key, sample_size=sample_size)
+                for dv, key in zip(dvs, cache_keys)
+            ]
+        linear_models = dict(zip(dvs, models))
+        
+        bootstrap = bootstrap_options(config)
+        if bootstrap:
+            intervals = coefficient_intervals(X, df[dvs].values, ivs, dvs, bootstrap, executor)
+            for dv, dv_intervals in zip(dvs, intervals):
+                linear_models[dv]['bootstrap'] = dv_intervals
+    
+    # Polynomial regression
+    polynomial_models = {}
+    polynomial_options = {
+        'interaction_only': config.get('polynomialInteractionOnly', False),
+        'ridge': config.get('polynomialRidge', 0.0),
+        'memory_budget': config.get('polynomialMemoryMB', POLYNOMIAL_MEMORY_MB) * 2 ** 20
+    }
+    if config.get('regressionModels', {}).get('polynomial', False):
+        polynomial_models = fit_polynomial_models(X, df[dvs].values, dvs, **polynomial_options)
+    
+    # Out-of-sample comparison of the same models
+    cross_validation = {}
+    cv_options = config.get('crossValidation')
+    if cv_options:
+        cv_options = cv_options if isinstance(cv_options, dict) else {}
+        cross_validation = cross_validate(
+            X, df[dvs].values, dvs,
+            linear=config.get('regressionModels', {}).get('linear', True),
+            degrees=POLYNOMIAL_DEGREES if config.get('regressionModels', {}).get('polynomial', False) else (),
+            folds=int(cv_options.get('folds', CV_FOLDS)),
+            seed=cv_options.get('seed', CV_SEED),
+            executor=executor,
+            **polynomial_options
+        )
     
     for dv in dvs:
         dv_results = {}
         
-        # Prepare data
-        X = df[ivs].values
-        y = df[dv].values
-        
         # Linear regression
-        if config.get('regressionModels', {}).get('linear', True):
-            linear_model = fit_linear_regression(X, y, ivs, dv)
-            dv_results['linear'] = linear_model
+        if dv in linear_models:
+            dv_results['linear'] = linear_models[dv]
+        
+        if dv in polynomial_models:
+            dv_results['polynomial'] = polynomial_models[dv]
         
-        # Polynomial regression
-        if config.get('regressionModels', {}).get('polynomial', False):
-            poly_models = []
-            for degree in [2, 3]:
-                poly_model = fit_polynomial_regression(X, y, ivs, dv, degree)
-                poly_models.append(poly_model)
-            dv_results['polynomial'] = poly_models
+        if dv in cross_validation:
+            dv_results['cross_validation'] = cross_validation[dv]
         
         results[dv] = dv_results
 
-    return convert_numpy_types(results)
+    return results
 
-def fit_linear_regression(X, y, feature_names, target_name):
+def fit_linear_regression(X, y, feature_names, target_name, cache_key=None, sample_size=DEFAULT_SAMPLE_SIZE):
     """
     Fit linear regression model
+
+    The underlying OLSFit is stored under cache_key so that assumption
+    tests on the same data reuse it instead of refitting.
     """
-    model = LinearRegression()
-    model.fit(X, y)
-    
-    y_pred = model.predict(X)
-    residuals = y - y_pred
-    
-    # Calculate metrics
-    r2 = r2_score(y, y_pred)
-    adj_r2 = 1 - (1 - r2) * (len(y) - 1) / (len(y) - X.shape[1] - 1)
-    rmse = np.sqrt(mean_squared_error(y, y_pred))
+    cache_keys = [cache_key] if cache_key is not None else None
+    return fit_linear_regressions(X, np.asarray(y).reshape(-1, 1), feature_names, [target_name], cache_keys,
+                                  sample_size)[0]
+
+def fit_linear_regressions(X, Y, feature_names, target_names, cache_keys=None, sample_size=DEFAULT_SAMPLE_SIZE):
+    """
+    Fit linear regression models for every column of Y on the same design
+
+    The design is factorized once and all targets are solved as a matrix
+    right-hand side; fit statistics are computed for all targets at once.
+    Residuals, predictions and per-row influence measures are returned for
+    a uniform reservoir sample of sample_size rows ('sample_rows' holds
+    their positions); the influence maxima and counts cover all rows.
+    """
+    if not target_names:
+        return []
+    fits = cached_batch_fit(cache_keys, X, Y)
     
-    # F-statistic and p-value
-    n = len(y)
-    p = X.shape[1]
-    f_stat = (r2 / p) / ((1 - r2) / (n - p - 1))
-    f_pvalue = 1 - stats.f.cdf(f_stat, p, n - p - 1)
+    Y = np.column_stack([fit.y for fit in fits])
+    y_pred = np.column_stack([fit.fitted for fit in fits])
+    residuals = np.column_stack([fit.residuals for fit in fits])
+    coefs = np.column_stack([fit.coef for fit in fits])
     
-    # Coefficient p-values (simplified)
-    se = np.sqrt(np.diag(np.linalg.inv(X.T @ X) * (residuals ** 2).sum() / (n - p - 1)))
-    t_stats = model.coef_ / se
-    p_values = [2 * (1 - stats.t.cdf(abs(t), n - p - 1)) for t in t_stats]
+    factorization = fits[0].factorization
+    rss = (residuals ** 2).sum(axis=0)
+    tss = ((Y - Y.mean(axis=0)) ** 2).sum(axis=0)
+    params = np.vstack([[fit.intercept for fit in fits], coefs])
+    cov_diag = np.diag(factorization.unscaled_covariance())
+    results = linear_model_summaries(feature_names, params, cov_diag, rss, tss, Y.shape[0], factorization.rank)
     
-    results = {
-        'intercept': float(model.intercept_),
-        'coefficients': {name: float(coef) for name, coef in zip(feature_names, model.coef_)},
-        'p_values': {name: float(p) for name, p in zip(feature_names, p_values)},
-        'r_squared': float(r2),
-        'adj_r_squared': float(adj_r2),
-        'rmse': float(rmse),
-        'f_statistic': float(f_stat),
-        'f_pvalue': float(f_pvalue),
-        'residuals': residuals.tolist()[:1000],  # Limit size
-        'predictions': y_pred.tolist()[:1000]
-    }
+    rows = sample_indices(Y.shape[0], sample_size)
+    for j, fit in enumerate(fits):
+        influence = fit.influence()
+        cooks = influence['cooks_distance']
+        results[j].update({
+            'sample_rows': rows,
+            'residuals': residuals[rows, j],
+            'predictions': y_pred[rows, j],
+            'influence': {
+                'leverage': influence['leverage'][rows],
+                'cooks_distance': cooks[rows],
+                'studentized_residuals': influence['studentized_residuals'][rows],
+                'max_leverage': finite_or_none(np.nanmax(influence['leverage'])),
+                'max_cooks_distance': finite_or_none(np.nanmax(cooks)),
+                'n_influential': int((cooks > 4 / fit.n).sum())
+            }
+        })
     
     return results
 
-def fit_polynomial_regression(X, y, feature_names, target_name, degree):
+def fit_models_from_moments(moments, ivs, dvs):
     """
-    Fit polynomial regression model
+    Fit linear models for each DV from streamed sufficient statistics alone
+
+    moments is a streaming.MomentAccumulator over (at least) ivs + dvs; no
+    row-level data is needed, so residual diagnostics are not available.
     """
-    poly = PolynomialFeatures(degree=degree, include_bias=False)
-    X_poly = poly.fit_transform(X)
+    ix = moments.indices(ivs)
+    iy = moments.indices(dvs)
+    gram = moments.comoment[np.ix_(ix, ix)]
+    xty = moments.comoment[np.ix_(ix, iy)]
+    tss = np.diag(moments.comoment)[iy]
     
-    model = LinearRegression()
-    model.fit(X_poly, y)
+    factorization = GramFactorization(gram)
+    slopes = factorization.solve(xty)
+    rss = np.maximum(tss - (xty * slopes).sum(axis=0), 0.0)
+    intercepts = moments.mean[iy] - moments.mean[ix] @ slopes
     
-    y_pred = model.predict(X_poly)
+    # Unscaled covariance of [intercept, slopes] from (X'X)^-1 of the centred design
+    inv = factorization.inverse()
+    x_mean = moments.mean[ix]
+    cov_diag = np.concatenate([[1.0 / moments.count + x_mean @ np.nan_to_num(inv) @ x_mean], np.diag(inv)])
     
-    # Calculate metrics
-    r2 = r2_score(y, y_pred)
-    adj_r2 = 1 - (1 - r2) * (len(y) - 1) / (len(y) - X_poly.shape[1] - 1)
-    rmse = np.sqrt(mean_squared_error(y, y_pred))
-    
-    # AIC and BIC
-    n = len(y)
-    p = X_poly.shape[1]
-    rss = ((y - y_pred) ** 2).sum()
-    aic = n * np.log(rss / n) + 2 * p
-    bic = n * np.log(rss / n) + p * np.log(n)
+    params = np.vstack([intercepts, slopes])
+    summaries = linear_model_summaries(ivs, params, cov_diag, rss, tss, moments.count, factorization.rank + 1)
+    return {dv: {'linear': summary} for dv, summary in zip(dvs, summaries)}
+
+def linear_model_summaries(feature_names, params, cov_diag, rss, tss, n, rank):
+    """
+    Fit statistics for k linear models sharing one design, computed together
+
+    params holds [intercept, slopes...] per column, cov_diag the diagonal of
+    the unscaled coefficient covariance and rank the number of estimable
+    parameters including the intercept.
+    """
+    df_model = rank - 1
+    df_resid = n - rank
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r2 = np.where(tss > 0, 1 - rss / tss, np.where(rss > 0, 0.0, 1.0))
+        adj_r2 = 1 - (1 - r2) * (n - 1) / df_resid
+        rmse = np.sqrt(rss / n)
+        
+        # F-statistic and p-value
+        f_stat = (r2 / df_model) / ((1 - r2) / df_resid)
+        f_pvalue = stats.f.sf(f_stat, df_model, df_resid)
+        
+        # Coefficient standard errors (intercept first)
+        se = np.sqrt(np.outer(cov_diag, rss / df_resid))
+        t_stats = params / se
+        p_values = 2 * stats.t.sf(np.abs(t_stats), df_resid)
     
-    results = {
-        'degree': degree,
-        'r_squared': float(r2),
-        'adj_r_squared': float(adj_r2),
-        'rmse': float(rmse),
-        'aic': float(aic),
-        'bic': float(bic)
-    }
+    results = []
+    for j in range(params.shape[1]):
+        results.append({
+            'intercept': float(params[0, j]),
+            'intercept_p_value': finite_or_none(p_values[0, j]),
+            'coefficients': {name: float(coef) for name, coef in zip(feature_names, params[1:, j])},
+            'std_errors': {name: finite_or_none(e) for name, e in zip(feature_names, se[1:, j])},
+            'p_values': {name: finite_or_none(p) for name, p in zip(feature_names, p_values[1:, j])},
+            'r_squared': float(r2[j]),
+            'adj_r_squared': float(adj_r2[j]),
+            'rmse': float(rmse[j]),
+            'f_statistic': float(f_stat[j]),
+            'f_pvalue': float(f_pvalue[j]),
+            'rank': rank
+        })
     
     return results
+
+def finite_or_none(value):
+    """
+    Float value, or None when it is NaN/inf (e.g. for aliased coefficients)
+    """
+    value = float(value)
+    return value if np.isfinite(value) else None
@@ -0,0 +1,143 @@
+# normality.py - Batched normality tests for many columns at once
+
+import warnings
+import numpy as np
+from executor import parallel_map
+from lazy import LazyModule
+
+# Largest sample Shapiro-Wilk is run on; bigger samples are subsampled
+SHAPIRO_SAMPLE_SIZE = 5000
+# Seed of the Shapiro-Wilk subsample, so repeated runs give the same p-value
+NORMALITY_SEED = 0
+# Smallest n for which the D'Agostino-Pearson test is defined
+DAGOSTINO_MIN_N = 8
+
+stats = LazyModule('scipy.stats')
+
+def sample_moments(values):
+    """
+    Count, skewness and excess kurtosis of every column of a 2-D array, skipping NaN
+
+    Biased (moment) estimators, as in scipy.stats.skew / kurtosis and
+    column_stats.column_statistics.
+    """
+    values = np.asarray(values, dtype=float)
+    present = ~np.isnan(values)
+    n = present.sum(axis=0).astype(float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.where(n > 0, np.nansum(values, axis=0) / n, 0.0)
+        dev = np.where(present, values - mean, 0.0)
+        dev2 = dev ** 2
+        m2 = dev2.sum(axis=0) / n
+        m3 = (dev2 * dev).sum(axis=0) / n
+        m4 = (dev2 ** 2).sum(axis=0) / n
+        skewness = np.where(m2 > 0, m3 / m2 ** 1.5, np.nan)
+        kurtosis = np.where(m2 > 0, m4 / m2 ** 2 - 3, np.nan)
+    return n, skewness, kurtosis
+
+def moment_tests(n, skewness, kurtosis):
+    """
+    Jarque-Bera and D'Agostino-Pearson K^2 tests from per-column moments
+
+    All arguments are arrays with one entry per column (skewness and
+    excess kurtosis as from sample_moments). Both statistics are
+    chi-squared with 2 degrees of freedom under normality, so the p-value
+    is exp(-stat / 2) and stays meaningful at any n. D'Agostino-Pearson
+    (scipy.stats.normaltest) needs n >= 8 and is NaN below that.
+    """
+    n = np.asarray(n, dtype=float)
+    g1 = np.asarray(skewness, dtype=float)
+    g2 = np.asarray(kurtosis, dtype=float)
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        jb = n / 6 * (g1 ** 2 + g2 ** 2 / 4)
+        k2 = np.where(n >= DAGOSTINO_MIN_N, skew_z(n, g1) ** 2 + kurtosis_z(n, g2 + 3) ** 2, np.nan)
+
+    return {
+        'jarque_bera_stat': jb,
+        'jarque_bera_p': np.exp(-jb / 2),
+        'dagostino_stat': k2,
+        'dagostino_p': np.exp(-k2 / 2)
+    }
+
+def skew_z(n, b1):
+    """
+    D'Agostino's normal approximation to the sample skewness (scipy.stats.skewtest)
+    """
+    y = b1 * np.sqrt((n + 1) * (n + 3) / (6.0 * (n - 2)))
+    beta2 = 3.0 * (n ** 2 + 27 * n - 70) * (n + 1) * (n + 3) / ((n - 2) * (n + 5) * (n + 7) * (n + 9))
+    w2 = -1 + np.sqrt(2 * (beta2 - 1))
+    delta = 1 / np.sqrt(0.5 * np.log(w2))
+    alpha = np.sqrt(2.0 / (w2 - 1))
+    y = np.where(y == 0, 1, y)
+    return delta * np.log(y / alpha + np.sqrt((y / alpha) ** 2 + 1))
+
+def kurtosis_z(n, b2):
+    """
+    Anscombe-Glynn normal approximation to the sample (Pearson) kurtosis (scipy.stats.kurtosistest)
+    """
+    expected = 3.0 * (n - 1) / (n + 1)
+    variance = 24.0 * n * (n - 2) * (n - 3) / ((n + 1) ** 2 * (n + 3) * (n + 5))
+    x = (b2 - expected) / np.sqrt(variance)
+    sqrt_beta1 = (6.0 * (n * n - 5 * n + 2) / ((n + 7) * (n + 9))
+                  * np.sqrt(6.0 * (n + 3) * (n + 5) / (n * (n - 2) * (n - 3))))
+    a = 6.0 + 8.0 / sqrt_beta1 * (2.0 / sqrt_beta1 + np.sqrt(1 + 4.0 / sqrt_beta1 ** 2))
+    term1 = 1 - 2 / (9.0 * a)
+    denom = 1 + x * np.sqrt(2 / (a - 4.0))
+    term2 = np.sign(denom) * np.where(denom == 0, np.nan, np.abs((1 - 2.0 / a) / np.where(denom == 0, 1, denom)) ** (1 / 3.0))
+    return (term1 - term2) / np.sqrt(2 / (9.0 * a))
+
+def shapiro_unit(unit):
+    """
+    Shapiro-Wilk on one column, on a seeded subsample when it is large
+
+    unit is (non-missing values, sample size, seed). Returns (stat, p, n used),
+    or (None, None, 0) when there are fewer than 3 values.
+    """
+    data, sample_size, seed = unit
+    if len(data) < 3:
+        return None, None, 0
+    if len(data) > sample_size:
+        rng = np.random.default_rng(seed)
+        data = data[np.sort(rng.choice(len(data), sample_size, replace=False))]
+    with warnings.catch_warnings():
+        # Constant input: scipy warns and returns p = 1
+        warnings.simplefilter('ignore', UserWarning)
+        stat, p = stats.shapiro(data)
+    return float(stat), float(p), len(data)
+
+def batch_normality(columns, moments, shapiro_sample=SHAPIRO_SAMPLE_SIZE, seed=NORMALITY_SEED,
+                    alpha=0.05, executor=None, names=None):
+    """
+    Normality tests for many columns: moment tests in one vectorized pass, Shapiro-Wilk per column
+
+    columns is a list of 1-D arrays of non-missing values and moments is
+    (n, skewness, excess kurtosis) with one entry per column (e.g. from
+    sample_moments or column_statistics). shapiro_sample caps the
+    Shapiro-Wilk sample size (None or 0 skips it); the per-column Shapiro
+    runs go through parallel_map. The verdict (normality_test,
+    normality_p, is_normal) uses Shapiro-Wilk when it saw the whole
+    column, otherwise D'Agostino-Pearson on the full data, falling back
+    to Jarque-Bera below its minimum n.
+    """
+    n = np.asarray(moments[0], dtype=float)
+    tests = moment_tests(*moments)
+    if shapiro_sample:
+        units = [(np.asarray(data, dtype=float), shapiro_sample, seed) for data in columns]
+        shapiro = parallel_map(shapiro_unit, units, executor, names=names)
+    else:
+        shapiro = [(None, None, 0)] * len(columns)
+
+    results = []
+    for j, (sw_stat, sw_p, sw_n) in enumerate(shapiro):
+        result = {key: float(values[j]) for key, values in tests.items()}
+        result.update({'shapiro_stat': sw_stat, 'shapiro_p': sw_p, 'shapiro_n': sw_n})
+        if sw_p is not None and sw_n == n[j]:
+            result['normality_test'], result['normality_p'] = 'shapiro', sw_p
+        elif n[j] >= DAGOSTINO_MIN_N:
+            result['normality_test'], result['normality_p'] = 'dagostino', result['dagostino_p']
+        else:
+            result['normality_test'], result['normality_p'] = 'jarque_bera', result['jarque_bera_p']
+        result['is_normal'] = bool(result['normality_p'] > alpha)
+        results.append(result)
+    return results
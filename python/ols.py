@@ -0,0 +1,287 @@
+# ols.py - Shared ordinary least squares fits and fit cache
+
+from collections import OrderedDict
+import hashlib
+import threading
+import pandas as pd
+import numpy as np
+from lazy import LazyModule
+
+# Maximum number of fits kept in the cache (each holds n fitted values and residuals)
+FIT_CACHE_SIZE = 32
+# Relative tolerance on the diagonal of R below which a design column is dropped
+RANK_TOL = 1e-10
+# Pivot tolerance for the unit-diagonal Gram matrix. dpstrf compares it with
+# the remaining pivot of X'X, the square of R's diagonal, so RANK_TOL ** 2
+# would make the QR path's decision; forming X'X leaves exact dependencies with
+# pivots of a few eps, so it is floored at 20 eps (a column is dropped below a
+# relative residual of about 7e-8)
+GRAM_RANK_TOL = max(RANK_TOL ** 2, 20 * np.finfo(float).eps)
+
+_fit_cache = OrderedDict()
+_cache_stats = {'hits': 0, 'misses': 0}
+# Held while looking up or filling the cache, so concurrent stages asking for
+# the same fit wait for it instead of fitting twice
+_cache_lock = threading.RLock()
+
+linalg = LazyModule('scipy.linalg')
+lapack = LazyModule('scipy.linalg.lapack')
+
+class DesignFactorization:
+    """
+    Pivoted QR factorization of a design matrix with a leading intercept column
+
+    Columns are scaled to unit norm first so that the rank decision does not
+    depend on the units of the variables.
+    """
+    def __init__(self, X):
+        X = np.asarray(X, dtype=float)
+        if X.ndim == 1:
+            X = X.reshape(-1, 1)
+        self.n, self.p = X.shape
+        A = np.column_stack([np.ones(self.n), X])
+        norms = np.sqrt((A ** 2).sum(axis=0))
+        self.scale = np.where(norms > 0, norms, 1.0)
+        self.q, self.r, self.pivot = linalg.qr(A / self.scale, mode='economic', pivoting=True)
+
+        diag = np.abs(np.diag(self.r))
+        tol = diag[0] * RANK_TOL if len(diag) else 0.0
+        self.rank = int((diag > tol).sum())
+        self.df_resid = self.n - self.rank
+        self._leverage = None
+        self._unscaled_cov = None
+
+    def solve(self, y):
+        """
+        Least squares coefficients [intercept, slopes...] for y (vector or n x k matrix)
+
+        Columns dropped for rank deficiency get a coefficient of zero.
+        """
+        y = np.asarray(y, dtype=float)
+        k = self.rank
+        qty = self.q[:, :k].T @ y
+        beta_piv = linalg.solve_triangular(self.r[:k, :k], qty)
+        kept = self.pivot[:k]
+        beta = np.zeros((self.p + 1,) + y.shape[1:])
+        beta[kept] = beta_piv / (self.scale[kept] if y.ndim == 1 else self.scale[kept, None])
+        return beta
+
+    def project(self, y):
+        """
+        Fitted values: orthogonal projection of y onto the design's column space
+        """
+        q = self.q[:, :self.rank]
+        return q @ (q.T @ y)
+
+    def leverage(self):
+        """
+        Diagonal of the hat matrix, computed once from Q and shared by all targets
+        """
+        if self._leverage is None:
+            self._leverage = (self.q[:, :self.rank] ** 2).sum(axis=1)
+        return self._leverage
+
+    def unscaled_covariance(self):
+        """
+        (A'A)^-1 for the design A = [1, X] in original column order, from R alone
+
+        Rows and columns of dropped (aliased) design columns are NaN.
+        """
+        if self._unscaled_cov is None:
+            k = self.rank
+            r_inv = linalg.solve_triangular(self.r[:k, :k], np.eye(k))
+            cov = np.full((self.p + 1, self.p + 1), np.nan)
+            kept = self.pivot[:k]
+            cov[np.ix_(kept, kept)] = (r_inv @ r_inv.T) / np.outer(self.scale[kept], self.scale[kept])
+            self._unscaled_cov = cov
+        return self._unscaled_cov
+
+class GramFactorization:
+    """
+    Pivoted Cholesky factorization of a centred Gram matrix X'X (intercept profiled out)
+
+    The streaming counterpart of DesignFactorization: R'R = X'X[pivot, pivot]
+    is the same R a QR of the centred design would give, and aliased
+    columns are handled the same way. Rank decisions match the in-memory
+    path except for columns whose relative residual on the others lies
+    between RANK_TOL and sqrt(GRAM_RANK_TOL) (about 7e-8): X'X cannot tell
+    those from exact dependencies, so this path drops them.
+    """
+    def __init__(self, gram):
+        gram = np.asarray(gram, dtype=float)
+        self.p = gram.shape[0]
+        # Scale to unit diagonal so the rank tolerance is unit-free
+        diag = np.diag(gram)
+        self.scale = np.where(diag > 0, np.sqrt(diag), 1.0)
+        scaled = gram / np.outer(self.scale, self.scale)
+        c, piv, rank, _ = lapack.dpstrf(scaled, tol=GRAM_RANK_TOL, lower=0)
+        self.rank = int(rank) if np.any(diag > 0) else 0
+        self.pivot = piv - 1
+        self.r = np.triu(c)[:self.rank, :self.rank]
+
+    def solve(self, xty):
+        """
+        Slope coefficients for X'y (vector or p x k matrix); aliased columns get zero
+        """
+        xty = np.asarray(xty, dtype=float)
+        kept = self.pivot[:self.rank]
+        rhs = xty[kept] / (self.scale[kept] if xty.ndim == 1 else self.scale[kept, None])
+        z = linalg.solve_triangular(self.r, rhs, trans='T')
+        w = linalg.solve_triangular(self.r, z)
+        beta = np.zeros((self.p,) + xty.shape[1:])
+        beta[kept] = w / (self.scale[kept] if xty.ndim == 1 else self.scale[kept, None])
+        return beta
+
+    def inverse(self):
+        """
+        (X'X)^-1 in original column order; rows and columns of aliased columns are NaN
+        """
+        kept = self.pivot[:self.rank]
+        r_inv = linalg.solve_triangular(self.r, np.eye(self.rank))
+        inv = np.full((self.p, self.p), np.nan)
+        inv[np.ix_(kept, kept)] = (r_inv @ r_inv.T) / np.outer(self.scale[kept], self.scale[kept])
+        return inv
+
+class OLSFit:
+    """
+    Linear regression of one target on a factorized design, with intercept
+    """
+    def __init__(self, factorization, y, beta=None, fitted=None):
+        y = np.asarray(y, dtype=float)
+        if beta is None:
+            beta = factorization.solve(y)
+        if fitted is None:
+            fitted = factorization.project(y)
+
+        self.factorization = factorization
+        self.y = y
+        self.intercept = float(beta[0])
+        self.coef = beta[1:]
+        self.fitted = fitted
+        self.residuals = y - fitted
+        self.n = factorization.n
+        self.p = factorization.p
+
+    def residual_variance(self):
+        """
+        Unbiased estimate of the error variance (RSS / residual degrees of freedom)
+        """
+        df_resid = self.factorization.df_resid
+        return float(self.residuals @ self.residuals / df_resid) if df_resid > 0 else np.nan
+
+    def influence(self):
+        """
+        Leverage, Cook's distance and externally studentized residuals
+
+        All derived from the hat diagonal of the shared factorization, so the
+        extra cost over the fit is O(n).
+        """
+        h = self.factorization.leverage()
+        k = self.factorization.rank
+        df_resid = self.factorization.df_resid
+        s2 = self.residual_variance()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            one_minus_h = 1.0 - h
+            internal = self.residuals / np.sqrt(s2 * one_minus_h)
+            cooks = internal ** 2 * h / (k * one_minus_h)
+            external = internal * np.sqrt((df_resid - 1) / (df_resid - internal ** 2))
+        return {
+            'leverage': h,
+            'cooks_distance': cooks,
+            'studentized_residuals': external
+        }
+
+def fit_batch(X, Y):
+    """
+    Fit every column of Y on the same design with a single factorization
+
+    Returns one OLSFit per target, all sharing the factorization.
+    """
+    factorization = DesignFactorization(X)
+    Y = np.asarray(Y, dtype=float)
+    beta = factorization.solve(Y)
+    fitted = factorization.project(Y)
+    return [
+        OLSFit(factorization, Y[:, j], beta=beta[:, j], fitted=fitted[:, j])
+        for j in range(Y.shape[1])
+    ]
+
+def data_fingerprint(df, columns):
+    """
+    Content hash of the given DataFrame columns, used to key cached fits
+    """
+    hasher = hashlib.sha1()
+    hasher.update('\x1f'.join(map(str, columns)).encode())
+    hasher.update(pd.util.hash_pandas_object(df[columns], index=False).values.tobytes())
+    return hasher.hexdigest()
+
+def fit_cache_key(fingerprint, ivs, dv):
+    """
+    Cache key for the fit of dv on ivs over data with the given fingerprint
+    """
+    return (fingerprint, tuple(ivs), dv)
+
+def cached_fit(key, X, y):
+    """
+    Return the OLSFit for key, fitting and storing it on a miss
+
+    A key of None bypasses the cache.
+    """
+    if key is None:
+        return OLSFit(DesignFactorization(X), y)
+    
+    with _cache_lock:
+        if key in _fit_cache:
+            _fit_cache.move_to_end(key)
+            _cache_stats['hits'] += 1
+            return _fit_cache[key]
+
+        fit = OLSFit(DesignFactorization(X), y)
+        _store_fit(key, fit)
+        return fit
+
+def cached_batch_fit(keys, X, Y):
+    """
+    Return OLSFits for every column of Y, fitting all cache misses in one batch
+    """
+    Y = np.asarray(Y, dtype=float)
+    if keys is None:
+        return fit_batch(X, Y)
+
+    fits = [None] * len(keys)
+    missing = []
+    with _cache_lock:
+        for j, key in enumerate(keys):
+            if key in _fit_cache:
+                _fit_cache.move_to_end(key)
+                _cache_stats['hits'] += 1
+                fits[j] = _fit_cache[key]
+            else:
+                missing.append(j)
+
+        if missing:
+            for j, fit in zip(missing, fit_batch(X, Y[:, missing])):
+                _store_fit(keys[j], fit)
+                fits[j] = fit
+    return fits
+
+def _store_fit(key, fit):
+    _cache_stats['misses'] += 1
+    _fit_cache[key] = fit
+    while len(_fit_cache) > FIT_CACHE_SIZE:
+        _fit_cache.popitem(last=False)
+
+def cache_stats():
+    """
+    Snapshot of fit cache hit/miss counters
+    """
+    return dict(_cache_stats, size=len(_fit_cache))
+
+def clear_fit_cache():
+    """
+    Drop all cached fits and reset counters
+    """
+    with _cache_lock:
+        _fit_cache.clear()
+        _cache_stats['hits'] = 0
+        _cache_stats['misses'] = 0
@@ -0,0 +1,188 @@
+# pipeline.py - Analysis stage graph with memoized stage results
+
+from collections import OrderedDict
+import copy
+import hashlib
+import json
+import numpy as np
+import pandas as pd
+from executor import stage_pool
+
+# Maximum number of memoized stage results kept across configurations
+STAGE_CACHE_SIZE = 32
+# Approximate bytes of arrays and DataFrames the memoized results may hold;
+# each preprocess result is a full copy of the cleaned data, and under
+# Pyodide it all lives in the browser's heap
+STAGE_CACHE_BYTES = 256 * 2 ** 20
+
+class StageGraph:
+    """
+    Analysis stages with explicit dependencies, memoized per stage
+
+    Each stage's cache key combines the input data key, the keys of the
+    stages it depends on and the slice of the configuration it reads, so a
+    configuration change only recomputes the stages whose slice (or whose
+    upstream) actually changed. Results are kept in an LRU shared by all
+    stages, bounded both by entry count and by the approximate size of the
+    arrays and DataFrames they hold (result_size); a result larger than the
+    whole byte budget is not memoized.
+
+    The cache holds its own deep copies: a stored result is copied when it
+    is computed, and a recalled one is copied again on every hit. Outputs
+    returned by run() therefore belong to the caller, who may modify them
+    without changing later cache hits. Copying costs one pass over the
+    result, which is cheap next to the stages that produce it.
+    """
+    def __init__(self, max_entries=STAGE_CACHE_SIZE, max_bytes=STAGE_CACHE_BYTES):
+        self.stages = OrderedDict()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._cache = OrderedDict()
+        self._sizes = {}
+        self.cached_bytes = 0
+
+    def add_stage(self, name, func, deps=(), config_slice=None, memoize=True, packages=()):
+        """
+        Register a stage; deps must already be registered
+
+        func(data, inputs, config, executor) receives the raw input data, a
+        dict of dependency outputs, the full configuration and the executor
+        for per-unit work (None when running serially). config_slice(config)
+        returns the JSON-serializable part of the configuration it reads.
+        packages lists the Pyodide packages the stage imports beyond numpy
+        and pandas, or is a callable packages(config) returning that list.
+        """
+        for dep in deps:
+            if dep not in self.stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+        self.stages[name] = {
+            'func': func,
+            'deps': tuple(deps),
+            'config_slice': config_slice or (lambda config: None),
+            'memoize': memoize,
+            'packages': packages
+        }
+
+    def stage_keys(self, data_key, config):
+        """
+        Cache key of every stage for the given data and configuration
+        """
+        keys = {}
+        for name, stage in self.stages.items():
+            payload = json.dumps(
+                [name, data_key, [keys[dep] for dep in stage['deps']], stage['config_slice'](config)],
+                sort_keys=True, default=str
+            )
+            keys[name] = hashlib.sha1(payload.encode()).hexdigest()
+        return keys
+
+    def run(self, data, data_key, config, executor=None, instrumentation=None, context=None):
+        """
+        Run (or recall) every stage in dependency order
+
+        context maps names to objects that describe the data (such as the
+        ingestion profile); every stage finds them among its inputs. They
+        are not part of the cache keys, so data_key must account for them.
+
+        With an executor, stages whose dependencies are all satisfied run
+        concurrently in waves; outputs are collected by stage name, so the
+        results do not depend on completion order. With an
+        instrumentation.Instrumentation, every computed stage and its units
+        are recorded. Returns (outputs, status) where status maps each stage
+        to 'cached' or 'computed'.
+        """
+        keys = self.stage_keys(data_key, config)
+        pool = stage_pool(executor)
+        outputs = {}
+        status = {}
+        for wave in self.waves():
+            pending = {}
+            for name in wave:
+                stage = self.stages[name]
+                key = keys[name]
+                if stage['memoize'] and key in self._cache:
+                    self._cache.move_to_end(key)
+                    outputs[name] = copy.deepcopy(self._cache[key])
+                    status[name] = 'cached'
+                    continue
+                inputs = dict(context or {})
+                inputs.update((dep, outputs[dep]) for dep in stage['deps'])
+                call = [stage['func'], data, inputs, config, executor]
+                if instrumentation is not None:
+                    call = [instrumentation.run_stage, name] + call
+                if pool is None:
+                    outputs[name] = call[0](*call[1:])
+                else:
+                    pending[name] = pool.submit(*call)
+                status[name] = 'computed'
+            
+            for name, future in pending.items():
+                outputs[name] = future.result()
+            for name in wave:
+                if status[name] == 'computed' and self.stages[name]['memoize']:
+                    self._store(keys[name], outputs[name])
+        return outputs, status
+
+    def required_packages(self, config, stages=None):
+        """
+        Sorted Pyodide packages needed to run the given stages (default: all) under config
+        """
+        packages = set()
+        for name in (self.stages if stages is None else stages):
+            stage_packages = self.stages[name]['packages']
+            if callable(stage_packages):
+                stage_packages = stage_packages(config)
+            packages.update(stage_packages)
+        return sorted(packages)
+
+    def waves(self):
+        """
+        Stage names grouped so each group depends only on earlier groups
+        """
+        level = {}
+        for name, stage in self.stages.items():
+            level[name] = 1 + max((level[dep] for dep in stage['deps']), default=-1)
+        waves = [[] for _ in range(max(level.values(), default=-1) + 1)]
+        for name in self.stages:
+            waves[level[name]].append(name)
+        return waves
+
+    def _store(self, key, value):
+        size = result_size(value)
+        if size > self.max_bytes:
+            return
+        if key in self._cache:
+            self.cached_bytes -= self._sizes[key]
+        self._cache[key] = copy.deepcopy(value)
+        self._sizes[key] = size
+        self.cached_bytes += size
+        while len(self._cache) > self.max_entries or self.cached_bytes > self.max_bytes:
+            evicted, _ = self._cache.popitem(last=False)
+            self.cached_bytes -= self._sizes.pop(evicted)
+
+    def clear(self):
+        """
+        Drop all memoized stage results
+        """
+        self._cache.clear()
+        self._sizes.clear()
+        self.cached_bytes = 0
+
+def result_size(value):
+    """
+    Approximate bytes held by a stage result: its DataFrames, Series and arrays, found through dicts, lists and tuples
+
+    Shallow DataFrame memory_usage (object columns count their pointers
+    only), so this is cheap enough to run on every stored result.
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=False).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=False))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(result_size(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(result_size(v) for v in value)
+    return 0
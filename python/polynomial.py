@@ -0,0 +1,210 @@
+# polynomial.py - Polynomial regression from a chunked Gram matrix of the expanded terms
+
+import math
+import numpy as np
+from ols import GramFactorization
+from streaming import MomentAccumulator
+
+# Degrees fitted for every DV
+POLYNOMIAL_DEGREES = (2, 3)
+# Working memory for the expansion and its Gram matrix, in MB (config 'polynomialMemoryMB')
+POLYNOMIAL_MEMORY_MB = 64
+# Copies of the (terms + targets)^2 moment matrix alive at once while accumulating and solving
+GRAM_COPIES = 3
+# Copies of a row chunk alive at once (expansion, complete rows, centred values)
+CHUNK_COPIES = 3
+
+def polynomial_terms(p, degree, interaction_only=False):
+    """
+    Monomials of p variables up to degree, in PolynomialFeatures order (no bias)
+
+    Returns (parent, column, degrees) arrays: term t is term parent[t]
+    times variable column[t] (parent -1 for the linear terms), so each
+    degree is built from the one below without recomputing it.
+    """
+    parent, column, degrees = [], [], []
+    index = {}
+    level = []
+    for j in range(p):
+        index[(j,)] = len(parent)
+        level.append((j,))
+        parent.append(-1)
+        column.append(j)
+        degrees.append(1)
+    for d in range(2, degree + 1):
+        next_level = []
+        for term in level:
+            for j in range(term[-1] + (1 if interaction_only else 0), p):
+                next_level.append(term + (j,))
+        # Keep PolynomialFeatures' lexicographic order within a degree
+        for term in sorted(next_level):
+            index[term] = len(parent)
+            parent.append(index[term[:-1]])
+            column.append(term[-1])
+            degrees.append(d)
+        level = sorted(next_level)
+    return np.array(parent, dtype=np.int64), np.array(column, dtype=np.int64), np.array(degrees, dtype=np.int64)
+
+def term_count(p, degree, interaction_only=False):
+    """
+    Number of monomials of p variables of degree 1 to degree
+    """
+    if interaction_only:
+        return sum(math.comb(p, d) for d in range(1, degree + 1))
+    return math.comb(p + degree, degree) - 1
+
+def expand(Z, parent, column, degrees, out=None):
+    """
+    Values of all terms for the rows of Z, one degree at a time
+
+    out may be a wider preallocated array; the terms fill its leading columns.
+    """
+    if out is None:
+        out = np.empty((len(Z), len(parent)))
+    linear = np.flatnonzero(degrees == 1)
+    out[:, linear] = Z[:, column[linear]]
+    for d in range(2, int(degrees.max(initial=1)) + 1):
+        terms = np.flatnonzero(degrees == d)
+        out[:, terms] = out[:, parent[terms]] * Z[:, column[terms]]
+    return out
+
+def fit_polynomial_models(X, Y, target_names, degrees=POLYNOMIAL_DEGREES, interaction_only=False,
+                          ridge=0.0, memory_budget=POLYNOMIAL_MEMORY_MB * 2 ** 20):
+    """
+    Polynomial fits of every column of Y on X, one per degree, from one pass over the rows
+
+    The IVs are standardized first (a polynomial in standardized IVs spans
+    the same space, and the powers stay well scaled). The terms of the
+    highest degree that fits memory_budget (bytes) are expanded chunk by
+    chunk and folded, with the targets, into one MomentAccumulator. Terms
+    are ordered by degree, so the Gram matrix of a lower degree is the
+    leading block of the higher one and every degree is solved from the
+    same pass. Degrees too wide for the budget get an 'error' entry.
+    interaction_only keeps only products of distinct IVs; ridge > 0 adds
+    ridge * diag(X'X) to the Gram matrix, and the fit statistics then use
+    the effective degrees of freedom. Rows with a missing value are
+    skipped. Returns {target: [result per degree]}.
+    """
+    X = np.asarray(X, dtype=float)
+    Y = np.asarray(Y, dtype=float).reshape(len(X), -1)
+    p = X.shape[1]
+    degrees = sorted(degrees)
+    fitted = affordable_degrees(p, Y.shape[1], degrees, interaction_only, memory_budget)
+    results = {target: [] for target in target_names}
+    
+    if fitted:
+        expansion = TermExpansion(X, fitted[-1], interaction_only)
+        moments = expansion.moments(X, Y, memory_budget)
+        for degree in fitted:
+            for target, result in zip(target_names, solve_terms(moments, expansion.size(degree), expansion.targets(Y), ridge)):
+                results[target].append(dict(result, degree=degree))
+    
+    for degree in degrees[len(fitted):]:
+        for target in target_names:
+            results[target].append({
+                'degree': degree,
+                'terms': term_count(p, degree, interaction_only),
+                'error': 'Too many polynomial terms for the memory budget'
+            })
+    
+    for target in target_names:
+        for result in results[target]:
+            result.update({'interaction_only': interaction_only, 'ridge': ridge})
+    return results
+
+def affordable_degrees(p, k, degrees, interaction_only=False, memory_budget=POLYNOMIAL_MEMORY_MB * 2 ** 20):
+    """
+    The degrees (sorted) whose moment matrix over terms and k targets fits in memory_budget bytes
+    """
+    return [d for d in sorted(degrees) if GRAM_COPIES * 8 * (term_count(p, d, interaction_only) + k) ** 2 <= memory_budget]
+
+class TermExpansion:
+    """
+    Polynomial terms of standardized IVs up to a degree, ordered by degree
+
+    The standardization comes from the X it is built on, so expansions of
+    subsets of its rows (e.g. cross-validation folds) share the same terms.
+    """
+    def __init__(self, X, degree, interaction_only=False):
+        self.parent, self.column, self.degrees = polynomial_terms(X.shape[1], degree, interaction_only)
+        self.center = np.nanmean(X, axis=0) if len(X) else np.zeros(X.shape[1])
+        self.scale = np.nanstd(X, axis=0) if len(X) else np.ones(X.shape[1])
+        self.scale[~(self.scale > 0)] = 1.0
+
+    def size(self, degree):
+        """
+        Number of terms of degree 1 to degree (the leading columns)
+        """
+        return int((self.degrees <= degree).sum())
+
+    def targets(self, Y):
+        """
+        Positions of the columns of Y in the moment matrix, after the terms
+        """
+        return np.arange(len(self.parent), len(self.parent) + Y.shape[1])
+
+    def moments(self, X, Y, memory_budget=POLYNOMIAL_MEMORY_MB * 2 ** 20):
+        """
+        MomentAccumulator over [terms, Y] for the rows of X and Y, expanded in chunks within the budget
+        """
+        width = len(self.parent) + Y.shape[1]
+        chunk_rows = max(1, (memory_budget - GRAM_COPIES * 8 * width ** 2) // (CHUNK_COPIES * 8 * width))
+        moments = MomentAccumulator(range(width))
+        for start in range(0, len(X), chunk_rows):
+            rows = slice(start, start + chunk_rows)
+            block = np.empty((len(Y[rows]), width))
+            expand((X[rows] - self.center) / self.scale, self.parent, self.column, self.degrees, out=block)
+            block[:, len(self.parent):] = Y[rows]
+            moments.update_values(block)
+        return moments
+
+def solve_terms(moments, size, targets, ridge=0.0):
+    """
+    Fit statistics of every target column on the first size columns (terms) of a MomentAccumulator
+
+    AIC and BIC count the intercept-free model degrees of freedom (the
+    rank of the terms, or the effective df under ridge), as the sklearn
+    fits this replaced counted the feature columns; adj. R² is None when no
+    residual degrees of freedom are left.
+    """
+    n = moments.count
+    gram = moments.comoment[:size, :size]
+    xty = moments.comoment[:size, targets]
+    tss = np.diag(moments.comoment)[targets]
+    
+    slopes, df_model = solve_slopes(gram, xty, ridge)
+    rss = np.maximum(tss - 2 * (xty * slopes).sum(axis=0) + (slopes * (gram @ slopes)).sum(axis=0), 0.0)
+    df_resid = n - df_model - 1
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r2 = np.where(tss > 0, 1 - rss / tss, np.where(rss > 0, 0.0, 1.0))
+        adj_r2 = 1 - (1 - r2) * (n - 1) / df_resid if df_resid > 0 else np.full(len(tss), np.nan)
+        log_term = n * np.log(rss / n)
+        aic = log_term + 2 * df_model
+        bic = log_term + df_model * np.log(n)
+    
+    results = []
+    for j in range(len(tss)):
+        results.append({
+            'terms': size,
+            'df_model': df_model,
+            'r_squared': float(r2[j]),
+            'adj_r_squared': float(adj_r2[j]) if np.isfinite(adj_r2[j]) else None,
+            'rmse': float(np.sqrt(rss[j] / n)),
+            'aic': float(aic[j]) if np.isfinite(aic[j]) else None,
+            'bic': float(bic[j]) if np.isfinite(bic[j]) else None
+        })
+    return results
+
+def solve_slopes(gram, xty, ridge=0.0):
+    """
+    Slopes for a centred Gram matrix and X'Y, and the model degrees of freedom
+
+    With ridge > 0 the penalty is ridge * diag(gram) and the degrees of
+    freedom are the effective ones, trace((G + ridge D)^-1 G).
+    """
+    if ridge > 0:
+        factorization = GramFactorization(gram + ridge * np.diag(np.diag(gram)))
+        return factorization.solve(xty), float(np.trace(factorization.solve(gram)))
+    factorization = GramFactorization(gram)
+    return factorization.solve(xty), factorization.rank
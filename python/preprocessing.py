@@ -3,91 +3,168 @@
 import pandas as pd
 import numpy as np
 import json
+from column_stats import column_statistics
 
-def convert_numpy_types(obj):
-    """
-    Recursively convert numpy types to native Python types for JSON serialization
-    """
-    if isinstance(obj, dict):
-        return {key: convert_numpy_types(value) for key, value in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_numpy_types(item) for item in obj]
-    elif isinstance(obj, np.integer):
-        return int(obj)
-    elif isinstance(obj, np.floating):
-        return float(obj)
-    elif isinstance(obj, np.bool_):
-        return bool(obj)
-    elif isinstance(obj, np.ndarray):
-        return obj.tolist()
-    else:
-        return obj
-
-def assess_data_quality(df, selected_columns):
+def assess_data_quality(df, selected_columns, profile=None):
     """
     Assess data quality for selected columns
     Returns dict with issues per column
+
+    If profile (an ingestion.ColumnProfile collected while loading the data)
+    covers a column, its statistics are used instead of rescanning df; the
+    quartiles and outlier counts are then approximate for very large files.
     """
     quality_report = {}
     
+    if profile is not None:
+        unprofiled = [col for col in selected_columns if profile.column_index(col) is None]
+    else:
+        unprofiled = list(selected_columns)
+    
+    if unprofiled:
+        # Vectorized over all columns not covered by the profile
+        col_stats = column_statistics(df, unprofiled)
+        IQR = col_stats.loc['q3'] - col_stats.loc['q1']
+        lower_bounds = col_stats.loc['q1'] - 1.5 * IQR
+        upper_bounds = col_stats.loc['q3'] + 1.5 * IQR
+        values = df[unprofiled]
+        outlier_counts = ((values < lower_bounds) | (values > upper_bounds)).sum()
+    
     for col in selected_columns:
+        if col not in unprofiled:
+            issues = profile_quality_issues(profile, col)
+            if issues:
+                quality_report[col] = issues
+            continue
+        
         issues = {}
         
         # Check missing values
-        missing_count = df[col].isnull().sum()
+        missing_count = col_stats.at['missing', col]
         if missing_count > 0:
             issues['missing_count'] = int(missing_count)
             issues['missing_percent'] = float(missing_count / len(df) * 100)
-            issues['median'] = float(df[col].median())
-            issues['mean'] = float(df[col].mean())
+            issues['median'] = float(col_stats.at['median', col])
+            issues['mean'] = float(col_stats.at['mean', col])
         
         # Check for outliers using IQR method
-        Q1 = df[col].quantile(0.25)
-        Q3 = df[col].quantile(0.75)
-        IQR = Q3 - Q1
-        lower_bound = Q1 - 1.5 * IQR
-        upper_bound = Q3 + 1.5 * IQR
-        
-        outliers = ((df[col] < lower_bound) | (df[col] > upper_bound)).sum()
+        outliers = outlier_counts[col]
         if outliers > 0:
             issues['outlier_count'] = int(outliers)
-            issues['lower_bound'] = float(lower_bound)
-            issues['upper_bound'] = float(upper_bound)
+            issues['lower_bound'] = float(lower_bounds[col])
+            issues['upper_bound'] = float(upper_bounds[col])
         
         if issues:
             quality_report[col] = issues
 
-    return convert_numpy_types(quality_report)
+    return quality_report
+
+def profile_quality_issues(profile, col):
+    """
+    Quality issues for one column from an ingestion profile, without the data
+    """
+    issues = {}
+    summary = profile.summary(col)
+    sketch = profile.sketches[profile.column_index(col)]
+    
+    # Check missing values
+    missing_count = summary['missing_count']
+    if missing_count > 0:
+        issues['missing_count'] = missing_count
+        issues['missing_percent'] = float(missing_count / profile.rows * 100)
+        issues['median'] = summary['median']
+        issues['mean'] = summary['mean']
+    
+    # Check for outliers using IQR method
+    IQR = summary['q3'] - summary['q1']
+    lower_bound = summary['q1'] - 1.5 * IQR
+    upper_bound = summary['q3'] + 1.5 * IQR
+    
+    outliers = int(round(sketch.count_below(lower_bound) + sketch.count_above(upper_bound)))
+    if outliers > 0:
+        issues['outlier_count'] = outliers
+        issues['lower_bound'] = float(lower_bound)
+        issues['upper_bound'] = float(upper_bound)
+    
+    return issues
 
-def preprocess_data(df, selected_columns, missing_strategy, outlier_decisions):
+def preprocess_data(df, selected_columns, missing_strategy, outlier_decisions, return_report=False):
     """
     Apply preprocessing decisions
+
+    All drop and outlier rules are combined into one row mask and the
+    cleaned frame is materialized once, with imputations filled in a
+    single vectorized step. With return_report=True, also returns the
+    per-rule report from plan_preprocessing.
     """
-    df_clean = df[selected_columns].copy()
+    plan = plan_preprocessing(df, selected_columns, missing_strategy, outlier_decisions)
     
+    df_clean = df.loc[plan['mask'], selected_columns] if not plan['mask'].all() else df[selected_columns].copy()
+    if plan['fill_values']:
+        df_clean.fillna(plan['fill_values'], inplace=True)
+    
+    if return_report:
+        return df_clean, plan['report']
+    return df_clean
+
+def plan_preprocessing(df, selected_columns, missing_strategy, outlier_decisions):
+    """
+    Combine preprocessing decisions into a row mask and imputation values
+
+    Rules are evaluated against the same base rather than one after another:
+    imputation values come from rows kept by the 'drop' rules, and outlier
+    bounds from those rows after imputation. Returns a dict with 'mask',
+    'fill_values' and 'report' (rows removed by each rule, attributed to
+    the first rule that removes them).
+    """
     # Parse JSON strings if needed
     if isinstance(missing_strategy, str):
         missing_strategy = json.loads(missing_strategy)
     if isinstance(outlier_decisions, str):
         outlier_decisions = json.loads(outlier_decisions)
     
-    # Handle missing values
-    for col, strategy in missing_strategy.items():
-        if strategy == 'drop':
-            df_clean = df_clean.dropna(subset=[col])
-        elif strategy == 'median':
-            df_clean[col].fillna(df_clean[col].median(), inplace=True)
-        elif strategy == 'mean':
-            df_clean[col].fillna(df_clean[col].mean(), inplace=True)
+    mask = np.ones(len(df), dtype=bool)
+    rules = []
     
-    # Handle outliers
-    for col, decision in outlier_decisions.items():
-        if decision == 'remove':
-            Q1 = df_clean[col].quantile(0.25)
-            Q3 = df_clean[col].quantile(0.75)
-            IQR = Q3 - Q1
-            lower_bound = Q1 - 1.5 * IQR
-            upper_bound = Q3 + 1.5 * IQR
-            df_clean = df_clean[(df_clean[col] >= lower_bound) & (df_clean[col] <= upper_bound)]
+    # Missing values: drop rules
+    drop_cols = [col for col, strategy in missing_strategy.items() if strategy == 'drop']
+    for col in drop_cols:
+        rule_mask = df[col].notna().to_numpy()
+        rules.append({'rule': 'drop_missing', 'column': col, 'rows_removed': int((mask & ~rule_mask).sum())})
+        mask &= rule_mask
     
-    return df_clean
+    # Missing values: imputation, from the rows kept so far
+    impute = {col: strategy for col, strategy in missing_strategy.items() if strategy in ('median', 'mean')}
+    base = df if mask.all() else df.loc[mask]
+    fill_values = {}
+    if impute:
+        col_stats = column_statistics(base, list(impute))
+        fill_values = {col: float(col_stats.at[strategy, col]) for col, strategy in impute.items()}
+    
+    # Outliers: IQR bounds on the imputed data kept by the drop rules
+    outlier_cols = [col for col, decision in outlier_decisions.items() if decision == 'remove']
+    if outlier_cols:
+        imputed = [col for col in outlier_cols if col in fill_values]
+        if imputed:
+            base = base[outlier_cols].fillna({col: fill_values[col] for col in imputed})
+        col_stats = column_statistics(base, outlier_cols)
+        IQR = col_stats.loc['q3'] - col_stats.loc['q1']
+        lower_bounds = col_stats.loc['q1'] - 1.5 * IQR
+        upper_bounds = col_stats.loc['q3'] + 1.5 * IQR
+        
+        for col in outlier_cols:
+            values = df[col].to_numpy(dtype=float)
+            if col in fill_values:
+                values = np.where(np.isnan(values), fill_values[col], values)
+            rule_mask = (values >= lower_bounds[col]) & (values <= upper_bounds[col])
+            rules.append({'rule': 'remove_outliers', 'column': col, 'rows_removed': int((mask & ~rule_mask).sum()),
+                          'lower_bound': float(lower_bounds[col]), 'upper_bound': float(upper_bounds[col])})
+            mask &= rule_mask
+    
+    report = {
+        'rows_before': len(df),
+        'rows_after': int(mask.sum()),
+        'rules': rules,
+        'imputed': {col: {'strategy': impute[col], 'value': value} for col, value in fill_values.items()}
+    }
+    return {'mask': mask, 'fill_values': fill_values, 'report': report}
@@ -3,6 +3,9 @@
 import json
 import numpy as np
 
+# Strongest pairs listed per method when correlations were screened into edge lists
+REPORT_SCREENED_EDGES = 20
+
 def generate_html_report(all_results, config, df):
     """
     Generate comprehensive HTML report
@@ -121,6 +124,12 @@ def generate_quality_section(df):
     """
     return html
 
+def format_stat(value, spec):
+    """Format a statistic, showing N/A for values that were not finite (serialized as null)"""
+    if value is None or not np.isfinite(value):
+        return "N/A"
+    return format(value, spec)
+
 def generate_distribution_section(distributions):
     """Generate distribution analysis section"""
     if not distributions:
@@ -133,10 +142,10 @@ def generate_distribution_section(distributions):
         html += f"""
         <tr>
             <td><strong>{var}</strong></td>
-            <td>{dist['mean']:.2f}</td>
-            <td>{dist['std']:.2f}</td>
+            <td>{format_stat(dist['mean'], '.2f')}</td>
+            <td>{format_stat(dist['std'], '.2f')}</td>
             <td>{normality}</td>
-            <td>{dist['skewness']:.2f}</td>
+            <td>{format_stat(dist['skewness'], '.2f')}</td>
         </tr>
         """
     
@@ -150,13 +159,26 @@ def generate_correlation_section(correlations):
     
     html = "<p>Correlation matrices calculated using multiple methods:</p>"
     
+    counts = next((correlations[m]['counts'] for m in ('pearson', 'spearman', 'kendall')
+                   if correlations.get(m) and correlations[m].get('counts') is not None), None)
+    if counts is not None and len(counts) > 1:
+        pairs = np.asarray(counts)[np.triu_indices(len(counts), k=1)]
+        if pairs.min() != pairs.max():
+            html += f"""<p>Missing values were handled pairwise: each pair of variables uses the rows where
+            both are present (n = {int(pairs.min())} to {int(pairs.max())} per pair).</p>"""
+    
     if correlations.get('pearson'):
         html += "<h4>Pearson Correlation (Linear relationships)</h4>"
-        html += "<p>Matrix visualization would be displayed here using Plotly.</p>"
+        if correlations['pearson'].get('edges') is not None:
+            html += generate_screened_edges(correlations['pearson'])
+        else:
+            html += "<p>Matrix visualization would be displayed here using Plotly.</p>"
     
     if correlations.get('spearman'):
         html += "<h4>Spearman Correlation (Monotonic relationships)</h4>"
         html += "<p>Recommended for non-normally distributed variables.</p>"
+        if correlations['spearman'].get('edges') is not None:
+            html += generate_screened_edges(correlations['spearman'])
     
     if correlations.get('vif'):
         html += "<h4>Multicollinearity (VIF Scores)</h4>"
@@ -166,7 +188,41 @@ def generate_correlation_section(correlations):
             vif_display = f"{vif:.2f}" if vif else "N/A"
             html += f"<tr><td>{var}</td><td>{vif_display}</td><td>{status}</td></tr>"
         html += "</tbody></table>"
+
+        diagnostics = correlations.get('vif_diagnostics') or {}
+        if diagnostics.get('status') == 'singular':
+            dependent = diagnostics.get('collinear_columns', []) + diagnostics.get('constant_columns', [])
+            html += f"""<div class="warning">⚠️ <strong>Singular correlation matrix:</strong>
+            VIF is undefined for {', '.join(dependent)} (constant or exact linear combinations of other variables).</div>"""
+        elif diagnostics.get('status') == 'insufficient_rows':
+            html += f"""<div class="warning">⚠️ <strong>Too few complete rows:</strong>
+            VIF needs at least 2 rows with every variable present ({diagnostics['complete_rows']} found).</div>"""
+        elif diagnostics.get('status') == 'near_singular':
+            html += f"""<div class="warning">⚠️ <strong>Near-singular correlation matrix</strong>
+            (condition number {format_stat(diagnostics['condition_number'], '.0f')}): VIF scores may be unstable.</div>"""
+
+    return html
+
+def generate_screened_edges(result):
+    """Strongest pairs kept by correlation screening"""
+    edges = result['edges']
+    criteria = []
+    if result.get('threshold') is not None:
+        criteria.append(f"|r| ≥ {result['threshold']}")
+    if result.get('top_k'):
+        criteria.append(f"top {result['top_k']} per variable")
+    html = f"""<p>Screened: {len(edges['r'])} of {result['pairs_tested']} pairs kept
+    ({', '.join(criteria)}).</p>"""
+    if len(edges['r']) == 0:
+        return html
     
+    labels = result['labels']
+    html += "<table class='stat-table'><thead><tr><th>Variable 1</th><th>Variable 2</th><th>r</th><th>p-value</th><th>n</th></tr></thead><tbody>"
+    for i in range(min(REPORT_SCREENED_EDGES, len(edges['r']))):
+        html += f"""<tr><td>{labels[int(edges['source'][i])]}</td><td>{labels[int(edges['target'][i])]}</td>
+        <td>{format_stat(edges['r'][i], '.3f')}</td><td>{format_stat(edges['pvalue'][i], '.4f')}</td>
+        <td>{int(edges['count'][i])}</td></tr>"""
+    html += "</tbody></table>"
     return html
 
 def generate_regression_section(regressions):
@@ -182,19 +238,42 @@ def generate_regression_section(regressions):
             linear = models['linear']
             html += f"""
             <div class="finding">
-                <p><strong>R² = {linear['r_squared']:.3f}</strong> (Adjusted R² = {linear['adj_r_squared']:.3f})</p>
-                <p><strong>F-statistic:</strong> {linear['f_statistic']:.2f}, p = {linear['f_pvalue']:.4f}</p>
+                <p><strong>R² = {format_stat(linear['r_squared'], '.3f')}</strong> (Adjusted R² = {format_stat(linear['adj_r_squared'], '.3f')})</p>
+                <p><strong>F-statistic:</strong> {format_stat(linear['f_statistic'], '.2f')}, p = {format_stat(linear['f_pvalue'], '.4f')}</p>
                 <p><strong>Coefficients:</strong></p>
                 <ul>
             """
             for var, coef in linear['coefficients'].items():
                 p_val = linear['p_values'][var]
+                if p_val is None:
+                    html += f"<li>{var}: not estimable (collinear with other predictors)</li>"
+                    continue
                 sig = "***" if p_val < 0.001 else "**" if p_val < 0.01 else "*" if p_val < 0.05 else ""
-                html += f"<li>{var}: {coef:.3f} {sig} (p = {p_val:.4f})</li>"
-            html += "</ul></div>"
+                interval = (linear.get('bootstrap') or {}).get('coefficients', {}).get(var)
+                ci = f", {linear['bootstrap']['confidence']:.0%} CI [{interval[0]:.3f}, {interval[1]:.3f}]" if interval else ""
+                html += f"<li>{var}: {coef:.3f} {sig} (p = {p_val:.4f}{ci})</li>"
+            html += "</ul>"
+            influence = linear.get('influence')
+            if influence and influence.get('n_influential'):
+                html += f"""<p><strong>Influential observations:</strong> {influence['n_influential']}
+                with Cook's distance &gt; 4/n (max = {influence['max_cooks_distance']:.3f})</p>"""
+            html += "</div>"
+        
+        if models.get('cross_validation'):
+            html += generate_cross_validation(models['cross_validation'])
     
     return html
 
+def generate_cross_validation(cv):
+    """Out-of-sample scores of one DV's models, best (lowest RMSE) first"""
+    html = f"<p><strong>{cv['folds']}-fold cross-validation:</strong></p>"
+    html += "<table class='stat-table'><thead><tr><th>Model</th><th>CV RMSE</th><th>CV R²</th></tr></thead><tbody>"
+    for score in sorted(cv['models'], key=lambda s: (s['rmse'] is None, s['rmse'] or 0)):
+        name = 'Linear' if score['model'] == 'linear' else f"Polynomial (degree {score['degree']})"
+        html += f"<tr><td>{name}</td><td>{format_stat(score['rmse'], '.3f')}</td><td>{format_stat(score['r_squared'], '.3f')}</td></tr>"
+    html += "</tbody></table>"
+    return html
+
 def generate_assumptions_section(assumptions):
     """Generate assumption testing section"""
     if not assumptions:
@@ -0,0 +1,106 @@
+# sampling.py - Constant-size chart payloads: reservoir samples, histograms and KDE curves
+
+import numpy as np
+
+# Points kept in the sample sent to the charts
+DEFAULT_SAMPLE_SIZE = 1000
+# Seed of the sample, so repeated runs plot the same points
+SAMPLE_SEED = 0
+# Upper bound on histogram bins (numpy's 'auto' rule grows with n)
+MAX_HISTOGRAM_BINS = 100
+# Points of the grid the density estimate is evaluated on
+KDE_GRID_SIZE = 200
+
+class Reservoir:
+    """
+    Uniform random sample of fixed size from a stream of values (Algorithm R)
+
+    Every value seen so far is in the sample with equal probability,
+    whatever the order of the input, so sorted files are not a problem.
+    Each update is vectorized over the chunk.
+    """
+    def __init__(self, size=DEFAULT_SAMPLE_SIZE, seed=SAMPLE_SEED):
+        self.size = size
+        self.count = 0
+        self.sample = np.empty(0)
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        """
+        Add a chunk of values
+        """
+        values = np.asarray(values)
+        fill = max(0, min(self.size - len(self.sample), len(values)))
+        if fill:
+            self.sample = np.concatenate([self.sample, values[:fill]]).astype(values.dtype, copy=False)
+        rest = values[fill:]
+        if len(rest):
+            # Item t (0-based over the stream) replaces a uniform slot in [0, t]
+            # when that slot falls inside the reservoir
+            positions = self.count + fill + np.arange(len(rest))
+            slots = self._rng.integers(0, positions + 1)
+            keep = slots < self.size
+            self.sample[slots[keep]] = rest[keep]
+        self.count += len(values)
+        return self
+
+def sample_indices(n, size=DEFAULT_SAMPLE_SIZE, seed=SAMPLE_SEED):
+    """
+    Sorted row positions of a uniform reservoir sample of min(n, size) rows out of n
+
+    Used to take the same rows from several aligned arrays (e.g. residuals
+    and predictions of one fit).
+    """
+    return np.sort(Reservoir(size, seed).update(np.arange(n)).sample)
+
+def histogram(values, max_bins=MAX_HISTOGRAM_BINS):
+    """
+    Histogram of the finite values: {'edges': bin edges, 'counts': counts per bin}
+    """
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return {'edges': np.empty(0), 'counts': np.empty(0, dtype=np.int64)}
+    edges = np.histogram_bin_edges(values, bins='auto')
+    if len(edges) - 1 > max_bins:
+        edges = np.histogram_bin_edges(values, bins=max_bins)
+    counts, edges = np.histogram(values, bins=edges)
+    return {'edges': edges, 'counts': counts}
+
+def kde_grid(values, grid_size=KDE_GRID_SIZE):
+    """
+    Gaussian kernel density estimate on a fixed grid: {'x': grid, 'density': values}
+
+    Scott's rule bandwidth. The data are linearly binned onto the grid and
+    convolved with the kernel, so the cost is O(n + grid_size^2) rather
+    than O(n * grid_size). Returns None when the values have no spread.
+    """
+    values = values[np.isfinite(values)]
+    n = len(values)
+    std = values.std(ddof=1) if n > 1 else 0.0
+    if n < 2 or std == 0:
+        return None
+    bandwidth = std * n ** (-1 / 5)
+    grid = np.linspace(values.min() - 3 * bandwidth, values.max() + 3 * bandwidth, grid_size)
+    step = grid[1] - grid[0]
+
+    # Linear binning: each value splits its weight between the two nearest grid points
+    position = (values - grid[0]) / step
+    left = np.clip(np.floor(position).astype(np.int64), 0, grid_size - 2)
+    frac = position - left
+    weights = np.bincount(left, 1 - frac, minlength=grid_size) + np.bincount(left + 1, frac, minlength=grid_size)
+
+    offsets = np.arange(-(grid_size - 1), grid_size) * step
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2) / (bandwidth * np.sqrt(2 * np.pi))
+    density = np.convolve(weights, kernel, mode='valid') / n
+    return {'x': grid, 'density': density}
+
+def distribution_payload(values, sample_size=DEFAULT_SAMPLE_SIZE, seed=SAMPLE_SEED):
+    """
+    Histogram, KDE curve and reservoir sample of one column, sized independently of n
+    """
+    values = np.asarray(values, dtype=float)
+    return {
+        'histogram': histogram(values),
+        'kde': kde_grid(values),
+        'sample': Reservoir(sample_size, seed).update(values).sample
+    }
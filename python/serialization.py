@@ -0,0 +1,105 @@
+# serialization.py - Single-pass JSON encoding of analysis results
+
+import json
+import math
+import re
+import numpy as np
+
+# Tokens json.dumps emits for non-finite floats; only ever rewritten inside
+# numeric-only arrays/lists, where no string values can contain them
+_NONFINITE_TOKEN = re.compile(r'-?Infinity|NaN')
+
+_NUMBER_TYPES = (int, float)
+
+def to_json(obj):
+    """
+    Encode analysis results as JSON in a single pass
+
+    Handles dicts, lists/tuples, numpy arrays and numpy scalars directly.
+    Numeric arrays and numeric-only lists are encoded by the C JSON encoder
+    in one call instead of element by element. NaN and +/-Inf become null,
+    so the output is always valid JSON for JSON.parse.
+    """
+    parts = []
+    _encode(obj, parts.append)
+    return ''.join(parts)
+
+def _encode(obj, emit):
+    if isinstance(obj, dict):
+        emit('{')
+        first = True
+        for key, value in obj.items():
+            if not first:
+                emit(',')
+            first = False
+            emit(json.dumps(key if isinstance(key, str) else str(key)))
+            emit(':')
+            _encode(value, emit)
+        emit('}')
+    elif isinstance(obj, np.ndarray):
+        emit(_encode_array(obj))
+    elif isinstance(obj, (list, tuple)):
+        if all(type(item) in _NUMBER_TYPES for item in obj):
+            emit(_encode_numbers(obj))
+            return
+        emit('[')
+        for i, item in enumerate(obj):
+            if i:
+                emit(',')
+            _encode(item, emit)
+        emit(']')
+    elif obj is None:
+        emit('null')
+    elif isinstance(obj, (bool, np.bool_)):
+        emit('true' if obj else 'false')
+    elif isinstance(obj, (int, np.integer)):
+        emit(str(int(obj)))
+    elif isinstance(obj, (float, np.floating)):
+        value = float(obj)
+        emit(repr(value) if math.isfinite(value) else 'null')
+    elif isinstance(obj, str):
+        emit(json.dumps(obj))
+    else:
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def _encode_numbers(values):
+    text = json.dumps(values)
+    if 'N' in text or 'I' in text:
+        text = _NONFINITE_TOKEN.sub('null', text)
+    return text
+
+def _encode_array(array):
+    if array.dtype.kind in 'fiub':
+        return _encode_numbers(array.tolist())
+    return to_json(array.tolist())
+
+def to_columnar(obj):
+    """
+    Split results into a small JSON header and one contiguous float64 buffer
+
+    Every numeric numpy array in obj is copied into the buffer and replaced
+    in the header by {"__ndarray__": {"offset": i, "shape": [...]}}, with the
+    offset counted in float64 elements. Everything else is encoded as in
+    to_json. Non-finite values inside arrays stay NaN/Inf in the buffer.
+    Returns (header, buffer); the JS side reads the buffer directly from
+    the WASM heap instead of parsing the numbers from text.
+    """
+    arrays = []
+    header = to_json(_extract_arrays(obj, arrays, [0]))
+    if arrays:
+        buffer = np.concatenate([array.ravel() for array in arrays], dtype=np.float64)
+    else:
+        buffer = np.empty(0)
+    return header, buffer
+
+def _extract_arrays(obj, arrays, offset):
+    if isinstance(obj, dict):
+        return {key: _extract_arrays(value, arrays, offset) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_extract_arrays(item, arrays, offset) for item in obj]
+    if isinstance(obj, np.ndarray) and obj.dtype.kind in 'fiu':
+        arrays.append(obj)
+        marker = {'__ndarray__': {'offset': offset[0], 'shape': list(obj.shape)}}
+        offset[0] += obj.size
+        return marker
+    return obj
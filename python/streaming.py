@@ -0,0 +1,122 @@
+# streaming.py - Out-of-core sufficient statistics for correlation and regression
+
+import pandas as pd
+import numpy as np
+
+# Default number of rows parsed per chunk when streaming a CSV file
+DEFAULT_CHUNKSIZE = 50000
+
+class MomentAccumulator:
+    """
+    Running count, column means and centred cross-product matrix over row chunks
+
+    The centred cross-product (co-moment) matrix is the Gram matrix of the
+    mean-centred columns, so X'X, X'y, column sums and sums of squares for
+    any subset of the columns can be recovered from it and the means.
+    Chunks are merged with Chan's pairwise update, which stays accurate
+    where raw sums of squares would cancel. Memory is O(p²) in the number of
+    columns, independent of the number of rows.
+    """
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.index = {col: i for i, col in enumerate(self.columns)}
+        size = len(self.columns)
+        self.count = 0
+        self.dropped_rows = 0
+        self.mean = np.zeros(size)
+        self.comoment = np.zeros((size, size))
+
+    def update(self, chunk):
+        """
+        Add a DataFrame chunk; rows with a missing value in any column are skipped
+        """
+        return self.update_values(chunk[self.columns].to_numpy(dtype=float))
+
+    def update_values(self, values):
+        """
+        Add a 2-D array chunk whose columns are in accumulator order; incomplete rows are skipped
+        """
+        complete = ~np.isnan(values).any(axis=1)
+        self.dropped_rows += int((~complete).sum())
+        values = values[complete]
+        if len(values) == 0:
+            return self
+
+        mean = values.mean(axis=0)
+        centered = values - mean
+        self._combine(len(values), mean, centered.T @ centered)
+        return self
+
+    def merge(self, other):
+        """
+        Fold in another accumulator over the same columns (e.g. from a parallel worker)
+        """
+        self.dropped_rows += other.dropped_rows
+        if other.count:
+            self._combine(other.count, other.mean, other.comoment)
+        return self
+
+    def without(self, other):
+        """
+        New accumulator over this one's rows minus those of other (a subset of them, e.g. one fold)
+
+        Chan's update solved for the remaining rows, so leaving a block out
+        costs O(p²) instead of a pass over the rest of the data.
+        """
+        remaining = MomentAccumulator(self.columns)
+        remaining.count = self.count - other.count
+        if remaining.count > 0:
+            remaining.mean = (self.count * self.mean - other.count * other.mean) / remaining.count
+            delta = other.mean - remaining.mean
+            remaining.comoment = self.comoment - other.comoment - np.outer(delta, delta) * (
+                remaining.count * other.count / self.count)
+        return remaining
+
+    def _combine(self, count, mean, comoment):
+        total = self.count + count
+        delta = mean - self.mean
+        self.comoment += comoment + np.outer(delta, delta) * (self.count * count / total)
+        self.mean += delta * (count / total)
+        self.count = total
+
+    def covariance(self, columns=None):
+        """
+        Sample covariance matrix of the given columns (all by default)
+        """
+        idx = self.indices(columns)
+        return self.comoment[np.ix_(idx, idx)] / (self.count - 1)
+
+    def correlation(self, columns=None):
+        """
+        Pearson correlation matrix of the given columns (all by default)
+        """
+        idx = self.indices(columns)
+        block = self.comoment[np.ix_(idx, idx)]
+        scale = np.sqrt(np.diag(block))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = block / np.outer(scale, scale)
+        np.fill_diagonal(corr, np.where(scale > 0, 1.0, np.nan))
+        return corr
+
+    def indices(self, columns):
+        """
+        Positions of the given columns (all by default) in the accumulator
+        """
+        if columns is None:
+            return np.arange(len(self.columns))
+        return np.array([self.index[col] for col in columns], dtype=int)
+
+def accumulate_moments(chunks, columns):
+    """
+    Build a MomentAccumulator from an iterable of DataFrame chunks
+    """
+    moments = MomentAccumulator(columns)
+    for chunk in chunks:
+        moments.update(chunk)
+    return moments
+
+def iter_csv_chunks(source, columns=None, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Iterate over a CSV file (path or buffer) in DataFrame chunks of chunksize rows
+    """
+    return pd.read_csv(source, usecols=columns, chunksize=chunksize)
@@ -16,10 +16,25 @@ const urlsToCache = [
     '/js/visualization.js',
     '/js/main.js',
     '/python/preprocessing.py',
+    '/python/ingestion.py',
+    '/python/column_stats.py',
     '/python/distribution.py',
+    '/python/normality.py',
+    '/python/sampling.py',
     '/python/correlation.py',
+    '/python/kendall.py',
+    '/python/ols.py',
+    '/python/streaming.py',
     '/python/modeling.py',
+    '/python/polynomial.py',
+    '/python/bootstrap.py',
+    '/python/crossval.py',
     '/python/assumptions.py',
+    '/python/pipeline.py',
+    '/python/executor.py',
+    '/python/instrumentation.py',
+    '/python/serialization.py',
+    '/python/lazy.py',
     '/python/report_generator.py',
     '/python/eda_core.py'
 ];
@@ -0,0 +1,6 @@
+# conftest.py - Make the flat modules in python/ importable from the tests
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python'))
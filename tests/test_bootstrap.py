@@ -0,0 +1,23 @@
+# test_bootstrap.py - Bootstrap confidence intervals
+
+import pickle
+import numpy as np
+import bootstrap
+from bootstrap import RegressionMoments, bootstrap_chunk
+
+def test_pickled_statistic_rebuilds_cached_products_once():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(500, 3))
+    Y = X @ [1.0, -2.0, 0.5] + rng.normal(size=500)
+    statistic = RegressionMoments(X, Y).cache(2 ** 30)
+    payload = pickle.dumps(statistic)
+    assert len(payload) < statistic.cached.nbytes
+
+    first = pickle.loads(payload)
+    second = pickle.loads(payload)
+    assert first.cached is second.cached is bootstrap._worker_products[1]
+    np.testing.assert_array_equal(first.cached, statistic.cached)
+
+    unit = (statistic, np.random.SeedSequence(1), 50, 2 ** 20)
+    moved = (first, np.random.SeedSequence(1), 50, 2 ** 20)
+    np.testing.assert_array_equal(bootstrap_chunk(unit), bootstrap_chunk(moved))
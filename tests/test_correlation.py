@@ -0,0 +1,80 @@
+# test_correlation.py - Dense and screened correlation matrices
+
+import tracemalloc
+import numpy as np
+import pandas as pd
+import pytest
+import correlation
+from correlation import calculate_all_correlations, pairwise_pearson, pairwise_spearman, screen_correlations
+
+def correlated_columns(n, k, seed=0):
+    rng = np.random.default_rng(seed)
+    base = rng.normal(size=(n, k // 2))
+    values = np.hstack([base, base + rng.normal(size=base.shape), rng.normal(size=(n, k % 2))])
+    values[:, 3] = 2.0
+    return np.round(values, 1)
+
+def dense_edges(corr, threshold):
+    source, target = np.triu_indices(len(corr), 1)
+    r = corr[source, target]
+    keep = np.abs(r) >= threshold
+    return {(a, b): value for a, b, value in zip(source[keep], target[keep], r[keep])}
+
+@pytest.mark.parametrize('missing', [False, True])
+@pytest.mark.parametrize('method, dense', [('pearson', pairwise_pearson), ('spearman', pairwise_spearman)])
+def test_screening_matches_dense_and_builds_each_tile_once(monkeypatch, method, dense, missing):
+    values = correlated_columns(400, 21)
+    if missing:
+        values[np.random.default_rng(1).random(values.shape) < 0.1] = np.nan
+    expected = dense_edges(dense(values)[0], 0.3)
+    calls = []
+    spearman_block = correlation.spearman_block
+    monkeypatch.setattr(correlation, 'spearman_block', lambda block: calls.append(block.shape) or spearman_block(block))
+
+    edges, pairs_tested = screen_correlations(values, method, threshold=0.3, tile_elements=400 * 6 * (correlation.SCREEN_PANEL_TILES + 1))
+
+    assert pairs_tested == 21 * 20 // 2
+    assert dict(zip(zip(edges['source'], edges['target']), edges['r'])) == pytest.approx(expected)
+    # Four tiles fit one panel: one ranking per tile, not per tile pair
+    assert len(calls) == (4 if method == 'spearman' else 0)
+
+@pytest.mark.parametrize('missing', [False, True])
+@pytest.mark.parametrize('method', ['pearson', 'spearman'])
+def test_screening_memory_follows_tile_size_not_data_size(method, missing):
+    n, tile_elements = 500, 500 * 4 * (correlation.SCREEN_PANEL_TILES + 1)
+    # Warm up the lazy imports of the p-values
+    screen_correlations(np.eye(3), method)
+    peaks = []
+    for k in (64, 256):
+        values = np.random.default_rng(k).normal(size=(n, k))
+        if missing:
+            values[::7, ::3] = np.nan
+        tracemalloc.start()
+        screen_correlations(values, method, threshold=0.9, tile_elements=tile_elements)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    # Four times the columns: about the same peak, a few arrays of tile_elements, not n x k
+    assert peaks[1] < 1.25 * peaks[0]
+    assert peaks[1] < 10 * tile_elements * 8
+    assert peaks[1] < values.nbytes
+
+def test_vif_uses_listwise_complete_rows():
+    nan = np.nan
+    df = pd.DataFrame({'a': [1, 2, 3, 4, nan, nan], 'b': [nan, nan, nan, 1, 2, 3.5], 'c': [2, 1, 4, 3, 5, 7]})
+    results = calculate_all_correlations(df, ['a', 'b', 'c'], {'calculateVIF': True})
+
+    assert results['vif'] == {'a': None, 'b': None, 'c': None}
+    assert results['vif_diagnostics']['status'] == 'insufficient_rows'
+    assert results['vif_diagnostics']['complete_rows'] == 1
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(60, 3)), columns=['a', 'b', 'c'])
+    df['c'] += df['a']
+    df.iloc[::5, 0] = nan
+    results = calculate_all_correlations(df, ['a', 'b', 'c'], {'calculateVIF': True})
+    complete = df.dropna()
+    r_squared = 1 - np.linalg.lstsq(
+        np.column_stack([np.ones(len(complete)), complete[['a', 'b']]]), complete['c'], rcond=None
+    )[1][0] / ((complete['c'] - complete['c'].mean()) ** 2).sum()
+    assert results['vif']['c'] == pytest.approx(1 / (1 - r_squared))
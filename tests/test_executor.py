@@ -0,0 +1,15 @@
+# test_executor.py - Optional thread/process pools
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from executor import get_executor, shutdown_executors, stage_pool
+
+def test_stage_pool_matches_the_configured_workers():
+    try:
+        executor = get_executor({'kind': 'thread', 'workers': 3})
+        assert executor.workers == 3
+        assert stage_pool(executor).workers == 3
+        with ThreadPoolExecutor(max_workers=2) as foreign:
+            assert stage_pool(foreign).workers == (os.cpu_count() or 1)
+    finally:
+        shutdown_executors()
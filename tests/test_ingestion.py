@@ -0,0 +1,42 @@
+# test_ingestion.py - Chunked CSV ingestion and column profiles
+
+import io
+import numpy as np
+import pandas as pd
+import pytest
+import eda_core
+from ingestion import CSVIngestor
+
+def ingest(text, piece):
+    ingestor = CSVIngestor()
+    for start in range(0, len(text), piece):
+        ingestor.feed(text[start:start + piece])
+    return ingestor.finish()
+
+@pytest.mark.parametrize('piece', [5, 64, 10 ** 6])
+def test_ingested_frame_matches_single_read(piece):
+    # 'code' is numeric for the first chunks and text from the 40th row on
+    rows = [f'{i},{i if i < 40 else "C" + str(i)},{i / 4},"note {i}, ""quoted""\nsecond line"' for i in range(60)]
+    rows[7] = '7,,1.75,'
+    text = 'id,code,value,note\n' + '\n'.join(rows) + '\n'
+
+    df, profile = ingest(text, piece)
+
+    pd.testing.assert_frame_equal(df, pd.read_csv(io.StringIO(text)))
+    assert profile.column_index('code') is None
+    assert profile.summary('value')['mean'] == pytest.approx(df['value'].mean())
+
+def test_quality_stage_uses_ingestion_profile(monkeypatch):
+    rng = np.random.default_rng(0)
+    text = pd.DataFrame(rng.normal(size=(50, 2)), columns=['x', 'y']).to_csv(index=False)
+    df, profile = ingest(text, 256)
+    received = []
+    assess = eda_core.assess_data_quality
+    monkeypatch.setattr(eda_core, 'assess_data_quality',
+                        lambda df, columns, profile=None: received.append(profile) or assess(df, columns, profile))
+
+    eda_core.clear_analysis_cache()
+    config = {'selectedIVs': ['x'], 'selectedDVs': ['y'], 'config': {}}
+    eda_core.run_full_analysis(df, config, profile=profile)
+
+    assert received == [profile]
@@ -0,0 +1,13 @@
+# test_modeling.py - Regression modeling entry points
+
+import numpy as np
+import pandas as pd
+from modeling import fit_all_models, fit_linear_regressions
+
+def test_no_dvs_returns_empty_results():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(30, 2)), columns=['a', 'b'])
+    config = {'regressionModels': {'linear': True, 'polynomial': True}, 'crossValidation': {'folds': 3}}
+
+    assert fit_all_models(df, ['a', 'b'], [], config) == {}
+    assert fit_linear_regressions(df[['a', 'b']].values, np.empty((30, 0)), ['a', 'b'], []) == []
@@ -0,0 +1,38 @@
+# test_ols.py - Shared OLS factorization
+
+import numpy as np
+from ols import DesignFactorization, GramFactorization
+
+def test_large_offset_predictor_keeps_intercept():
+    """
+    A predictor with a mean around 1e6 must not push the intercept out as aliased
+    """
+    rng = np.random.default_rng(0)
+    x = 1e6 + rng.normal(size=200)
+    y = 5.0 + 0.5 * (x - 1e6) + rng.normal(scale=0.1, size=200)
+
+    factorization = DesignFactorization(x)
+    beta = factorization.solve(y)
+    slope, intercept = np.polyfit(x - 1e6, y, 1)
+
+    assert factorization.rank == 2
+    np.testing.assert_allclose(beta[1], slope, rtol=1e-8)
+    np.testing.assert_allclose(beta[0], intercept - slope * 1e6, rtol=1e-8)
+    assert np.all(np.isfinite(np.diag(factorization.unscaled_covariance())))
+
+def test_gram_and_qr_paths_agree_on_rank():
+    """
+    A column at relative residual 1e-7 is kept by both paths; an exact dependency is dropped by both
+    """
+    rng = np.random.default_rng(0)
+    x1, x2 = 50 + rng.normal(size=(2, 300))
+    basis = np.column_stack([np.ones(300), x1, x2])
+    noise = rng.normal(size=300)
+    noise -= basis @ np.linalg.lstsq(basis, noise, rcond=None)[0]
+    combined = x1 + x2 - (x1 + x2).mean()
+
+    for residual, rank in ((1e-7, 3), (0.0, 2)):
+        x3 = x1 + x2 + residual * np.linalg.norm(combined) / np.linalg.norm(noise) * noise
+        X = np.column_stack([x1, x2, x3])
+        centred = X - X.mean(axis=0)
+        assert DesignFactorization(X).rank - 1 == GramFactorization(centred.T @ centred).rank == rank
@@ -0,0 +1,43 @@
+# test_pipeline.py - Memoized stage graph
+
+import numpy as np
+import pandas as pd
+from pipeline import StageGraph, result_size
+
+def make_graph(max_bytes):
+    graph = StageGraph(max_bytes=max_bytes)
+    graph.add_stage(
+        'frame',
+        lambda data, inputs, config, executor: pd.DataFrame(np.zeros((1000, config['columns']))),
+        config_slice=lambda config: config['columns']
+    )
+    return graph
+
+def test_cache_is_bounded_by_bytes():
+    # Room for one three-column frame (plus its index), which evicts the smaller ones
+    graph = make_graph(max_bytes=3 * 8000 + 1000)
+    for columns in range(1, 6):
+        graph.run(None, 'data', {'columns': columns})
+    assert graph.cached_bytes <= graph.max_bytes
+    assert graph.cached_bytes == sum(result_size(value) for value in graph._cache.values())
+
+    # Only the most recent configuration that fits is still memoized
+    assert graph.run(None, 'data', {'columns': 2})[1]['frame'] == 'computed'
+    assert graph.run(None, 'data', {'columns': 2})[1]['frame'] == 'cached'
+
+def test_result_larger_than_budget_is_not_memoized():
+    graph = make_graph(max_bytes=8000)
+    graph.run(None, 'data', {'columns': 2})
+    assert graph.run(None, 'data', {'columns': 2})[1]['frame'] == 'computed'
+    assert graph.cached_bytes == 0
+
+def test_modifying_outputs_does_not_change_cache_hits():
+    graph = StageGraph()
+    graph.add_stage('frame', lambda data, inputs, config, executor: {'frame': pd.DataFrame({'x': [1.0, 2.0]})})
+    computed, _ = graph.run(None, 'data', {})
+    computed['frame']['frame'].loc[0, 'x'] = 10.0
+    recalled, status = graph.run(None, 'data', {})
+    recalled['frame']['frame']['y'] = 0.0
+
+    assert status['frame'] == 'cached'
+    pd.testing.assert_frame_equal(graph.run(None, 'data', {})[0]['frame']['frame'], pd.DataFrame({'x': [1.0, 2.0]}))